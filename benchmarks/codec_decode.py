@@ -0,0 +1,51 @@
+"""Decode cost per gateway frame for every installed codec.
+
+Run from the repository root::
+
+    python -m benchmarks.codec_decode [frames]
+"""
+import sys
+import time
+
+from pyre.codec import JSON_CODECS, MsgPackCodec, StdlibJSONCodec
+from .payloads import event_mix, bulk
+
+
+def installed_codecs():
+    codecs = []
+    for codec in [*JSON_CODECS.values(), MsgPackCodec]:
+        try:
+            codecs.append(codec())
+        except ImportError as e:
+            print(f'skipping {codec.__name__}: {e}')
+    return codecs
+
+
+def bench(codec, frames, rounds: int = 5) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for frame in frames:
+            codec.decode(frame)
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames)
+
+
+def main(count: int = 20000):
+    events = event_mix(count)
+    bulks = [bulk(events[i:i + 100]) for i in range(0, len(events), 100)]
+    reference = StdlibJSONCodec()
+    results = []
+    for codec in installed_codecs():
+        # encode with the codec itself so msgpack gets binary frames
+        frames = [codec.encode(event) for event in events]
+        bulk_frames = [codec.encode(b) for b in bulks]
+        assert codec.decode(frames[0]) == reference.decode(reference.encode(events[0]))
+        results.append((codec, bench(codec, frames), bench(codec, bulk_frames)))
+    baseline = next(per_frame for codec, per_frame, _ in results if isinstance(codec, StdlibJSONCodec))
+    print(f'{"codec":<10}{"frame":>14}{"bulk(100)":>14}{"speedup":>10}')
+    for codec, per_frame, per_bulk in results:
+        print(f'{codec.backend:<10}{per_frame * 1e6:>11.2f} us{per_bulk * 1e6:>11.2f} us{baseline / per_frame:>9.2f}x')
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,91 @@
+"""End to end PyreClient benchmark against the local mock server.
+
+Measures startup hydration, gateway receive throughput and send throughput
+with rate limiting, without network access. Run from the repository root::
+
+    python -m benchmarks.end_to_end [--servers 5] [--members 2000] [--events 20000]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from pyre import PyreClient
+from pyre.logger import LOG
+import pyre.models as models
+from .mock_server import MockRevolt, MockConfig
+
+
+async def run(args):
+    config = MockConfig(servers=args.servers, members=args.members, channels=args.channels,
+                        shared_members=args.shared, events=args.events, event_rate=args.rate,
+                        bulk_size=args.bulk, rate_limit_every=args.rate_limit_every,
+                        latency=args.latency)
+    server = MockRevolt(config)
+    await server.start()
+    client = PyreClient('mock', hydration_concurrency=args.concurrency, dispatch_workers=args.workers)
+    server.configure(client)
+    ready = asyncio.Event()
+    received = 0
+
+    @client.listen()
+    async def on_ready():
+        ready.set()
+
+    @client.listen(models.MessageCreate, lazy=True)
+    async def on_message(message):
+        nonlocal received
+        received += 1
+
+    start = time.perf_counter()
+    connection = asyncio.create_task(client.astart())
+    await ready.wait()
+    startup = time.perf_counter() - start
+    print(f'startup:     {startup:.3f}s, {len(client.cache.members)} members, {len(client.cache.users)} users, '
+          f'{server.stats.requests} requests')
+
+    start = time.perf_counter()
+    await server.traffic_done.wait()
+    if client.ws.dispatcher:
+        await client.ws.dispatcher.join()
+    elapsed = time.perf_counter() - start
+    print(f'receive:     {server.stats.events} events in {server.stats.frames} frames, {elapsed:.3f}s, '
+          f'{server.stats.events / elapsed:,.0f} events/s, {received} messages seen')
+
+    channel_id = next(iter(server.channels))
+    requests, limited = server.stats.requests, server.stats.rate_limited
+    start = time.perf_counter()
+    await asyncio.gather(*[client.http.send_message(channel_id, f'message {i}') for i in range(args.sends)])
+    elapsed = time.perf_counter() - start
+    print(f'send:        {args.sends} messages in {elapsed:.3f}s, {args.sends / elapsed:,.0f} messages/s, '
+          f'{server.stats.requests - requests} requests, {server.stats.rate_limited - limited} rate limited')
+
+    connection.cancel()
+    await asyncio.gather(connection, return_exceptions=True)
+    if client.ws.dispatcher:
+        await client.ws.dispatcher.stop()
+    await client.http.close()
+    await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', type=int, default=5)
+    parser.add_argument('--members', type=int, default=2000, help='members per server')
+    parser.add_argument('--channels', type=int, default=20, help='channels per server')
+    parser.add_argument('--shared', type=float, default=0.2, help='fraction of members in every server')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--rate', type=float, default=0, help='events per second, 0 for as fast as possible')
+    parser.add_argument('--bulk', type=int, default=1, help='events per gateway frame')
+    parser.add_argument('--sends', type=int, default=500)
+    parser.add_argument('--rate-limit-every', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every API response')
+    parser.add_argument('--concurrency', type=int, default=8, help='hydration concurrency')
+    parser.add_argument('--workers', type=int, default=4, help='dispatch workers')
+    args = parser.parse_args()
+    LOG.setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Memory saved by interning ULID ids across cached models and cache keys.
+
+Payloads are decoded from JSON in chunks, like gateway and HTTP responses, so every
+occurrence of an id starts out as its own string. The same data is then cached with
+interning switched off, by replacing ``sys.intern`` in :mod:`pyre.interning` with a
+no-op, and with it on. Run from the repository root::
+
+    python -m benchmarks.id_interning [members] [roles]
+"""
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+import types
+
+from unittest import mock
+from pyre import interning
+from pyre.cache import ClientCache
+from pyre.models import Member, Role, Server
+from .payloads import ulid
+
+SERVERS = 50
+CHUNK = 1000
+"""Members per decoded response, ids are only shared within one json.loads call by chance"""
+
+
+def dataset(members: int, roles: int, seed: int = 0) -> tuple:
+    """Encoded ``(servers, member chunks)``, each server carries its share of the roles"""
+    rng = random.Random(seed)
+    server_ids = [ulid(rng) for _ in range(SERVERS)]
+    role_ids = {server_id: [ulid(rng) for _ in range(roles // SERVERS)] for server_id in server_ids}
+    servers = [json.dumps({
+        '_id': server_id, 'owner': ulid(rng), 'name': f'server{index}',
+        'channels': [ulid(rng) for _ in range(20)],
+        'roles': {role_id: {'name': f'role{rank}', 'permissions': {'a': 0, 'd': 0}, 'rank': rank}
+                  for rank, role_id in enumerate(role_ids[server_id])},
+    }) for index, server_id in enumerate(server_ids)]
+    chunks = []
+    for start in range(0, members, CHUNK):
+        server_id = server_ids[start // CHUNK % SERVERS]
+        chunks.append(json.dumps({'members': [
+            {'_id': {'server': server_id, 'user': ulid(rng)}, 'roles': rng.sample(role_ids[server_id], 3)}
+            for _ in range(min(CHUNK, members - start))
+        ]}))
+    return servers, chunks
+
+
+def fill(servers: list, chunks: list) -> ClientCache:
+    # mirrors on_ready and the member hydration
+    cache = ClientCache()
+    for encoded in servers:
+        server = json.loads(encoded)
+        cache.servers.set(server['_id'], Server(**server))
+        for role_id, role in server['roles'].items():
+            cache.roles.set((server['_id'], role_id), Role(id=role_id, server_id=server['_id'], **role))
+    for encoded in chunks:
+        for member in json.loads(encoded)['members']:
+            cache.members.set((member['_id']['server'], member['_id']['user']), Member(**member))
+    return cache
+
+
+def measure(servers: list, chunks: list) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    cache = fill(servers, chunks)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, elapsed, cache
+
+
+def id_objects(cache: ClientCache) -> tuple:
+    """Id string objects referenced by member keys and models, and how many distinct ids they hold"""
+    objects, values = set(), set()
+    for key, member in cache.members.items():
+        for value in (*key, member.ids.server_id, member.ids.user_id, *member.role_ids):
+            objects.add(id(value))
+            values.add(value)
+    return len(objects), len(values)
+
+
+def main(members: int = 500000, roles: int = 50000):
+    servers, chunks = dataset(members, roles)
+    with mock.patch.object(interning, 'sys', types.SimpleNamespace(intern=lambda value: value)):
+        plain, plain_time, cache = measure(servers, chunks)
+    plain_objects, _ = id_objects(cache)
+    del cache
+    interned, interned_time, cache = measure(servers, chunks)
+    interned_objects, distinct = id_objects(cache)
+    print(f'{"ids":<10}{"MiB":>10}{"bytes/member":>14}{"id strings":>12}{"build":>10}')
+    for name, used, objects, elapsed in (('plain', plain, plain_objects, plain_time),
+                                         ('interned', interned, interned_objects, interned_time)):
+        print(f'{name:<10}{used / 2 ** 20:>10.1f}{used / members:>14.0f}{objects:>12}{elapsed:>9.1f}s')
+    print(f'{members} members, {roles} roles in {SERVERS} servers, {distinct} distinct member ids, '
+          f'interning saves {1 - interned / plain:.1%}')
+    if interned_objects != distinct:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,103 @@
+"""Memory used per cached member by the default cache and by the compact member store.
+
+The target is checked against the store's own structures. Ids are created before
+measuring, they are shared with the users cache and the gateway payloads anyway,
+the distinct server, user and role id strings are reported in the ``with ids``
+column, a user id alone is another ~75 bytes per member.
+
+Lookups are timed cold, every member read once, and hot, the same few members read
+repeatedly. The compact store builds a :class:`Member` on a cold read, which is several
+times slower than the regular store, and keeps recently read members built.
+Run from the repository root::
+
+    python -m benchmarks.member_memory [members]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from datetime import datetime, timedelta, timezone
+from pyre.cache import ClientCache
+from pyre.models import Member
+from .payloads import ulid
+
+TARGET = 200
+"""Bytes per member the compact store has to stay under, without the id strings"""
+HOT = 100
+"""Members read repeatedly for the hot lookup timing"""
+
+
+def member_payloads(count: int, servers: int = 4, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    server_ids = [ulid(rng) for _ in range(servers)]
+    role_ids = {server_id: [ulid(rng) for _ in range(8)] for server_id in server_ids}
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    payloads = []
+    for _ in range(count):
+        server_id = rng.choice(server_ids)
+        payload = {'_id': {'server': server_id, 'user': ulid(rng)},
+                   'joined_at': (start + timedelta(seconds=rng.randrange(10 ** 8))).isoformat()}
+        if rng.random() < 0.1:
+            payload['nickname'] = ulid(rng)[:10]
+        if rng.random() < 0.6:
+            payload['roles'] = rng.sample(role_ids[server_id], rng.randint(1, 3))
+        payloads.append(payload)
+    return payloads
+
+
+def id_bytes(payloads: list) -> float:
+    """Size of the distinct id strings per member, the same for both stores"""
+    ids = set()
+    for payload in payloads:
+        ids.update(payload['_id'].values())
+        ids.update(payload.get('roles', ()))
+    return sum(sys.getsizeof(value) for value in ids) / len(payloads)
+
+
+def time_gets(cache: ClientCache, keys: list) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        cache.members.get(key)
+    return (time.perf_counter() - start) / len(keys)
+
+
+def measure(compact: bool, payloads: list) -> tuple:
+    cache = ClientCache(compact_members=compact)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for payload in payloads:
+        ids = payload['_id']
+        cache.members.set((ids['server'], ids['user']), Member(**payload))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    keys = [(payload['_id']['server'], payload['_id']['user']) for payload in payloads[:10000]]
+    cold = time_gets(cache, keys)
+    hot = time_gets(cache, keys[:HOT] * (len(keys) // HOT))
+    return used / len(payloads), cold, hot, cache
+
+
+def main(count: int = 100000):
+    payloads = member_payloads(count)
+    default, default_cold, default_hot, _ = measure(False, payloads)
+    compact, compact_cold, compact_hot, cache = measure(True, payloads)
+    key = (payloads[0]['_id']['server'], payloads[0]['_id']['user'])
+    assert cache.members.get(key).joined_at == Member(**payloads[0]).joined_at
+    ids = id_bytes(payloads)
+    print(f'{"store":<10}{"bytes/member":>14}{"with ids":>10}{"cold get":>13}{"hot get":>13}')
+    for name, used, cold, hot in (('default', default, default_cold, default_hot),
+                                  ('compact', compact, compact_cold, compact_hot)):
+        print(f'{name:<10}{used:>14.0f}{used + ids:>10.0f}{cold * 1e6:>10.2f} us{hot * 1e6:>10.2f} us')
+    print(f'{count} members, compact store uses {compact / default:.1%} of the default memory, '
+          f'cold gets take {compact_cold / default_cold:.1f}x and hot gets {compact_hot / default_hot:.1f}x the time of the default')
+    print(f'target < {TARGET} bytes/member for the store itself, the {ids:.0f} bytes/member of id strings '
+          f'are shared with the users cache and not counted, with them the compact store uses {compact + ids:.0f}')
+    if compact >= TARGET:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,59 @@
+"""Cost of dropping the cached messages of a server when it is deleted.
+
+Compares the per-channel message index with a full ``delete_many`` scan per channel,
+which is what ``cache_servers_delete`` attempted before (its regex tuple was treated as a
+list of keys and matched nothing). The scan is timed on a few channels only and
+extrapolated, running it for every channel of a 1M message cache takes far too long.
+Run from the repository root::
+
+    python -m benchmarks.message_index [messages] [channels]
+"""
+import random
+import sys
+import time
+
+from pyre.cache import ClientCache
+from pyre.models import Server
+from .payloads import ulid
+
+SCANNED_CHANNELS = 3
+
+
+def fill(cache: ClientCache, server_id: str, channel_ids: list, count: int, rng: random.Random):
+    # messages are placeholders, the index only looks at keys
+    other_channels = [ulid(rng) for _ in range(len(channel_ids))]
+    cache.servers.set(server_id, Server(_id=server_id, channels=channel_ids))
+    for index in range(count):
+        # half of the messages belong to channels of other servers
+        channels = channel_ids if index % 2 else other_channels
+        cache.messages.set((channels[index % len(channels)], f'{index:026d}'), index)
+
+
+def main(count: int = 1000000, channels: int = 500):
+    rng = random.Random(0)
+    server_id = ulid(rng)
+    channel_ids = [ulid(rng) for _ in range(channels)]
+    cache = ClientCache()
+    start = time.perf_counter()
+    fill(cache, server_id, channel_ids, count, rng)
+    print(f'filled {len(cache.messages)} messages in {time.perf_counter() - start:.2f}s')
+
+    start = time.perf_counter()
+    scanned = sum(cache.messages.delete_many(lambda key, channel_id=channel_id: key[0] == channel_id)
+                  for channel_id in channel_ids[:SCANNED_CHANNELS])
+    per_channel = (time.perf_counter() - start) / SCANNED_CHANNELS
+    print(f'full scan:   {per_channel * 1e3:.1f} ms per channel, ~{per_channel * channels:.1f}s for {channels} channels '
+          f'({scanned} messages in {SCANNED_CHANNELS} channels)')
+
+    remaining = len(cache.messages)
+    start = time.perf_counter()
+    cache.purge_server(server_id)
+    elapsed = time.perf_counter() - start
+    removed = remaining - len(cache.messages)
+    print(f'index purge: {elapsed * 1e3:.1f} ms for {channels} channels, {removed} messages '
+          f'({elapsed / removed * 1e6:.2f} us per message)')
+    assert not any(cache.message_index.count(channel_id) for channel_id in channel_ids)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,261 @@
+"""Local stand-in for the Revolt API, file server and gateway.
+
+Serves the routes HTTPClient uses for messages, members, users and uploads, and a
+websocket gateway that sends Authenticated, Ready and then synthetic traffic at a
+configurable rate. Every ``rate_limit_every``-th API request is answered with 429.
+Everything runs on localhost, so it works offline::
+
+    server = MockRevolt(MockConfig(servers=3, members=1000, event_rate=5000))
+    await server.start()
+    server.configure(client)  # point a PyreClient at it
+"""
+import asyncio
+import json
+import random
+import time
+import attrs
+import websockets
+
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit, parse_qs
+from pyre.codec import get_codec
+from .payloads import ulid, message_create, typing, ack
+
+HTTP_STATUS = {200: 'OK', 404: 'Not Found', 429: 'Too Many Requests'}
+
+
+@attrs.define
+class MockConfig:
+    servers: int = 1
+    """Servers in the Ready payload"""
+    channels: int = 10
+    """Text channels per server"""
+    members: int = 100
+    """Members per server"""
+    shared_members: float = 0.0
+    """Fraction of members that are in every server"""
+    events: int = 10000
+    """Traffic events sent after Ready, 0 for none"""
+    event_rate: float = 1000.0
+    """Traffic events per second, 0 to send as fast as possible"""
+    bulk_size: int = 1
+    """Events per frame, frames with more than one event are sent as Bulk"""
+    message_ratio: float = 0.3
+    """Fraction of traffic that is messages, the rest is typing and acks"""
+    rate_limit_every: int = 0
+    """Answer every n-th API request with 429, 0 disables rate limiting"""
+    rate_limit_reset_after: int = 10
+    """Value of X-RateLimit-Reset-After in milliseconds"""
+    latency: float = 0.0
+    """Seconds added to every API response"""
+    seed: int = 0
+
+
+@attrs.define
+class MockStats:
+    requests: int = 0
+    rate_limited: int = 0
+    messages_sent: int = 0
+    uploads: int = 0
+    frames: int = 0
+    events: int = 0
+
+
+class MockRevolt:
+    """The mock server, ``start`` binds random free ports on 127.0.0.1"""
+    def __init__(self, config: MockConfig = None):
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.http_port: int = None
+        self.ws_port: int = None
+        self.traffic_done = asyncio.Event()
+        self._rng = random.Random(self.config.seed)
+        self._http_server: asyncio.AbstractServer = None
+        self._ws_server = None
+        self._sockets: Dict[object, object] = {}
+        self.bot_id = ulid(self._rng)
+        self.servers: Dict[str, dict] = {}
+        self.channels: Dict[str, dict] = {}
+        self.users: Dict[str, dict] = {}
+        self.members: Dict[str, List[str]] = {}
+        self._build()
+
+    def _build(self):
+        config = self.config
+        shared = [ulid(self._rng) for _ in range(int(config.members * config.shared_members))]
+        for _ in range(config.servers):
+            server_id = ulid(self._rng)
+            channel_ids = [ulid(self._rng) for _ in range(config.channels)]
+            user_ids = shared + [ulid(self._rng) for _ in range(config.members - len(shared))]
+            user_ids.append(self.bot_id)
+            self.servers[server_id] = {
+                '_id': server_id, 'owner': user_ids[0], 'name': f'server {len(self.servers)}',
+                'channels': channel_ids, 'default_permissions': 0,
+                'roles': {ulid(self._rng): {'name': f'role{i}', 'permissions': {'a': 0, 'd': 0}, 'rank': i} for i in range(5)},
+            }
+            for index, channel_id in enumerate(channel_ids):
+                self.channels[channel_id] = {'_id': channel_id, 'channel_type': 'TextChannel',
+                                             'server': server_id, 'name': f'channel {index}'}
+            self.members[server_id] = user_ids
+            for user_id in user_ids:
+                self.users[user_id] = {'_id': user_id, 'username': user_id[:8]}
+        self.users[self.bot_id] = {'_id': self.bot_id, 'username': 'mockbot', 'bot': {'owner': self.bot_id}}
+
+    @property
+    def api_url(self) -> str:
+        return f'http://127.0.0.1:{self.http_port}/'
+
+    @property
+    def autumn_url(self) -> str:
+        return f'http://127.0.0.1:{self.http_port}/autumn/'
+
+    @property
+    def ws_url(self) -> str:
+        return f'ws://127.0.0.1:{self.ws_port}'
+
+    def configure(self, client):
+        """Point a PyreClient at this server"""
+        client.http.base_url = self.api_url
+        client.http.autumn_url = self.autumn_url
+        client.ws.url = self.ws_url
+
+    async def start(self):
+        self._http_server = await asyncio.start_server(self._serve_http, '127.0.0.1', 0)
+        self.http_port = self._http_server.sockets[0].getsockname()[1]
+        self._ws_server = await websockets.serve(self._serve_gateway, '127.0.0.1', 0)
+        self.ws_port = next(iter(self._ws_server.sockets)).getsockname()[1]
+
+    async def stop(self):
+        for websocket in list(self._sockets):
+            await websocket.close()
+        self._ws_server.close()
+        await self._ws_server.wait_closed()
+        self._http_server.close()
+        await self._http_server.wait_closed()
+
+    # HTTP
+
+    async def _serve_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode().split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                if self.config.latency:
+                    await asyncio.sleep(self.config.latency)
+                status, payload, extra = self._route(method, urlsplit(target).path.lstrip('/'), body)
+                data = json.dumps(payload).encode()
+                head = [f'HTTP/1.1 {status} {HTTP_STATUS.get(status, "")}',
+                        'Content-Type: application/json', f'Content-Length: {len(data)}']
+                head += [f'{name}: {value}' for name, value in extra.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method: str, path: str, body: bytes) -> Tuple[int, object, dict]:
+        if path.startswith('autumn/'):
+            self.stats.uploads += 1
+            return 200, {'id': ulid(self._rng)}, {}
+        self.stats.requests += 1
+        every = self.config.rate_limit_every
+        if every and self.stats.requests % every == 0:
+            self.stats.rate_limited += 1
+            return 429, {'retry_after': self.config.rate_limit_reset_after}, {
+                'X-RateLimit-Reset-After': str(self.config.rate_limit_reset_after)}
+        parts = path.split('/')
+        match method, parts:
+            case 'GET', ['users', '@me']:
+                return 200, self.users[self.bot_id], {}
+            case 'GET', ['users', user_id]:
+                user = self.users.get(user_id)
+                return (200, user, {}) if user else (404, {'type': 'NotFound'}, {})
+            case 'GET', ['servers', server_id, 'members']:
+                user_ids = self.members.get(server_id, [])
+                return 200, {'members': [{'_id': {'server': server_id, 'user': user_id}} for user_id in user_ids],
+                             'users': [self.users[user_id] for user_id in user_ids]}, {}
+            case 'GET', ['servers', server_id, 'members', user_id]:
+                if user_id not in self.members.get(server_id, ()):
+                    return 404, {'type': 'NotFound'}, {}
+                return 200, {'_id': {'server': server_id, 'user': user_id}}, {}
+            case 'POST', ['channels', channel_id, 'messages']:
+                data = json.loads(body or b'{}')
+                message = {'_id': ulid(self._rng), 'channel': channel_id, 'author': self.bot_id, **data}
+                self.stats.messages_sent += 1
+                self._broadcast({'type': 'Message', **message})
+                return 200, message, {}
+            case 'GET', ['channels', channel_id, 'messages']:
+                return 200, [], {}
+        return 404, {'type': 'NotFound'}, {}
+
+    # Gateway
+
+    def ready(self) -> dict:
+        return {'type': 'Ready', 'users': [], 'servers': list(self.servers.values()),
+                'channels': list(self.channels.values()), 'emojis': []}
+
+    def traffic_event(self) -> dict:
+        channel = self.channels[self._rng.choice(list(self.channels))]
+        user_id = self._rng.choice(self.members[channel['server']][:-1])
+        roll = self._rng.random()
+        if roll < self.config.message_ratio:
+            return message_create(channel['_id'], user_id, self._rng)
+        if roll < (1 + self.config.message_ratio) / 2:
+            return typing(channel['_id'], user_id, self._rng.random() < 0.5)
+        return ack(channel['_id'], user_id, ulid(self._rng))
+
+    def _broadcast(self, event: dict):
+        for websocket, codec in list(self._sockets.items()):
+            asyncio.ensure_future(websocket.send(codec.encode(event)))
+
+    async def _serve_gateway(self, websocket, path: str = None):
+        path = path or websocket.request.path
+        query = parse_qs(urlsplit(path).query)
+        codec = get_codec(query.get('format', ['json'])[0])
+        self._sockets[websocket] = codec
+        try:
+            await websocket.send(codec.encode({'type': 'Authenticated'}))
+            await websocket.send(codec.encode(self.ready()))
+            pinger = asyncio.create_task(self._answer_pings(websocket, codec))
+            await self._send_traffic(websocket, codec)
+            self.traffic_done.set()
+            await pinger
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._sockets.pop(websocket, None)
+
+    async def _answer_pings(self, websocket, codec):
+        async for message in websocket:
+            event = codec.decode(message)
+            if event.get('type') == 'Ping':
+                await websocket.send(codec.encode({'type': 'Pong', 'data': event.get('data')}))
+
+    async def _send_traffic(self, websocket, codec):
+        config = self.config
+        sent = 0
+        start = time.perf_counter()
+        while sent < config.events:
+            batch = [self.traffic_event() for _ in range(min(config.bulk_size, config.events - sent))]
+            frame = batch[0] if len(batch) == 1 else {'type': 'Bulk', 'v': batch}
+            await websocket.send(codec.encode(frame))
+            sent += len(batch)
+            self.stats.frames += 1
+            self.stats.events += len(batch)
+            if config.event_rate:
+                delay = start + sent / config.event_rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                await asyncio.sleep(0)
@@ -0,0 +1,87 @@
+"""Synthetic gateway payloads shared by the benchmarks."""
+import random
+import string
+
+ULID_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def ulid(rng: random.Random = random) -> str:
+    return ''.join(rng.choice(ULID_ALPHABET) for _ in range(26))
+
+
+def message_create(channel_id: str, author_id: str, rng: random.Random = random) -> dict:
+    return {
+        'type': 'Message',
+        '_id': ulid(rng),
+        'nonce': ulid(rng),
+        'channel': channel_id,
+        'author': author_id,
+        'content': ''.join(rng.choice(string.ascii_letters + ' ') for _ in range(rng.randint(10, 200))),
+        'mentions': [ulid(rng) for _ in range(rng.randint(0, 2))],
+    }
+
+
+def typing(channel_id: str, user_id: str, start: bool = True) -> dict:
+    return {'type': 'ChannelStartTyping' if start else 'ChannelStopTyping', 'id': channel_id, 'user': user_id}
+
+
+def ack(channel_id: str, user_id: str, message_id: str) -> dict:
+    return {'type': 'ChannelAck', 'id': channel_id, 'user': user_id, 'message_id': message_id}
+
+
+def member_update(server_id: str, user_id: str, rng: random.Random = random) -> dict:
+    return {'type': 'ServerMemberUpdate', 'id': {'server': server_id, 'user': user_id},
+            'data': {'nickname': ulid(rng)[:8]}, 'clear': []}
+
+
+def guild(channels: int = 50, users: int = 500, seed: int = 0) -> tuple:
+    """Ids for a synthetic server: ``(server_id, channel_ids, user_ids)``"""
+    rng = random.Random(seed)
+    return ulid(rng), [ulid(rng) for _ in range(channels)], [ulid(rng) for _ in range(users)]
+
+
+def ready(server_id: str, channel_ids: list, roles: int = 5, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        'type': 'Ready',
+        'users': [],
+        'servers': [{
+            '_id': server_id, 'owner': ulid(rng), 'name': 'bench', 'channels': channel_ids,
+            'default_permissions': 0,
+            'roles': {ulid(rng): {'name': f'role{i}', 'permissions': {'a': 0, 'd': 0}, 'rank': i} for i in range(roles)},
+        }],
+        'channels': [{'_id': channel_id, 'channel_type': 'TextChannel', 'server': server_id, 'name': f'c{i}'}
+                     for i, channel_id in enumerate(channel_ids)],
+    }
+
+
+def members_response(server_id: str, user_ids: list) -> dict:
+    return {
+        'members': [{'_id': {'server': server_id, 'user': user_id}} for user_id in user_ids],
+        'users': [{'_id': user_id, 'username': user_id[:8]} for user_id in user_ids],
+    }
+
+
+def event_mix(count: int, channel_ids: list = None, user_ids: list = None, server_id: str = None, seed: int = 0) -> list:
+    """A busy-server mix: mostly typing and acks, some messages and member updates"""
+    rng = random.Random(seed)
+    if channel_ids is None:
+        server_id, channel_ids, user_ids = guild(seed=seed)
+    events = []
+    for _ in range(count):
+        roll = rng.random()
+        channel_id = rng.choice(channel_ids)
+        user_id = rng.choice(user_ids)
+        if roll < 0.45:
+            events.append(typing(channel_id, user_id, rng.random() < 0.5))
+        elif roll < 0.75:
+            events.append(ack(channel_id, user_id, ulid(rng)))
+        elif roll < 0.95:
+            events.append(message_create(channel_id, user_id, rng))
+        else:
+            events.append(member_update(server_id, user_id, rng))
+    return events
+
+
+def bulk(events: list) -> dict:
+    return {'type': 'Bulk', 'v': events}
@@ -0,0 +1,76 @@
+"""Gateway replay throughput.
+
+Replays a recording through a PyreClient with the HTTP API stubbed out and
+reports events per second. Without a recording a synthetic one is generated.
+Run from the repository root::
+
+    python -m benchmarks.replay_throughput [--recording FILE] [--speed 0] [--metrics] [--min-fps N]
+
+``--min-fps`` exits with status 1 when throughput drops below N, for CI.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+
+from pyre import PyreClient
+from pyre.logger import LOG
+from pyre.metrics import InMemoryMetrics
+from pyre.replay import GatewayReplayer, StubHTTPClient, write_recording
+from .payloads import guild, ready, members_response, event_mix
+
+
+def synthetic_recording(path: str, events: int):
+    server_id, channel_ids, user_ids = guild()
+    frames = [ready(server_id, channel_ids)] + event_mix(events, channel_ids, user_ids, server_id)
+    write_recording(path, [json.dumps(frame, separators=(',', ':')) for frame in frames], rate=1000)
+    return {rf'^servers/{server_id}/members$': lambda m: members_response(server_id, user_ids)}
+
+
+async def run(args) -> float:
+    routes = {}
+    path = args.recording
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'synthetic.rec')
+        routes = synthetic_recording(path, args.events)
+    client = PyreClient('bench', dispatch_workers=args.workers, metrics=InMemoryMetrics() if args.metrics else None)
+    replayer = GatewayReplayer(client, path, speed=args.speed, http=StubHTTPClient(routes=routes))
+    result = await replayer.replay()
+    print(f'frames:      {result.frames}')
+    print(f'errors:      {result.errors}')
+    print(f'http calls:  {result.http_calls}')
+    print(f'elapsed:     {result.elapsed:.3f}s')
+    print(f'throughput:  {result.frames_per_second:,.0f} frames/s')
+    if client.metrics:
+        for stage, histograms in client.metrics.snapshot().items():
+            print(f'{stage}:')
+            for name, summary in sorted(histograms.items()):
+                print(f'  {name:<50} n={summary["count"]:<7} mean={summary["mean"] * 1e6:8.1f}us '
+                      f'p99<={summary["p99"] * 1e6:8.1f}us')
+    if client.ws.dispatcher:
+        print(f'queue:       {client.ws.dispatcher.snapshot()}')
+        await client.ws.dispatcher.stop()
+    return result.frames_per_second
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recording', help='recording made with WSClient.start_recording')
+    parser.add_argument('--events', type=int, default=20000, help='events in the synthetic recording')
+    parser.add_argument('--speed', type=float, default=0, help='1 for real time, 0 for as fast as possible')
+    parser.add_argument('--workers', type=int, default=4, help='dispatch workers, 0 handles events inline')
+    parser.add_argument('--metrics', action='store_true', help='record and print per-stage timings')
+    parser.add_argument('--min-fps', type=float, help='fail when throughput is lower')
+    args = parser.parse_args()
+    LOG.setLevel(logging.WARNING)
+    fps = asyncio.run(run(args))
+    if args.min_fps and fps < args.min_fps:
+        print(f'throughput below {args.min_fps:,.0f} frames/s')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
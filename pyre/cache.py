@@ -1,7 +1,8 @@
-from cacheout import CacheManager
-from typing import TYPE_CHECKING, List
+from cacheout import Cache, CacheManager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Union
 
 from .models import (
+    PyreObject,
     Member,
     User,
     Server,
@@ -9,84 +10,245 @@ from .models import (
     Role,
     TextMessage
 )
+from .cache_policy import CachePolicy, DEFAULT_POLICIES, NAMESPACES
+from .history import DEFAULT_HISTORY, HISTORY_NAMESPACES, HistoryPolicy, HistoryStore
+from .member_store import CompactMemberStore
+from .patch import CLEAR_FIELDS, apply_patch, patched_size
+from .permissions import PermissionEngine
 if TYPE_CHECKING:
-    from cacheout import Cache
+    from .resolver import MemberResolver
+
+
+class CacheIndex:
+    """Keys of a cache namespace grouped by a server or user id, kept up to date by the cache callbacks.
+
+    Args:
+        group_of: Function returning the group id of a ``(key, value)`` pair, or None
+    """
+    def __init__(self, group_of: Callable[[Hashable, Any], str]):
+        self.group_of = group_of
+        self.keys: Dict[str, Dict[Hashable, None]] = {}
+
+    def get(self, group_id: str) -> List[Hashable]:
+        """Keys cached for a group"""
+        return list(self.keys.get(group_id, ()))
+
+    def count(self, group_id: str) -> int:
+        """Number of keys cached for a group"""
+        return len(self.keys.get(group_id, ()))
+
+    def on_set(self, key: Hashable, value: Any, old_value: Any):
+        old_group_id = self.group_of(key, old_value)
+        group_id = self.group_of(key, value)
+        if old_group_id is not None and old_group_id != group_id:
+            self._remove(old_group_id, key)
+        if group_id is not None:
+            self.keys.setdefault(group_id, {})[key] = None
+
+    def on_delete(self, key: Hashable, value: Any, cause: Any):
+        group_id = self.group_of(key, value)
+        if group_id is not None:
+            self._remove(group_id, key)
+
+    def clear(self):
+        self.keys.clear()
+
+    def _remove(self, group_id: str, key: Hashable):
+        keys = self.keys.get(group_id)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self.keys[group_id]
 
 
 class ClientCache:
+    """The client cache.
 
-    def __init__(self):
-        self.ttl = 60
-        self.hard_limit = 256
-        self.maxsize = 0
-        self.cache = CacheManager({
-            'users': {
-                'maxsize': self.maxsize
-            },
-            'members': {
-                'maxsize': self.maxsize
-            },
-            'channels': {
-                'maxsize': self.maxsize
-            },
-            'servers': {
-                'maxsize': self.maxsize
-            },
-            'messages': {
-                'ttl': 60 * 60 * 24 * 7,
-                'maxsize': self.maxsize
-            },
-            'roles': {
-                'maxsize': self.maxsize
-            },
-            'emoji': {
-                'maxsize': self.maxsize
-            },
-            'bot': {
-                'maxsize': self.maxsize
-            },
-            'deleted': {
-                'maxsize': self.hard_limit,
-                'ttl': self.ttl
-            }
-        })
+    Args:
+        compact_members (bool): Keep members in a :class:`CompactMemberStore` instead of a regular cache,
+            for bots in very large servers. Members are then built on every read.
+        member_limit (int): Keep at most this many members, evicting the least frequently used ones. 0 is unlimited,
+            the compact store is never bounded. A ``members`` entry in policies takes precedence.
+        policies (Dict[str, CachePolicy]): Eviction, size and ttl settings by namespace, merged over ``DEFAULT_POLICIES``.
+            Namespaces are users, members, channels, servers, messages, roles, emoji and bot.
+        history (Dict[str, HistoryPolicy]): Limits of the previous versions kept for users, members, channels,
+            servers, roles and messages, merged over ``DEFAULT_HISTORY``.
+    """
+    def __init__(self, compact_members: bool = False, member_limit: int = 0, policies: Dict[str, CachePolicy] = None,
+                 history: Dict[str, HistoryPolicy] = None):
+        unknown = (set(policies or ()) - set(NAMESPACES)) | (set(history or ()) - set(HISTORY_NAMESPACES))
+        if unknown:
+            raise ValueError(f"Unknown cache namespaces {', '.join(sorted(unknown))}")
+        self.policies: Dict[str, CachePolicy] = {name: CachePolicy() for name in NAMESPACES}
+        self.policies.update(DEFAULT_POLICIES)
+        if member_limit:
+            self.policies['members'] = CachePolicy(eviction='lfu', maxsize=member_limit)
+        self.policies.update(policies or {})
+        settings = {name: policy.settings() for name, policy in self.policies.items()}
+        self.member_index = CacheIndex(lambda key, value: key[0])
+        self.user_server_index = CacheIndex(lambda key, value: key[1])
+        self.role_index = CacheIndex(lambda key, value: key[0])
+        self.channel_index = CacheIndex(lambda key, value: getattr(value, 'server_id', None))
+        self.message_index = CacheIndex(lambda key, value: key[0])
+        callbacks = {
+            'members': (self._on_member_set, self._on_member_delete, self._on_member_clear),
+            'channels': (self._on_channel_set, self._on_channel_delete, self._on_channel_clear),
+            'messages': (self.message_index.on_set, self.message_index.on_delete, self.message_index.clear),
+            'roles': (self._on_role_set, self._on_role_delete, self._on_role_clear),
+            'servers': (self._on_server_set, self._on_server_delete, self._on_permissions_clear),
+        }
+        for name, (on_set, on_delete, on_clear) in callbacks.items():
+            settings[name].update(on_set=on_set, on_delete=on_delete, on_clear=on_clear)
+        self.cache = CacheManager(settings)
         self.users: "Cache" = self.cache['users']
-        self.members: "Cache" = self.cache['members']
+        # the compact store indexes members by server and user itself, only permissions need telling
+        self.members: "Cache" = CompactMemberStore(
+            on_set=self._on_compact_member_change, on_delete=self._on_compact_member_change,
+            on_clear=self._on_permissions_clear,
+        ) if compact_members else self.cache['members']
+        self.compact_members = compact_members
+        self.resolver: "MemberResolver" = None
+        """When set, members missing from the cache are loaded on demand"""
         self.channels: "Cache" = self.cache['channels']
         self.servers: "Cache" = self.cache['servers']
         self.messages: "Cache" = self.cache['messages']
         self.roles: "Cache" = self.cache['roles']
         self.emoji: "Cache" = self.cache['emoji']
         self.bot: "Cache" = self.cache['bot']
-        self.deleted_members: "Cache" = self.cache["deleted"]
-        self.deleted_messages: "Cache" = self.cache["deleted"]
-        self.deleted_roles: "Cache" = self.cache["deleted"]
-        self.deleted: "Cache" = self.cache["deleted"]
+        self.permissions = PermissionEngine(self)
+        """Cached effective permissions of members"""
+        history = {**DEFAULT_HISTORY, **(history or {})}
+        self.history: Dict[str, HistoryStore] = {
+            name: HistoryStore(history.get(name, HistoryPolicy())) for name in HISTORY_NAMESPACES
+        }
+        """Previous versions of updated and deleted objects, by namespace"""
+        self.deleted_users = self.history['users']
+        self.deleted_members = self.history['members']
+        self.deleted_channels = self.history['channels']
+        self.deleted_servers = self.history['servers']
+        self.deleted_roles = self.history['roles']
+        self.deleted_messages = self.history['messages']
+
+    @property
+    def namespaces(self) -> Dict[str, Union["Cache", CompactMemberStore]]:
+        """The store of every namespace by name"""
+        return {name: self.members if name == 'members' else self.cache[name] for name in NAMESPACES}
+
+    def stats(self, memory: bool = True) -> Dict[str, Dict[str, float]]:
+        """
+        Counters and size of every namespace.
+
+        Args:
+            memory (bool): Include ``bytes``, the approximate memory used, estimated from a sample of the entries
+
+        Returns:
+            ``{namespace: {hits, misses, hit_rate, sets, evictions, expirations, size, bytes}}``, history stores
+            are included as ``<namespace>_history``
+        """
+        stores = dict(self.namespaces)
+        stores.update({f'{name}_history': store for name, store in self.history.items()})
+        stats = {}
+        for name, store in stores.items():
+            counters = store.counters
+            stats[name] = {
+                'hits': counters.hits,
+                'misses': counters.misses,
+                'hit_rate': counters.hit_rate,
+                'sets': counters.sets,
+                'evictions': counters.evictions,
+                'expirations': counters.expirations,
+                'size': len(store),
+            }
+            if memory:
+                stats[name]['bytes'] = store.approximate_bytes()
+        return stats
+
+    def _on_member_set(self, key, value, old_value):
+        self.member_index.on_set(key, value, old_value)
+        self.user_server_index.on_set(key, value, old_value)
+        self.permissions.invalidate_member(*key)
+
+    def _on_member_delete(self, key, value, cause):
+        self.member_index.on_delete(key, value, cause)
+        self.user_server_index.on_delete(key, value, cause)
+        self.permissions.invalidate_member(*key)
+
+    def _on_member_clear(self):
+        self.member_index.clear()
+        self.user_server_index.clear()
+        self.permissions.clear()
+
+    def _on_compact_member_change(self, key, value, old_value_or_cause):
+        self.permissions.invalidate_member(*key)
+
+    def _on_permissions_clear(self):
+        self.permissions.clear()
+
+    def _on_channel_set(self, key, value, old_value):
+        self.channel_index.on_set(key, value, old_value)
+        self.permissions.invalidate_channel(key)
+
+    def _on_channel_delete(self, key, value, cause):
+        self.channel_index.on_delete(key, value, cause)
+        self.permissions.invalidate_channel(key)
+
+    def _on_channel_clear(self):
+        self.channel_index.clear()
+        self.permissions.clear()
+
+    def _on_role_set(self, key, value, old_value):
+        self.role_index.on_set(key, value, old_value)
+        self.permissions.invalidate_server(key[0])
+
+    def _on_role_delete(self, key, value, cause):
+        self.role_index.on_delete(key, value, cause)
+        self.permissions.invalidate_server(key[0])
+
+    def _on_role_clear(self):
+        self.role_index.clear()
+        self.permissions.clear()
+
+    def _on_server_set(self, key, value, old_value):
+        self.permissions.invalidate_server(key)
+
+    def _on_server_delete(self, key, value, cause):
+        self.permissions.invalidate_server(key)
 
     def get_member(self, server_id: str, member_id: str) -> Member:
-        return self.members.get((server_id, member_id))
+        member = self.members.get((server_id, member_id))
+        if member is None and self.resolver is not None:
+            # start loading it so the next lookup is a hit, use fetch_member to wait for it
+            self.resolver.schedule_member(server_id, member_id)
+        return member
+
+    async def fetch_member(self, server_id: str, member_id: str) -> Member:
+        """The member from the cache, loaded from the API when it's missing and on demand loading is enabled"""
+        if self.resolver is None:
+            return self.members.get((server_id, member_id))
+        return await self.resolver.member(server_id, member_id)
+
+    def _member_keys(self, server_id: str) -> List[Hashable]:
+        if self.compact_members:
+            return self.members.server_keys(server_id)
+        return self.member_index.get(server_id)
 
     def get_members(self, server_id: str) -> List[Member]:
-        return [
-            member for member in list(self.members.values())
-            if member.server_id == server_id
-        ]
+        members = [self.members.get(key) for key in self._member_keys(server_id)]
+        return [member for member in members if member is not None]
 
     def get_channel(self, channel_id: str) -> TYPE_ALL_CHANNEL:
         return self.channels.get(channel_id)
 
     def get_channels(self, server_id: str) -> List[TYPE_ALL_CHANNEL]:
-        server = self.get_server(server_id)
-        return server.channels
+        channels = [self.channels.get(key) for key in self.channel_index.get(server_id)]
+        return [channel for channel in channels if channel is not None]
 
     def get_role(self, server_id: str, role_id: str) -> Role:
         return self.roles.get((server_id, role_id))
 
     def get_roles(self, server_id) -> List[Role]:
-        return [
-            role for role in list(self.roles.values())
-            if role.server_id == server_id
-        ]
+        roles = [self.roles.get(key) for key in self.role_index.get(server_id)]
+        return [role for role in roles if role is not None]
 
     def get_server(self, server_id: str) -> Server:
         return self.servers.get(server_id)
@@ -97,18 +259,50 @@ class ClientCache:
     def get_user(self, user_id: str) -> User:
         return self.users.get(user_id)
 
+    def get_user_server_ids(self, user_id: str) -> List[str]:
+        """Ids of the cached servers the user is a member of"""
+        if self.compact_members:
+            return self.members.user_server_ids(user_id)
+        return [server_id for server_id, _ in self.user_server_index.get(user_id)]
+
+    def get_user_servers(self, user_id: str) -> List[Server]:
+        """Cached servers the user is a member of"""
+        servers = [self.servers.get(server_id) for server_id in self.get_user_server_ids(user_id)]
+        return [server for server in servers if server is not None]
+
+    def shared_server_count(self, user_id: str) -> int:
+        """Number of cached servers the user is a member of"""
+        if self.compact_members:
+            return self.members.user_server_count(user_id)
+        return self.user_server_index.count(user_id)
+
     def get_message(self, channel_id: str, message_id: str) -> TextMessage:
         return self.messages.get((channel_id, message_id))
 
+    def get_messages(self, channel_id: str) -> List[TextMessage]:
+        """Cached messages of a channel"""
+        messages = [self.messages.get(key) for key in self.message_index.get(channel_id)]
+        return [message for message in messages if message is not None]
+
+    def delete_channel_messages(self, channel_id: str) -> int:
+        """Remove the cached messages of a channel, returns how many were removed"""
+        return sum(self.messages.delete(key) for key in self.message_index.get(channel_id))
+
+    def delete_channel(self, channel_id: str):
+        """Remove a channel and its messages"""
+        self.delete_channel_messages(channel_id)
+        self.deleted_channels.set(channel_id, self.channels.get(channel_id))
+        self.channels.delete(channel_id)
+
     def get_deleted_member(self, server_id: str, member_id: str) -> Member:
         return self.deleted_members.get((server_id, member_id))
 
     def get_deleted_user(self, user_id: str) -> User:
-        return self.deleted_members.get(user_id)
+        return self.deleted_users.get(user_id)
 
     def delete_user_from_cache(self, user_id: str):
         user = self.get_user(user_id)
-        self.deleted_members.set(user_id, user)
+        self.deleted_users.set(user_id, user)
         self.users.delete(user_id)
 
     def get_deleted_message(self, channel_id: str, message_id: str) -> TextMessage:
@@ -121,17 +315,75 @@ class ClientCache:
         self.messages.delete(keys)
 
     def delete_member_from_cache(self, server_id: str, member_id: str):
-        member = self.get_member(server_id, member_id)
+        member = self.members.get((server_id, member_id))
         self.deleted_members.set((server_id, member_id), member)
         self.members.delete((server_id, member_id))
+        self.permissions.invalidate_member(server_id, member_id)
 
     def delete_role_in_cache(self, server_id: str, role_id: str):
         role = self.get_role(server_id, role_id)
-        self.deleted_roles.set((server_id, role.id), role)
-        self.roles.delete((server_id, role.id))
+        self.deleted_roles.set((server_id, role_id), role)
+        self.roles.delete((server_id, role_id))
 
     def get_deleted_role(self, server_id: str, role_id: str) -> Role:
         return self.deleted_roles.get((server_id, role_id))
 
     def get_deleted_channel(self, channel_id: str) -> TYPE_ALL_CHANNEL:
-        return self.deleted.get(channel_id)
+        return self.deleted_channels.get(channel_id)
+
+    def get_deleted_server(self, server_id: str) -> Server:
+        return self.deleted_servers.get(server_id)
+
+    def patch(self, namespace: str, key: Hashable, data: PyreObject, clear: List[str] = None) -> PyreObject:
+        """
+        Apply an update event to a cached object, only the fields sent in the event are touched.
+
+        The previous version is kept in the namespace's history, for the ``before`` of the event.
+        Member, role, channel and server updates drop the cached permissions they affect.
+
+        Args:
+            namespace (str): The cache namespace, e.g. ``members``
+            key: The cache key of the object
+            data (PyreObject): The event's partial data
+            clear (List[str]): The event's ``clear`` list, see :data:`CLEAR_FIELDS`
+
+        Returns:
+            The updated object, None when it isn't cached
+        """
+        if namespace == 'members':
+            self.permissions.invalidate_member(*key)
+        elif namespace == 'roles':
+            self.permissions.invalidate_server(key[0])
+        elif namespace == 'servers':
+            self.permissions.invalidate_server(key)
+        elif namespace == 'channels':
+            self.permissions.invalidate_channel(key)
+        store = self.namespaces[namespace]
+        current = store.get(key)
+        if current is None:
+            return None
+        clear_fields = CLEAR_FIELDS.get(namespace)
+        before = apply_patch(current, data, clear, clear_fields)
+        if namespace == 'members' and self.compact_members:
+            # the compact store hands out copies, write the changes back
+            store.set(key, current)
+        self.history[namespace].set(key, before, patched_size(before, data, clear, clear_fields))
+        return current
+
+    def purge_server(self, server_id: str):
+        """Remove a server with its members, roles, channels and messages, users left without a shared server are removed too"""
+        for key in self._member_keys(server_id):
+            self.members.delete(key)
+            if not self.shared_server_count(key[1]):
+                self.users.delete(key[1])
+        for role in self.get_roles(server_id):
+            self.roles.delete((server_id, role.id))
+        channel_ids = self.channel_index.get(server_id)
+        server = self.get_server(server_id)
+        if server is not None and server.channel_ids:
+            channel_ids = set(channel_ids).union(server.channel_ids)
+        for channel_id in channel_ids:
+            self.delete_channel(channel_id)
+        self.deleted_servers.set(server_id, server)
+        self.servers.delete(server_id)
+        self.permissions.invalidate_server(server_id)
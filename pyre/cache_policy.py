@@ -0,0 +1,244 @@
+import itertools
+import sys
+import attrs
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Type
+from cacheout import Cache, LFUCache, LRUCache, RemovalCause
+from pydantic import BaseModel
+from .interning import intern_key
+
+NAMESPACES = ('users', 'members', 'channels', 'servers', 'messages', 'roles', 'emoji', 'bot')
+
+
+def approximate_size(value: Any, _depth: int = 0) -> int:
+    """Rough size of a cached value in bytes, counting models, containers and strings it holds"""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, BaseModel):
+        size += sum(approximate_size(item, _depth + 1) for name, item in value.__dict__.items() if name != 'wsclient')
+    elif isinstance(value, dict):
+        size += sum(approximate_size(key, _depth + 1) + approximate_size(item, _depth + 1) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, _depth + 1) for item in value)
+    return size
+
+
+@attrs.define
+class NamespaceStats:
+    """Counters of a cache namespace"""
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    """Entries dropped to stay within maxsize or max_bytes"""
+    expirations: int = 0
+    """Entries dropped because their ttl ran out"""
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class PolicyCacheMixin:
+    """Adds cheap expiry, a byte limit and statistics to a cacheout cache class.
+
+    cacheout checks every entry for expiry on each insert. When all entries use the default
+    ttl they expire in insertion order, so the check stops at the first live entry; setting
+    an entry with another ttl falls back to the full scan. With ``max_bytes`` the approximate
+    size of every entry is tracked and entries are evicted by the cache's policy until the
+    namespace fits. The ids in keys are interned.
+
+    Hits, misses and evictions are read from cacheout's own statistics, which are enabled
+    for every namespace. The mixin hooks into cacheout's private methods, requirements.txt
+    pins the cacheout versions it was written against.
+
+    Args:
+        max_bytes (int): Maximum approximate size of the entries, 0 is unlimited
+        on_clear: Called without arguments after the cache was cleared
+    """
+    def __init__(self, *, max_bytes: int = 0, on_clear: Callable[[], None] = None, **options: Any):
+        self.max_bytes = max_bytes
+        self.on_clear = on_clear
+        options.setdefault('enable_stats', True)
+        super().__init__(**options)
+
+    def setup(self):
+        super().setup()
+        self._expire_times = OrderedDict()
+        self._ordered = True
+        self._sizes: Dict[Hashable, int] = {}
+        self.bytes = 0
+        """Approximate size of the entries, only tracked with max_bytes"""
+        self._counters = NamespaceStats()
+
+    @property
+    def counters(self) -> NamespaceStats:
+        """Counters of the namespace, lookups and evictions as counted by cacheout"""
+        info = self.stats.info()
+        self._counters.hits = info.hit_count
+        self._counters.misses = info.miss_count
+        self._counters.evictions = info.eviction_count
+        return self._counters
+
+    def _set(self, key: Hashable, value: Any, ttl: Any = None):
+        if ttl is not None and ttl != self.ttl:
+            self._ordered = False
+        self._counters.sets += 1
+        # keys repeat the ids held by the cached models, share one copy of them
+        key = intern_key(key)
+        super()._set(key, value, ttl)
+        if self.max_bytes:
+            size = self._sizes[key] = approximate_size(value)
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self._cache) > 1:
+                self._popitem(RemovalCause.FULL)
+
+    def _delete(self, key: Hashable, cause: RemovalCause = None) -> int:
+        count = super()._delete(key, cause)
+        if count and cause == RemovalCause.EXPIRED:
+            self._counters.expirations += 1
+        size = self._sizes.pop(key, None)
+        if size is not None:
+            self.bytes -= size
+        return count
+
+    def _clear(self):
+        super()._clear()
+        self._sizes.clear()
+        self.bytes = 0
+        if self.on_clear is not None:
+            self.on_clear()
+
+    def approximate_bytes(self, sample: int = 100) -> int:
+        """Approximate memory used by the entries, estimated from a sample of them unless max_bytes is set"""
+        if self.max_bytes:
+            return self.bytes + sys.getsizeof(self._cache)
+        entries = list(itertools.islice(self._cache.items(), sample))
+        if not entries:
+            return sys.getsizeof(self._cache)
+        sampled = sum(approximate_size(key) + approximate_size(value) for key, value in entries)
+        return sampled * len(self._cache) // len(entries) + sys.getsizeof(self._cache)
+
+    def _delete_expired(self) -> int:
+        if not self._ordered:
+            return super()._delete_expired()
+        count = 0
+        expires_on = self.timer()
+        while self._expire_times:
+            key, expiration = next(iter(self._expire_times.items()))
+            if expiration > expires_on:
+                break
+            count += self._delete(key, RemovalCause.EXPIRED)
+        return count
+
+
+class PolicyCache(PolicyCacheMixin, Cache):
+    """Evicts the oldest entry first"""
+
+
+class LRUPolicyCache(PolicyCacheMixin, LRUCache):
+    """Evicts the least recently used entry first"""
+
+
+class LFUPolicyCache(PolicyCacheMixin, LFUCache):
+    """Evicts the least frequently used entry first, the one that reached its count first on ties.
+
+    cacheout finds that entry by scanning every access count on each eviction, here the
+    entries are kept in buckets by count so an eviction only looks at the lowest bucket.
+    """
+
+    def setup(self):
+        super().setup()
+        self._counts: Dict[Hashable, int] = {}
+        self._buckets: Dict[int, OrderedDict] = {}
+        self._min_count = 0
+
+    def __next__(self) -> Hashable:
+        if not self._buckets:
+            raise StopIteration
+        # deletes don't move the lowest count, find it again once its bucket is gone
+        if self._min_count not in self._buckets:
+            self._min_count = min(self._buckets)
+        return next(iter(self._buckets[self._min_count]))
+
+    def _touch(self, key: Hashable):
+        count = self._counts.get(key, 0)
+        if count:
+            self._remove_count(key, count)
+        if not count or self._min_count == count and count not in self._buckets:
+            self._min_count = count + 1
+        self._counts[key] = count + 1
+        self._buckets.setdefault(count + 1, OrderedDict())[key] = None
+
+    def _remove_count(self, key: Hashable, count: int):
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+
+    def _delete(self, key: Hashable, cause: RemovalCause = None) -> int:
+        count = super()._delete(key, cause)
+        access_count = self._counts.pop(key, None)
+        if access_count is not None:
+            self._remove_count(key, access_count)
+        return count
+
+    def _clear(self):
+        self._counts.clear()
+        self._buckets.clear()
+        self._min_count = 0
+        super()._clear()
+
+
+class DisabledCache(PolicyCacheMixin, Cache):
+    """A namespace that never stores anything, every lookup is a miss"""
+
+    def _set(self, key: Hashable, value: Any, ttl: Any = None):
+        self._counters.sets += 1
+
+
+EVICTION_CLASSES: Dict[str, Type[Cache]] = {
+    'fifo': PolicyCache,
+    'lru': LRUPolicyCache,
+    'lfu': LFUPolicyCache,
+}
+
+
+@attrs.define
+class CachePolicy:
+    """How a cache namespace is bounded.
+
+    Example::
+
+        PyreClient(token, cache_policies={
+            'messages': CachePolicy(enabled=False),
+            'users': CachePolicy(eviction='lru', maxsize=50000),
+            'members': CachePolicy(eviction='lfu', max_bytes=64 * 1024 * 1024),
+        })
+    """
+    eviction: str = attrs.field(default='fifo', validator=attrs.validators.in_(EVICTION_CLASSES))
+    """Which entry to drop when the namespace is full: ``fifo``, ``lru`` or ``lfu``"""
+    maxsize: int = 0
+    """Maximum number of entries, 0 is unlimited"""
+    max_bytes: int = 0
+    """Maximum approximate size of the entries in bytes, 0 is unlimited"""
+    ttl: float = 0
+    """Seconds an entry is kept after it was set, 0 keeps entries until they are evicted"""
+    enabled: bool = True
+    """Disabled namespaces store nothing"""
+
+    def settings(self) -> Dict[str, Any]:
+        """Options for the cacheout CacheManager"""
+        if not self.enabled:
+            return {'cache_class': DisabledCache}
+        return {'cache_class': EVICTION_CLASSES[self.eviction], 'maxsize': self.maxsize, 'ttl': self.ttl,
+                'max_bytes': self.max_bytes}
+
+
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    'messages': CachePolicy(ttl=60 * 60 * 24 * 7),
+}
+"""Policies used for namespaces that aren't configured, anything else is unlimited"""
@@ -18,7 +18,6 @@ from .models import (
     ServerMemberJoin,
     ServerMemberUpdate,
     ServerMemberLeave,
-    Member,
     UserPlatformWipe,
     UserUpdate,
     ServerRoleUpdate,
@@ -31,13 +30,14 @@ from .models import (
     ServerDelete,
     EVENTS_ALL
 )
-import re
 
-from pydantic_extra_types import color
-from typing import List
+from typing import Dict, List
 
 from .ws import WSClient, DEFAULT_EVENTS
+from .cache_policy import CachePolicy
+from .history import HistoryPolicy
 from .enums import Permissions
+from .metrics import MetricsSink
 from .errors import PermissionError, ValidationError
 from .utils import correct_event_name_formatting
 
@@ -46,10 +46,42 @@ class PyreClient:
     Args:
         token (str): The bot token.
         prefixes (List[str]): The bot prefixes.
+        hydration_concurrency (int): Maximum number of concurrent HTTP requests used to fill the cache on Ready.
+        gateway_format (str): Gateway wire format, ``json`` (fastest installed backend) or ``msgpack``.
+        dispatch_workers (int): Number of workers handling events off the receive loop, 0 handles them inline.
+        queue_size (int): Maximum number of events waiting for a worker.
+        drop_when_full (bool): Drop events when the queue is full instead of pausing the receive loop.
+        reconnect (bool): Reconnect with exponential backoff when the gateway connection drops.
+        heartbeat_interval (float): Seconds between gateway pings.
+        metrics (MetricsSink): Where to record event pipeline timings, e.g. :class:`InMemoryMetrics`. None disables timing.
+        concurrent_bulk (bool): Handle Bulk frames concurrently per channel or server. With dispatch workers the events are
+            spread over the workers by channel or server, and control events in the frame wait for the events before them.
+        compact_members (bool): Store members column-wise to cut memory in very large servers, see :class:`CompactMemberStore`.
+        snapshot_path (str): SQLite file the cache is saved to and restored from on startup, None disables snapshots.
+        snapshot_interval (float): Seconds between snapshot saves while connected, 0 saves only on close.
+        lazy_members (bool): Don't fetch every member on Ready, load members the first time they are looked up.
+            Cache misses return None and start loading the member, ``await cache.fetch_member(...)`` waits for it.
+        member_limit (int): With lazy_members, how many members to keep, the least frequently used ones are evicted.
+        cache_policies (Dict[str, CachePolicy]): Eviction, size and ttl limits per cache namespace, see :class:`CachePolicy`.
+        cache_stats_interval (float): Seconds between cache statistics sent to ``metrics``, see :meth:`ClientCache.stats`.
+        cache_history (Dict[str, HistoryPolicy]): How many previous versions of updated and deleted objects are kept
+            per cache namespace, and for how long, see :class:`HistoryPolicy`.
     """
-    def __init__(self, token: str, prefixes: List[str] = []):
+    def __init__(self, token: str, prefixes: List[str] = [], hydration_concurrency: int = 8, gateway_format: str = 'json',
+                 dispatch_workers: int = 4, queue_size: int = 1000, drop_when_full: bool = False,
+                 reconnect: bool = True, heartbeat_interval: float = 20.0, metrics: MetricsSink = None,
+                 concurrent_bulk: bool = True, compact_members: bool = False, snapshot_path: str = None,
+                 snapshot_interval: float = 300.0, lazy_members: bool = False, member_limit: int = 10000,
+                 cache_policies: Dict[str, CachePolicy] = None, cache_stats_interval: float = 60.0,
+                 cache_history: Dict[str, HistoryPolicy] = None):
         self.token = token
-        self.ws = WSClient(self.token)
+        self.ws = WSClient(self.token, hydration_concurrency=hydration_concurrency, format=gateway_format,
+                           dispatch_workers=dispatch_workers, queue_size=queue_size, drop_when_full=drop_when_full,
+                           reconnect=reconnect, heartbeat_interval=heartbeat_interval, metrics=metrics,
+                           concurrent_bulk=concurrent_bulk, compact_members=compact_members,
+                           snapshot_path=snapshot_path, snapshot_interval=snapshot_interval,
+                           lazy_members=lazy_members, member_limit=member_limit, cache_policies=cache_policies,
+                           cache_stats_interval=cache_stats_interval, cache_history=cache_history)
         self.cache = self.ws.cache
         self.ws.client = self
         self.http = self.ws.http
@@ -67,14 +99,22 @@ class PyreClient:
         """Start the client"""
         asyncio.run(self.astart())
 
-    def listen(self, event: PyreEvent = None):
+    async def close(self):
+        """Disconnect from the gateway and close the HTTP session"""
+        await self.ws.close()
+        await self.http.close()
+
+    def listen(self, event: PyreEvent = None, lazy: bool = False, raw: bool = False):
         """
         The listen function is a decorator that allows you to listen for events.
         It takes in event as an argument, and returns the callback function with the event name and model attached to it.
         The event name is used by Pyre when sending out events, so that only listeners listening for that specific event will be called.
+        Events nobody listens for are dropped before they are parsed.
         
         Args:
             event (PyreEvent): Specify the type of event that will be listened for
+            lazy (bool): Receive a :class:`LazyEvent` view that validates fields only when they are read
+            raw (bool): Receive the raw event dict
         
         Returns:
             A decorator, which is a function that takes in another function and returns it
@@ -88,8 +128,9 @@ class PyreClient:
             event_model = event if event else next((e for e in EVENTS_ALL if e.__name__ == event_name), None)
             if not event_model:
                 raise ValidationError(f'Listener event not found for {callback.__name__}')
-            listener = Listener(name, event_model, callback)
-            self.events.append(listener)
+            view = 'raw' if raw else 'lazy' if lazy else 'model'
+            listener = Listener(name, event_model, callback, view)
+            self.ws.add_listener(listener)
             return callback
         return decorator
     
@@ -154,6 +195,11 @@ class PyreClient:
 
         return decorator
 
+    @property
+    def metrics(self) -> MetricsSink:
+        """The sink receiving event pipeline timings"""
+        return self.ws.metrics
+
     @property
     def user(self) -> User:
         """The client user"""
@@ -180,107 +226,48 @@ class PyreClient:
     
     @register_default_listener(MessageUpdate)
     async def cache_messages_updated(self, event: MessageUpdate):
-        old_msg = self.cache.get_message(event.channel_id,
-                                            event.message_id)
-        new_msg = event.data
-        for n, v in old_msg:
-            attr = getattr(new_msg, n, None)
-            if not attr and hasattr(new_msg, n):
-                setattr(new_msg, n, v)
-
-        keys = (event.channel_id, event.message_id)
-        self.cache.deleted.set(keys, old_msg)
-        self.cache.messages.delete(keys)
-        self.cache.messages.set(keys, new_msg)
+        self.cache.patch('messages', (event.channel_id, event.message_id), event.data)
 
     @register_default_listener(MessageDelete)
     async def cache_messages_deleted(self, event:MessageDelete):
-        self.cache.delete_message_from_cache(event.message_id,
-                                                event.channel_id)
+        self.cache.delete_message_from_cache(event.channel_id,
+                                                event.message_id)
 
     @register_default_listener(ServerMemberJoin)
     async def cache_members_join(self, event:ServerMemberJoin):
-        user = self.http.fetch_user(event.user_id)
-        member = self.http.fetch_member(event.server_id, event.user_id)
-        self.cache.users.set(user['_id'], User(wsclient=self,
-                                                        **user))
-        self.cache.members.set((event.server_id, event.user_id),
-                                Member(wsclient=self, **member))
+        self.ws.resolver.forget_missing(event.server_id, event.user_id)
+        if self.ws.lazy_members:
+            return
+        await self.ws.resolver.member(event.server_id, event.user_id)
     
     @register_default_listener(ServerMemberUpdate)
     async def cache_members_update(self, event:ServerMemberUpdate):
-        old_member = self.cache.get_member(event.ids.server_id,
-                                            event.ids.user_id)
-        new_member = event.data
-        clear = event.clear
-        for n, v in old_member:
-            attr = getattr(new_member, n, None)
-            if not attr and hasattr(new_member, n):
-                setattr(new_member, n, v)
-
-        if 'Avatar' in clear:
-            new_member.avatar_info = new_member.user.avatar_info
-        if 'Nickname' in clear:
-            new_member.nick = new_member.user.username
-
-        keys = (event.ids.server_id, event.ids.user_id)
-        self.cache.deleted.set(keys, old_member)
-        self.cache.members.delete(keys)
-        self.cache.members.set(keys, new_member)
+        self.cache.patch('members', (event.ids.server_id, event.ids.user_id), event.data, event.clear)
 
     @register_default_listener(ServerMemberLeave)
     async def cache_members_leave(self, event:ServerMemberLeave):
-        user = self.cache.get_user(event.user_id)
-        if len(user.servers) <= 1:
-            self.cache.delete_user_from_cache(user.id)
+        if self.cache.shared_server_count(event.user_id) <= 1:
+            self.cache.delete_user_from_cache(event.user_id)
         self.cache.delete_member_from_cache(event.server_id, event.user_id)
 
     @register_default_listener(UserPlatformWipe)
     async def cache_members_platform_wipe(self, event:UserPlatformWipe):
-        for server in self.servers:
-            self.cache.delete_member_from_cache(server.id, event.user_id)
+        for server_id in self.cache.get_user_server_ids(event.user_id):
+            self.cache.delete_member_from_cache(server_id, event.user_id)
         self.cache.delete_user_from_cache(event.user_id)
 
     @register_default_listener(UserUpdate)
     async def cache_users_update(self, event:UserUpdate):
-        old_user = self.cache.get_user(event.user_id)
-        new_user = event.data
-        clear = event.clear
-        for n, v in old_user:
-            attr = getattr(new_user, n, None)
-            if not attr and hasattr(new_user, n):
-                setattr(new_user, n, v)
-
-        if "ProfileContent" in clear:
-            new_user.profile.content = None
-        if "ProfileBackground" in clear:
-            new_user.profile.background = None
-        if "StatusText" in clear:
-            new_user.status.text = None
-        if "Avatar" in clear:
-            new_user.avatar_info = None
-
-        self.cache.deleted.set(event.user_id, old_user)
-        self.cache.users.delete(event.user_id)
-        self.cache.users.set(event.user_id, new_user)
+        self.cache.patch('users', event.user_id, event.data, event.clear)
 
     @register_default_listener(ServerRoleUpdate)
     async def cache_roles_update(self, event: ServerRoleUpdate):
-        old_role = self.cache.get_role(event.server_id, event.role_id)
-        new_role = event.data
-        clear = event.clear
-        if old_role:
-            self.cache.deleted.set((event.server_id, event.role_id),
-                                    old_role)
-            self.cache.roles.delete((event.server_id, event.role_id))
-            for n, v in old_role:
-                attr = getattr(new_role, n, None)
-                if not attr and hasattr(new_role, n):
-                    setattr(new_role, n, v)
-
-        if 'Colour' in clear:
-            new_role.colour = color.Color('ff4655')
-        self.cache.roles.set((event.server_id, event.role_id), new_role)
+        key = (event.server_id, event.role_id)
+        if self.cache.patch('roles', key, event.data, event.clear) is None:
+            # ServerRoleUpdate also announces new roles
+            role = event.data
+            role.id, role.server_id = event.role_id, event.server_id
+            self.cache.roles.set(key, role)
     
     @register_default_listener(ServerRoleDelete)
     async def cache_roles_delete(self, event: ServerRoleDelete):
@@ -292,25 +279,11 @@ class PyreClient:
 
     @register_default_listener(ChannelUpdate)
     async def cache_channels_upddate(self, event:ChannelUpdate):
-        old_channel = self.cache.get_channel(event.channel_id)
-        new_channel = event.data
-        clear = event.clear
-        for n, v in old_channel:
-            attr = getattr(new_channel, n, None)
-            if not attr and hasattr(new_channel, n):
-                setattr(new_channel, n, v)
-
-        if 'Icon' in clear:
-            new_channel.icon = None
-        if 'Description' in clear:
-            new_channel.description = None
-        self.cache.deleted.set(event.channel_id, old_channel)
-        self.cache.channels.delete(event.channel_id)
-        self.cache.channels.set(event.channel_id, new_channel)
+        self.cache.patch('channels', event.channel_id, event.data, event.clear)
 
     @register_default_listener(ChannelDelete)
     async def cache_channels_delete(self, event: ChannelDelete):
-        self.cache.channels.delete(event.channel_id)
+        self.cache.delete_channel(event.channel_id)
 
     @register_default_listener(ServerCreate)
     async def cache_servers_create(self, event: ServerCreate):
@@ -318,38 +291,11 @@ class PyreClient:
 
     @register_default_listener(ServerUpdate)
     async def cache_servers_update(self, event: ServerUpdate):
-        old_server = self.cache.get_server(event.server_id)
-        new_server = event.data
-        clear = event.clear
-        for n, v in old_server:
-            attr = getattr(new_server, n, None)
-            if not attr and hasattr(new_server, n):
-                setattr(new_server, n, v)
-
-        if 'Icon' in clear:
-            new_server.icon = None
-        if 'Banner' in clear:
-            new_server.banner = None
-        if 'Description' in clear:
-            new_server.description = None
-        self.cache.deleted.set(event.server_id, old_server)
-        self.cache.servers.delete(event.server_id)
-        self.cache.servers.set(event.server_id, new_server)
+        self.cache.patch('servers', event.server_id, event.data, event.clear)
 
     @register_default_listener(ServerDelete)
     async def cache_servers_delete(self, event: ServerDelete):
-        server = self.cache.get_server(event.server_id)
-        for member in server.members:
-            self.cache.members.delete((server.id, member.id))
-            if len(member.user.servers) <= 1:
-                self.cache.users.delete(member.id)
-        for channel in server.channels:
-            self.cache.channels.delete(channel.id)
-        for role in server.roles:
-            self.cache.roles.delete((server.id, role.id))
-        for channel in server.channels:
-            idr = r"^[a-zA-Z0-9_-]+$"
-            self.cache.messages.delete_many((channel.id, re.compile(idr)))
+        self.cache.purge_server(event.server_id)
 
     def load_extension(self, extension_name):
         try:
@@ -368,7 +314,7 @@ class PyreClient:
 
     @register_default_listener(MessageCreate)
     async def resolve_command(self, event: MessageCreate):
-        if event.author.bot or event.webhook:
+        if event.webhook:
             return
         content = event.content
         if not content:
@@ -382,10 +328,16 @@ class PyreClient:
                 (cmd for cmd in self.commands if cmd.name == args[0]), None)
             if not command:
                 return
-            if command and not len(command.default_permissions) == len([
-                    perm for perm in event.author.permissions
-                    if perm in command.default_permissions
-            ]):
+            server_id = getattr(event.channel, 'server_id', None)
+            if server_id is None:
+                return
+            # the author isn't cached yet with lazy members, or when it joined while hydrating
+            author = await self.ws.resolver.member(server_id, event.author_id)
+            if author is None or author.bot:
+                return
+            if command.default_permissions and not self.cache.permissions.has(
+                    server_id, event.author_id,
+                    Permissions.set_permissions(command.default_permissions)):
                 raise PermissionError(
                     "You don't have permission to use this command.")
             subcmd = next((cmd for cmd in self.commands
@@ -397,7 +349,7 @@ class PyreClient:
                 args = args[1:]
             ctx = CommandContext(wsclient=self.ws,
                                         command=command,
-                                        server_id=event.server.id,
+                                        server_id=server_id,
                                         author_id=event.author_id,
                                         channel_id=event.channel_id,
                                         message_id=event.id)
@@ -0,0 +1,147 @@
+import json
+
+from typing import Any, Dict, Type
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+TYPE_PREFIX = '{"type":"'
+
+
+class GatewayCodec:
+    """Base class for gateway wire formats.
+
+    Subclasses decode incoming websocket frames into dicts and encode outgoing ones.
+    """
+    format: str = None
+    """The value of the ``format`` query parameter sent to the gateway"""
+    backend: str = None
+    """Name of the library doing the work"""
+
+    def decode(self, message: str | bytes) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def encode(self, data: Dict[str, Any]) -> str | bytes:
+        raise NotImplementedError
+
+    def peek_type(self, message: str | bytes) -> str | None:
+        """The event type read without decoding the frame, None when it can't be read cheaply"""
+        return None
+
+
+class JSONCodec(GatewayCodec):
+    """Base for JSON backends"""
+    format = 'json'
+
+    def peek_type(self, message: str | bytes) -> str | None:
+        # the gateway serialises the type tag first
+        if isinstance(message, str) and message.startswith(TYPE_PREFIX):
+            end = message.find('"', len(TYPE_PREFIX))
+            if end != -1:
+                return message[len(TYPE_PREFIX):end]
+        return None
+
+
+class StdlibJSONCodec(JSONCodec):
+    """Pure Python fallback, always available"""
+    backend = 'json'
+
+    def decode(self, message: str | bytes) -> Dict[str, Any]:
+        return json.loads(message)
+
+    def encode(self, data: Dict[str, Any]) -> str:
+        return json.dumps(data, separators=(',', ':'))
+
+
+class UJSONCodec(JSONCodec):
+    backend = 'ujson'
+
+    def __init__(self):
+        if ujson is None:
+            raise ImportError("ujson is not installed, install it with `pip install ujson`")
+
+    def decode(self, message: str | bytes) -> Dict[str, Any]:
+        return ujson.loads(message)
+
+    def encode(self, data: Dict[str, Any]) -> str:
+        return ujson.dumps(data)
+
+
+class ORJSONCodec(JSONCodec):
+    backend = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed, install it with `pip install orjson`")
+
+    def decode(self, message: str | bytes) -> Dict[str, Any]:
+        return orjson.loads(message)
+
+    def encode(self, data: Dict[str, Any]) -> str:
+        return orjson.dumps(data).decode()
+
+
+class MsgPackCodec(GatewayCodec):
+    """Revolt's binary MessagePack format, frames arrive as bytes"""
+    format = 'msgpack'
+    backend = 'msgpack'
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("msgpack is not installed, install it with `pip install msgpack`")
+
+    def decode(self, message: str | bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(message, raw=False)
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+
+JSON_CODECS: Dict[str, Type[GatewayCodec]] = {
+    'orjson': ORJSONCodec,
+    'ujson': UJSONCodec,
+    'json': StdlibJSONCodec,
+}
+"""JSON backends, fastest first"""
+
+
+def available_json_codec() -> GatewayCodec:
+    """The fastest JSON codec that is installed"""
+    if orjson is not None:
+        return ORJSONCodec()
+    if ujson is not None:
+        return UJSONCodec()
+    return StdlibJSONCodec()
+
+
+def get_codec(format: str = 'json') -> GatewayCodec:
+    """
+    Get a codec for a gateway format.
+
+    Args:
+        format (str): ``json`` to pick the fastest installed JSON backend, ``msgpack`` for MessagePack,
+            or the name of a specific JSON backend (``orjson``, ``ujson``, ``json``)
+
+    Returns:
+        A GatewayCodec instance
+    """
+    if format == 'msgpack':
+        return MsgPackCodec()
+    if format == 'json':
+        return available_json_codec()
+    codec = JSON_CODECS.get(format)
+    if codec is None:
+        raise ValueError(f"Unknown gateway format {format}")
+    return codec()
@@ -0,0 +1,144 @@
+import asyncio
+import time
+import attrs
+
+from typing import Any, Awaitable, Callable, Dict, List
+from .logger import LOG
+
+
+def ordering_key(event: dict) -> Any:
+    """The channel or server an event belongs to, events with the same key are handled in order"""
+    for field in ('channel', 'channel_id'):
+        if field in event:
+            return event[field]
+    ident = event.get('id', event.get('_id', event.get('user_id')))
+    if isinstance(ident, dict):
+        return ident.get('server')
+    return ident
+
+
+@attrs.define(eq=False)
+class DispatchStats:
+    """Counters describing the event queue"""
+    queued: int = 0
+    """Events put on the queue"""
+    processed: int = 0
+    """Events handled by a worker"""
+    dropped: int = 0
+    """Events dropped because the queue was full"""
+    failed: int = 0
+    """Events whose handler raised"""
+    max_depth: int = 0
+    """Highest number of events waiting at once"""
+    total_wait: float = 0.0
+    """Seconds events spent waiting in the queue, summed"""
+    max_wait: float = 0.0
+    """Longest time an event waited in the queue (seconds)"""
+
+    @property
+    def average_wait(self) -> float:
+        """Average time an event waited in the queue (seconds)"""
+        if not self.processed:
+            return 0.0
+        return self.total_wait / self.processed
+
+    def snapshot(self) -> Dict[str, float]:
+        """The counters as a dict"""
+        data = attrs.asdict(self)
+        data['average_wait'] = self.average_wait
+        return data
+
+
+class EventDispatcher:
+    """Bounded event queue drained by a pool of workers.
+
+    Every worker owns a shard of the queue, events are routed to a shard by their
+    ordering key, so events for one channel or server keep their order while a slow
+    listener only holds up its own shard.
+
+    Args:
+        handler: Coroutine function called with every event
+        workers (int): Number of workers
+        maxsize (int): Maximum number of events waiting across all shards
+        drop_when_full (bool): Drop new events when a shard is full instead of waiting for room
+    """
+    def __init__(self, handler: Callable[[dict], Awaitable], workers: int = 4, maxsize: int = 1000, drop_when_full: bool = False):
+        if workers < 1:
+            raise ValueError("The dispatcher needs at least one worker")
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.drop_when_full = drop_when_full
+        self.stats = DispatchStats()
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def depth(self) -> int:
+        """Number of events waiting to be handled"""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Queue statistics including the current depth"""
+        data = self.stats.snapshot()
+        data['depth'] = self.depth
+        return data
+
+    def start(self):
+        """Start the workers, must be called from a running event loop"""
+        if self.running:
+            return
+        shard_size = max(self.maxsize // self.workers, 1) if self.maxsize > 0 else 0
+        self._queues = [asyncio.Queue(shard_size) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+
+    async def stop(self):
+        """Cancel the workers, events still waiting are discarded"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+
+    async def join(self):
+        """Wait until every queued event has been handled"""
+        await asyncio.gather(*[queue.join() for queue in self._queues])
+
+    async def put(self, event: dict):
+        """Queue an event for its shard"""
+        queue = self._queues[hash(ordering_key(event)) % self.workers]
+        item = (time.perf_counter(), event)
+        if self.drop_when_full:
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                self.stats.dropped += 1
+                if self.stats.dropped == 1 or self.stats.dropped % 1000 == 0:
+                    LOG.warning(f"Event queue full, {self.stats.dropped} events dropped so far")
+                return
+        else:
+            await queue.put(item)
+        self.stats.queued += 1
+        depth = self.depth
+        if depth > self.stats.max_depth:
+            self.stats.max_depth = depth
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            queued_at, event = await queue.get()
+            wait = time.perf_counter() - queued_at
+            self.stats.total_wait += wait
+            if wait > self.stats.max_wait:
+                self.stats.max_wait = wait
+            try:
+                await self.handler(event)
+            except Exception as e:
+                self.stats.failed += 1
+                LOG.error(f"Error while handling {event.get('type')} event: {e!r}")
+            finally:
+                self.stats.processed += 1
+                queue.task_done()
@@ -1,5 +1,8 @@
+import functools
+import operator
+
 from enum import Enum
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
 
 class Permissions(Enum):
     """Permissions a user or role may have."""
@@ -65,15 +68,13 @@ class Permissions(Enum):
     @classmethod
     def get_permissions(cls, permissions_value: int) -> List:
         """Permissions from a value"""
-        present_permissions = []
-        for enum_name, enum_value in cls.__members__.items():
-            if permissions_value & enum_value.value > 0:
-                present_permissions.append(cls[enum_name])
-        return present_permissions
+        return list(_members_of(permissions_value & _ALL_PERMISSIONS))
 
     @classmethod
-    def set_permissions(cls, enum_members: List) -> int:
+    def set_permissions(cls, enum_members: Iterable) -> int:
         """Permissions into a value"""
+        if isinstance(enum_members, int):
+            return int(enum_members)
         enum_value = 0
         for enum_member in enum_members:
             enum_value |= enum_member.value
@@ -82,7 +83,96 @@ class Permissions(Enum):
     @classmethod
     def all(cls) -> int:
         """Value of all permissions"""
-        return cls.set_permissions([perm[1] for perm in cls.__members__.items()])
+        return _ALL_PERMISSIONS
+
+
+_PERMISSION_BY_BIT: Dict[int, Permissions] = {permission.value: permission for permission in Permissions}
+_ALL_PERMISSIONS: int = functools.reduce(operator.or_, _PERMISSION_BY_BIT)
+
+
+@functools.lru_cache(maxsize=1024)
+def _members_of(value: int) -> Tuple[Permissions, ...]:
+    # walks the set bits only, lowest first like the enum's definition order
+    members = []
+    while value:
+        bit = value & -value
+        members.append(_PERMISSION_BY_BIT[bit])
+        value ^= bit
+    return tuple(members)
+
+
+class PermissionSet(int):
+    """A set of permissions stored as their bitmask.
+
+    It is an int, so it can be used wherever a permissions value is expected and int
+    arithmetic keeps its meaning. ``|`` and ``&`` also take :class:`Permissions` members
+    and return a set, differences are methods, all without building lists::
+
+        perms = PermissionSet(Permissions.KICK_MEMBERS, Permissions.BAN_MEMBERS)
+        Permissions.KICK_MEMBERS in perms
+        perms | Permissions.TIMEOUT_MEMBERS
+        perms.difference(Permissions.BAN_MEMBERS)
+        perms.issubset(member.permissions_value)
+    """
+    __slots__ = ()
+
+    def __new__(cls, *permissions: Union[int, Permissions, Iterable[Permissions]]):
+        value = 0
+        for permission in permissions:
+            value |= _value_of(permission)
+        return super().__new__(cls, value)
+
+    @classmethod
+    def all(cls) -> "PermissionSet":
+        return cls(_ALL_PERMISSIONS)
+
+    def __contains__(self, permission: Union[int, Permissions]) -> bool:
+        value = _value_of(permission)
+        return self & value == value
+
+    def __iter__(self) -> Iterator[Permissions]:
+        return iter(_members_of(self & _ALL_PERMISSIONS))
+
+    def __len__(self) -> int:
+        return len(_members_of(self & _ALL_PERMISSIONS))
+
+    def __or__(self, other) -> "PermissionSet":
+        return PermissionSet(int(self) | _value_of(other))
+
+    def __and__(self, other) -> "PermissionSet":
+        return PermissionSet(int(self) & _value_of(other))
+
+    __ror__ = __or__
+    __rand__ = __and__
+
+    def difference(self, other: Union[int, Permissions, Iterable[Permissions]]) -> "PermissionSet":
+        """The permissions in this set that aren't in ``other``"""
+        return PermissionSet(int(self) & ~_value_of(other))
+
+    def symmetric_difference(self, other: Union[int, Permissions, Iterable[Permissions]]) -> "PermissionSet":
+        """The permissions in exactly one of this set and ``other``"""
+        return PermissionSet(int(self) ^ _value_of(other))
+
+    def issubset(self, other: Union[int, Permissions, Iterable[Permissions]]) -> bool:
+        return int(self) & ~_value_of(other) == 0
+
+    def issuperset(self, other: Union[int, Permissions, Iterable[Permissions]]) -> bool:
+        value = _value_of(other)
+        return int(self) & value == value
+
+    def __repr__(self) -> str:
+        return f"PermissionSet({'|'.join(permission.name for permission in self) or 0})"
+
+    # int has no __str__ of its own, keep str() and f-strings printing the number
+    __str__ = int.__repr__
+
+
+def _value_of(permissions: Union[int, Permissions, Iterable[Permissions]]) -> int:
+    if isinstance(permissions, int):
+        return int(permissions)
+    if isinstance(permissions, Permissions):
+        return permissions.value
+    return Permissions.set_permissions(permissions)
 
 class UserRemove(Enum):
     AVATAR = 'Avatar'
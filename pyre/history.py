@@ -0,0 +1,148 @@
+import time
+import attrs
+
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, List, Tuple
+from .cache_policy import NamespaceStats, approximate_size
+
+HISTORY_NAMESPACES = ('users', 'members', 'channels', 'servers', 'roles', 'messages')
+
+Version = Tuple[float, Any, int]
+"""When a version was recorded, the object, its approximate size"""
+
+
+@attrs.define
+class HistoryPolicy:
+    """Limits of the history kept for a cache namespace"""
+    max_versions: int = 3
+    """Previous versions kept per key"""
+    max_age: float = 300
+    """Seconds a version is kept, 0 keeps versions until they are evicted"""
+    max_keys: int = 10000
+    """Keys with history, 0 is unlimited"""
+    max_bytes: int = 4 * 1024 * 1024
+    """Approximate size of all versions, 0 is unlimited"""
+    enabled: bool = True
+
+
+class HistoryStore:
+    """Previous versions of the objects of one cache namespace.
+
+    Update and delete listeners record the version being replaced. The keys touched
+    least recently are evicted first, and their oldest versions go first when the store
+    is over its byte limit.
+
+    Args:
+        policy (HistoryPolicy): The limits
+        timer: Clock used for max_age
+    """
+    def __init__(self, policy: HistoryPolicy = None, timer: Callable[[], float] = time.monotonic):
+        self.policy = policy or HistoryPolicy()
+        self.timer = timer
+        self.bytes = 0
+        self.counters = NamespaceStats()
+        self._versions: "OrderedDict[Hashable, Deque[Version]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return bool(self.versions(key))
+
+    def set(self, key: Hashable, value: Any, size: int = None):
+        """
+        Record the previous version of an object.
+
+        Args:
+            key: The cache key
+            value: The previous version
+            size (int): Bytes to charge for it, measured with ``approximate_size`` when not given. Pass it
+                for versions that share most of their data with the live object.
+        """
+        if not self.policy.enabled or value is None:
+            return
+        self.counters.sets += 1
+        versions = self._versions.get(key)
+        if versions is None:
+            versions = self._versions[key] = deque()
+        else:
+            self._versions.move_to_end(key)
+        if size is None:
+            size = approximate_size(value)
+        versions.append((self.timer(), value, size))
+        self.bytes += size
+        while len(versions) > self.policy.max_versions:
+            self._drop_oldest(key, versions, evicted=True)
+        self._evict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """The most recent previous version"""
+        versions = self.versions(key)
+        if not versions:
+            self.counters.misses += 1
+            return default
+        self.counters.hits += 1
+        return versions[-1]
+
+    def versions(self, key: Hashable) -> List[Any]:
+        """Previous versions of an object, oldest first"""
+        versions = self._versions.get(key)
+        if versions is None:
+            return []
+        self._expire(key, versions)
+        return [value for _, value, _ in versions]
+
+    def delete(self, key: Hashable) -> int:
+        versions = self._versions.pop(key, None)
+        if versions is None:
+            return 0
+        self.bytes -= sum(size for _, _, size in versions)
+        return 1
+
+    def clear(self):
+        self._versions.clear()
+        self.bytes = 0
+
+    def keys(self) -> Iterator[Hashable]:
+        return iter(list(self._versions))
+
+    def approximate_bytes(self, sample: int = None) -> int:
+        return self.bytes
+
+    def _expire(self, key: Hashable, versions: Deque[Version]):
+        if not self.policy.max_age:
+            return
+        expires_on = self.timer() - self.policy.max_age
+        while versions and versions[0][0] <= expires_on:
+            self.counters.expirations += 1
+            self._drop_oldest(key, versions)
+
+    def _evict(self):
+        # the least recently recorded key holds the oldest newest-version, stop at the first live one
+        while self._versions and self.policy.max_age:
+            key, versions = next(iter(self._versions.items()))
+            if versions[-1][0] > self.timer() - self.policy.max_age:
+                break
+            self.counters.expirations += len(versions)
+            self.delete(key)
+        while self.policy.max_keys and len(self._versions) > self.policy.max_keys:
+            key = next(iter(self._versions))
+            self.counters.evictions += len(self._versions[key])
+            self.delete(key)
+        while self.policy.max_bytes and self.bytes > self.policy.max_bytes and self._versions:
+            key, versions = next(iter(self._versions.items()))
+            self._drop_oldest(key, versions, evicted=True)
+
+    def _drop_oldest(self, key: Hashable, versions: Deque[Version], evicted: bool = False):
+        _, _, size = versions.popleft()
+        self.bytes -= size
+        if evicted:
+            self.counters.evictions += 1
+        if not versions:
+            del self._versions[key]
+
+
+DEFAULT_HISTORY: Dict[str, HistoryPolicy] = {
+    'messages': HistoryPolicy(max_versions=2, max_age=600, max_keys=20000, max_bytes=16 * 1024 * 1024),
+}
+"""History limits for namespaces that aren't configured, anything else uses HistoryPolicy()"""
@@ -19,6 +19,7 @@ class HTTPClient:
     def __init__(self, token: str):
         self.token = token
         self.base_url = 'https://api.revolt.chat/'
+        self.autumn_url = 'https://autumn.revolt.chat/'
         self.session = httpx.AsyncClient()
         self.client = None
 
@@ -332,7 +333,7 @@ class HTTPClient:
         return await self.request("GET", f'channels/{channel_id}/messages', json=json)
 
     async def upload_file(self, file: models.UploadableFile, tag: Literal["attachments", "avatars", "backgrounds", "icons", "banners", "emojis"] = 'attachments', spoiler: bool = False):
-        url = f'https://autumn.revolt.chat/{tag}'
+        url = f'{self.autumn_url}{tag}'
         headers = {
             "User-Agent": "Pyre"
         }
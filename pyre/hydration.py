@@ -0,0 +1,80 @@
+import asyncio
+
+from typing import Dict, List, Set, TYPE_CHECKING
+from .models import Member, User
+from .logger import LOG
+
+if TYPE_CHECKING:
+    from .ws import WSClient
+
+
+class ReadyHydrator:
+    """Fills the cache with members and users of every server from the Ready payload.
+
+    Member lists are fetched for all servers concurrently, bounded by ``concurrency``
+    in-flight HTTP requests. Users are deduplicated across servers, taken from the
+    member list response when the API includes them and fetched one by one otherwise.
+    Results are written into the cache as soon as each request completes.
+
+    Args:
+        wsclient (WSClient): The websocket client that owns the cache and HTTP client.
+        concurrency (int): Maximum number of HTTP requests running at the same time.
+    """
+    def __init__(self, wsclient: "WSClient", concurrency: int = 8):
+        if concurrency < 1:
+            raise ValueError("Hydration concurrency must be at least 1")
+        self.wsclient = wsclient
+        self.concurrency = concurrency
+        self._semaphore: asyncio.Semaphore = None
+        self._seen_users: Set[str] = set()
+        self._user_tasks: List[asyncio.Task] = []
+
+    @property
+    def cache(self):
+        return self.wsclient.cache
+
+    @property
+    def http(self):
+        return self.wsclient.http
+
+    async def hydrate(self, server_ids: List[str]):
+        """Fetch and cache members and users for the given servers."""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._seen_users = set()
+        self._user_tasks = []
+        await asyncio.gather(*[self._hydrate_server(server_id) for server_id in server_ids])
+        # user fetches are scheduled while member lists arrive, wait for the stragglers
+        while self._user_tasks:
+            tasks, self._user_tasks = self._user_tasks, []
+            await asyncio.gather(*tasks)
+
+    async def _hydrate_server(self, server_id: str):
+        try:
+            async with self._semaphore:
+                response = await self.http.fetch_members(server_id)
+        except Exception as e:
+            LOG.error(f'Failed to fetch members of server {server_id}: {e}')
+            return
+
+        users: Dict[str, dict] = {user['_id']: user for user in response.get('users') or []}
+        client = self.wsclient.client
+        for member in response.get('members') or []:
+            user_id = member['_id']['user']
+            self.cache.members.set((server_id, user_id), Member(wsclient=client, **member))
+            if user_id in self._seen_users:
+                continue
+            self._seen_users.add(user_id)
+            user = users.get(user_id)
+            if user:
+                self.cache.users.set(user_id, User(wsclient=client, **user))
+            else:
+                self._user_tasks.append(asyncio.create_task(self._hydrate_user(user_id)))
+
+    async def _hydrate_user(self, user_id: str):
+        try:
+            async with self._semaphore:
+                user = await self.http.fetch_user(user_id)
+        except Exception as e:
+            LOG.error(f'Failed to fetch user {user_id}: {e}')
+            return
+        self.cache.users.set(user['_id'], User(wsclient=self.wsclient.client, **user))
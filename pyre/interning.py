@@ -0,0 +1,44 @@
+import sys
+
+from typing import Annotated, Any, Hashable, List
+from pydantic import AfterValidator
+
+
+def intern_id(value: Any) -> Any:
+    """The process wide copy of an id string, anything else is returned as is"""
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def intern_ids(values: Any) -> Any:
+    """Intern the ids of a list in place"""
+    if isinstance(values, list):
+        for index, value in enumerate(values):
+            if type(value) is str:
+                values[index] = sys.intern(value)
+    return values
+
+
+def intern_keys(mapping: Any) -> Any:
+    """A copy of a dict keyed by ids, with the keys interned"""
+    if isinstance(mapping, dict):
+        return {intern_id(key): value for key, value in mapping.items()}
+    return mapping
+
+
+def intern_key(key: Hashable) -> Hashable:
+    """Intern a cache key, an id or a tuple of ids"""
+    if type(key) is str:
+        return sys.intern(key)
+    if type(key) is tuple:
+        return tuple(intern_id(part) for part in key)
+    return key
+
+
+Id = Annotated[str, AfterValidator(intern_id)]
+"""A ULID stored once per process, however many models and cache keys refer to it"""
+IdList = Annotated[List[str], AfterValidator(intern_ids)]
+"""A list of interned ULIDs"""
+IdKeyed = Annotated[Any, AfterValidator(intern_keys)]
+"""A dict keyed by ULIDs, such as channel role overrides, with the keys interned"""
@@ -0,0 +1,283 @@
+import math
+import sys
+
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from .cache_policy import NamespaceStats
+from .models import Member, MemberIds
+
+MemberKey = Tuple[str, str]
+NAN = float('nan')
+
+
+def _to_timestamp(value: Optional[datetime]) -> float:
+    if value is None:
+        return NAN
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _from_timestamp(value: float) -> Optional[datetime]:
+    if math.isnan(value):
+        return None
+    return datetime.fromtimestamp(value, timezone.utc)
+
+
+class _ServerColumns:
+    """Members of one server stored column-wise, a member is a row number"""
+    __slots__ = ('rows', 'joined_at', 'nicks', 'roles', 'free')
+
+    def __init__(self):
+        self.rows: Dict[str, int] = {}
+        self.joined_at = array('d')
+        self.nicks: List[Optional[str]] = []
+        self.roles: List[Optional[Tuple[str, ...]]] = []
+        self.free: List[int] = []
+
+
+class CompactMemberStore:
+    """Memory efficient replacement for the ``members`` cache namespace.
+
+    Members are kept per server in columns: join time as a float array, nickname and
+    role ids as references to interned strings and shared tuples, rarely set fields
+    (avatar, timeout) in sparse dicts. A :class:`Member` is built only when one is read,
+    so changes to a returned member have to be written back with ``set``.
+
+    Building a member costs several times a lookup in the regular store, so the most
+    recently read members are kept built, up to ``view_cache`` of them. Writing or
+    deleting a member drops its built copy.
+
+    It implements the parts of the cacheout ``Cache`` API that the client uses, and
+    also answers the per-server and per-user lookups that the cache indexes provide
+    for the regular store.
+
+    Args:
+        on_set: Called with ``(key, value, old_value)`` after a member is set, like cacheout's callback.
+            The previous member isn't rebuilt, old_value is always None.
+        on_delete: Called with ``(key, value, cause)`` after a member is deleted, value and cause are None.
+        on_clear: Called without arguments after the store was cleared.
+        view_cache: How many built members to keep for repeated reads, 0 builds one on every read.
+    """
+
+    def __init__(self, on_set: Callable[[MemberKey, Member, Any], None] = None,
+                 on_delete: Callable[[MemberKey, Any, Any], None] = None, on_clear: Callable[[], None] = None,
+                 view_cache: int = 1024):
+        self.on_set = on_set
+        self.on_delete = on_delete
+        self.on_clear = on_clear
+        self.view_cache = view_cache
+        self._views: "OrderedDict[MemberKey, Member]" = OrderedDict()
+        self.client = None
+        self.servers: Dict[str, _ServerColumns] = {}
+        self.user_servers: Dict[str, str | Tuple[str, ...]] = {}
+        self.avatars: Dict[MemberKey, Any] = {}
+        self.timeouts: Dict[MemberKey, float] = {}
+        self._role_sets: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._size = 0
+        self.counters = NamespaceStats()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: MemberKey) -> bool:
+        return self.has(key)
+
+    def size(self) -> int:
+        return self._size
+
+    def has(self, key: MemberKey) -> bool:
+        columns = self.servers.get(key[0])
+        return columns is not None and key[1] in columns.rows
+
+    def set(self, key: MemberKey, value: Member, ttl: Any = None):
+        server_id, user_id = sys.intern(key[0]), sys.intern(key[1])
+        self.counters.sets += 1
+        self._views.pop((server_id, user_id), None)
+        if value.wsclient is not None:
+            self.client = value.wsclient
+        columns = self.servers.get(server_id)
+        if columns is None:
+            columns = self.servers[server_id] = _ServerColumns()
+        row = columns.rows.get(user_id)
+        if row is None:
+            if columns.free:
+                row = columns.free.pop()
+            else:
+                row = len(columns.nicks)
+                columns.joined_at.append(NAN)
+                columns.nicks.append(None)
+                columns.roles.append(None)
+            columns.rows[user_id] = row
+            self._add_user_server(user_id, server_id)
+            self._size += 1
+        columns.joined_at[row] = _to_timestamp(value.joined_at)
+        columns.nicks[row] = value.nick
+        if value.role_ids is None:
+            columns.roles[row] = None
+        else:
+            role_ids = tuple(sys.intern(role_id) for role_id in value.role_ids)
+            columns.roles[row] = self._role_sets.setdefault(role_ids, role_ids)
+        key = (server_id, user_id)
+        if value.avatar_info is not None:
+            self.avatars[key] = value.avatar_info
+        else:
+            self.avatars.pop(key, None)
+        if value.timeout is not None:
+            self.timeouts[key] = _to_timestamp(value.timeout)
+        else:
+            self.timeouts.pop(key, None)
+        if self.on_set is not None:
+            self.on_set(key, value, None)
+
+    def get(self, key: MemberKey, default: Any = None) -> Member:
+        view = self._views.get(key)
+        if view is not None:
+            self._views.move_to_end(key)
+            self.counters.hits += 1
+            return view
+        server_id, user_id = key
+        columns = self.servers.get(server_id)
+        row = columns.rows.get(user_id) if columns is not None else None
+        if row is None:
+            self.counters.misses += 1
+            return default
+        self.counters.hits += 1
+        view = self._view(columns, row, server_id, user_id)
+        if self.view_cache:
+            self._views[key] = view
+            if len(self._views) > self.view_cache:
+                self._views.popitem(last=False)
+        return view
+
+    def get_many(self, keys: List[MemberKey]) -> Dict[MemberKey, Member]:
+        found = {}
+        for key in keys:
+            member = self.get(key)
+            if member is not None:
+                found[key] = member
+        return found
+
+    def delete(self, key: MemberKey) -> int:
+        server_id, user_id = key
+        columns = self.servers.get(server_id)
+        if columns is None:
+            return 0
+        row = columns.rows.pop(user_id, None)
+        if row is None:
+            return 0
+        self._views.pop(key, None)
+        columns.joined_at[row] = NAN
+        columns.nicks[row] = None
+        columns.roles[row] = None
+        columns.free.append(row)
+        if not columns.rows:
+            del self.servers[server_id]
+        self.avatars.pop(key, None)
+        self.timeouts.pop(key, None)
+        self._remove_user_server(user_id, server_id)
+        self._size -= 1
+        if self.on_delete is not None:
+            self.on_delete(key, None, None)
+        return 1
+
+    def delete_many(self, keys: List[MemberKey]) -> int:
+        return sum(self.delete(key) for key in keys)
+
+    def clear(self):
+        self.servers.clear()
+        self.user_servers.clear()
+        self.avatars.clear()
+        self.timeouts.clear()
+        self._role_sets.clear()
+        self._views.clear()
+        self._size = 0
+        if self.on_clear is not None:
+            self.on_clear()
+
+    def keys(self) -> Iterator[MemberKey]:
+        for server_id, columns in list(self.servers.items()):
+            for user_id in list(columns.rows):
+                yield server_id, user_id
+
+    def values(self) -> Iterator[Member]:
+        for _, member in self.items():
+            yield member
+
+    def items(self) -> Iterator[Tuple[MemberKey, Member]]:
+        for server_id, columns in list(self.servers.items()):
+            for user_id, row in list(columns.rows.items()):
+                # the caller may have let members leave since the rows were listed, skip freed rows
+                if columns.rows.get(user_id) != row:
+                    continue
+                yield (server_id, user_id), self._view(columns, row, server_id, user_id)
+
+    def approximate_bytes(self, sample: int = None) -> int:
+        """Memory used by the store's own containers, the interned ids are shared with the rest of the cache"""
+        size = sys.getsizeof(self.servers) + sys.getsizeof(self.user_servers) + sys.getsizeof(self.avatars)
+        size += sys.getsizeof(self.timeouts) + sys.getsizeof(self._role_sets) + sys.getsizeof(self._views)
+        size += sum(sys.getsizeof(server_ids) for server_ids in self.user_servers.values() if isinstance(server_ids, tuple))
+        for columns in self.servers.values():
+            size += sys.getsizeof(columns.rows) + sys.getsizeof(columns.joined_at) + sys.getsizeof(columns.nicks)
+            size += sys.getsizeof(columns.roles) + sys.getsizeof(columns.free)
+            # small ints are shared, larger row numbers are objects of their own
+            size += sum(sys.getsizeof(row) for row in columns.rows.values() if row > 256)
+        return size
+
+    def server_keys(self, server_id: str) -> List[MemberKey]:
+        """Keys of the members of a server"""
+        columns = self.servers.get(server_id)
+        if columns is None:
+            return []
+        return [(server_id, user_id) for user_id in columns.rows]
+
+    def user_server_ids(self, user_id: str) -> List[str]:
+        """Ids of the servers a user is a member of"""
+        server_ids = self.user_servers.get(user_id)
+        if server_ids is None:
+            return []
+        if isinstance(server_ids, str):
+            return [server_ids]
+        return list(server_ids)
+
+    def user_server_count(self, user_id: str) -> int:
+        server_ids = self.user_servers.get(user_id)
+        if server_ids is None:
+            return 0
+        if isinstance(server_ids, str):
+            return 1
+        return len(server_ids)
+
+    def _add_user_server(self, user_id: str, server_id: str):
+        # most users share a single server with the bot, store that without a container
+        server_ids = self.user_servers.get(user_id)
+        if server_ids is None:
+            self.user_servers[user_id] = server_id
+        elif isinstance(server_ids, str):
+            self.user_servers[user_id] = (server_ids, server_id)
+        else:
+            self.user_servers[user_id] = server_ids + (server_id,)
+
+    def _remove_user_server(self, user_id: str, server_id: str):
+        server_ids = self.user_servers.get(user_id)
+        if server_ids is None or server_ids == server_id:
+            self.user_servers.pop(user_id, None)
+            return
+        server_ids = tuple(other for other in server_ids if other != server_id)
+        self.user_servers[user_id] = server_ids[0] if len(server_ids) == 1 else server_ids
+
+    def _view(self, columns: _ServerColumns, row: int, server_id: str, user_id: str) -> Member:
+        key = (server_id, user_id)
+        role_ids = columns.roles[row]
+        timeout = self.timeouts.get(key)
+        return Member.model_construct(
+            wsclient=self.client,
+            ids=MemberIds.model_construct(wsclient=self.client, server_id=server_id, user_id=user_id),
+            joined_at=_from_timestamp(columns.joined_at[row]),
+            nick=columns.nicks[row],
+            avatar_info=self.avatars.get(key),
+            role_ids=list(role_ids) if role_ids is not None else None,
+            timeout=_from_timestamp(timeout) if timeout is not None else None,
+        )
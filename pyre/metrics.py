@@ -0,0 +1,102 @@
+import bisect
+
+from typing import Dict, List, Tuple
+
+DECODE = 'decode'
+"""Decoding a gateway frame"""
+MODEL = 'model'
+"""Building the event model"""
+CACHE_LISTENER = 'cache_listener'
+"""Running one of the default cache listeners"""
+LISTENER = 'listener'
+"""Running a user listener"""
+
+BUCKETS: List[float] = [1e-6 * 2 ** i for i in range(25)]
+"""Upper bounds of the histogram buckets in seconds, 1us doubling up to ~16s"""
+
+
+class Histogram:
+    """Latency histogram with exponential buckets"""
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the bucket holding the given percentile"""
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class MetricsSink:
+    """Receives pipeline timings, subclass it to export them elsewhere"""
+
+    def observe(self, stage: str, event_type: str, seconds: float, listener: str = None):
+        """Record how long a stage took for an event type, listener is set for listener stages"""
+        raise NotImplementedError
+
+    def cache_stats(self, stats: Dict[str, Dict[str, float]]):
+        """Receive the periodic :meth:`ClientCache.stats` snapshot, ignored unless overridden"""
+
+
+class InMemoryMetrics(MetricsSink):
+    """Keeps a histogram per stage, event type and listener"""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self.cache: Dict[str, Dict[str, float]] = {}
+        """The last cache statistics received"""
+
+    def observe(self, stage: str, event_type: str, seconds: float, listener: str = None):
+        key = (stage, event_type, listener)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def cache_stats(self, stats: Dict[str, Dict[str, float]]):
+        self.cache = stats
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict]]:
+        """Histogram summaries as ``{stage: {event_type or "event_type:listener": summary}}``, plus the cache statistics under ``cache``"""
+        data = {'cache': self.cache} if self.cache else {}
+        for (stage, event_type, listener), histogram in self.histograms.items():
+            name = f'{event_type}:{listener}' if listener else event_type
+            data.setdefault(stage, {})[name] = histogram.snapshot()
+        return data
+
+    def reset(self):
+        self.histograms.clear()
+        self.cache = {}
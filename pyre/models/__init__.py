@@ -14,5 +14,6 @@ from .emoji import *
 from .client_events import *
 from .command import *
 from .context import BaseContext, CommandContext
+from .lazy import LazyEvent
 
 EVENTS_ALL = EVENTS + SYS_EVENTS_LIST + CL_ERRS
\ No newline at end of file
@@ -23,8 +23,8 @@ def delete_key(dict_key:str, d: Dict):
 class PyreObject(BaseModel):
     """The base object meant to be used by all objects"""
     model_config = ConfigDict(arbitrary_types_allowed=True)
-    wsclient: Any = Field(repr=False, default=None)
-    """The bot client, used only for internal purposes"""
+    wsclient: Any = Field(repr=False, default=None, exclude=True)
+    """The bot client, used only for internal purposes, never serialised"""
     
     @property
     def client(self) -> "PyreClient":
@@ -1,19 +1,20 @@
-from typing import Optional, Any, List, Tuple, Union
+from typing import Optional, List, Tuple, Union
 from pydantic import Field as field
 from .base import PyreObject, SendableObject
 from .file import File
+from pyre.interning import Id, IdKeyed
 
 
 class BaseChannel(PyreObject):
     event_type: str = field(alias='type', repr=False, default=None)
     channel_type: str = None
-    id: str = field(alias='_id', default=None)
+    id: Id = field(alias='_id', default=None)
 
 class BaseTextChannel(SendableObject):
     """Base channel for text channels"""
     event_type: str = field(alias='type', repr=False, default=None)
     channel_type: str = None
-    id: str = field(alias='_id', default=None)
+    id: Id = field(alias='_id', default=None)
 
 class SavedMessage(BaseChannel):
     user_id: str = field(alias='user', default=None)
@@ -47,14 +48,25 @@ class RolePermission(PyreObject):
     role_id: Optional[str] = None
 
 
+def _role_permissions(channel) -> Optional[List[RolePermission]]:
+    """The channel's role overrides, the cached channel's come from the client's permission engine"""
+    if channel.role_perms is None:
+        return None
+    cache = getattr(channel.wsclient, 'cache', None)
+    if cache is not None and cache.channels.get(channel.id) is channel:
+        return cache.permissions.role_permissions(channel.id)
+    return [RolePermission(wsclient=channel.wsclient, role_id=role_id, **override)
+            for role_id, override in channel.role_perms.items()]
+
+
 class TextChannel(BaseTextChannel):
-    server_id: str = field(alias="server", default=None)
+    server_id: Id = field(alias="server", default=None)
     name: str = None
     description: Optional[str] = None
     icon: Optional[File] = None
     last_message_id: str = None
     default_permissions: Optional[DefaultPermission] = None
-    role_perms: Optional[Any] = field(alias='role_permissions',
+    role_perms: Optional[IdKeyed] = field(alias='role_permissions',
                                              default=None)
     nsfw: Optional[bool] = False
 
@@ -64,28 +76,16 @@ class TextChannel(BaseTextChannel):
 
     @property
     def role_permissions(self) -> List[RolePermission]:
-        if self.role_perms is None:
-            return None
-        else:
-            perms_list = []
-            perms_dict = self.role_perms
-            role_ids = perms_dict.keys()
-            for role_id in role_ids:
-                role_dict = perms_dict.get(role_id)
-                perms_list.append(
-                    RolePermission(wsclient=self.wsclient,
-                                   role_id=role_id,
-                                   **role_dict))
-            return perms_list
+        return _role_permissions(self)
 
 
 class VoiceChannel(BaseChannel):
-    server_id: str = field(alias="server", default=None)
+    server_id: Id = field(alias="server", default=None)
     name: str = None
     description: Optional[str] = None
     icon: Optional[File] = None
     default_permissions: Optional[DefaultPermission] = None
-    role_perms: Optional[Any] = field(alias='role_permissions',
+    role_perms: Optional[IdKeyed] = field(alias='role_permissions',
                                              default=None)
     nsfw: Optional[bool] = False
 
@@ -95,19 +95,7 @@ class VoiceChannel(BaseChannel):
 
     @property
     def role_permissions(self) -> List[RolePermission]:
-        if self.role_perms is None:
-            return None
-        else:
-            perms_list = []
-            perms_dict = self.role_perms
-            role_ids = perms_dict.keys()
-            for role_id in role_ids:
-                role_dict = perms_dict.get(role_id)
-                perms_list.append(
-                    RolePermission(wsclient=self.wsclient,
-                                   role_id=role_id,
-                                   **role_dict))
-            return perms_list
+        return _role_permissions(self)
 
 
 TYPE_ALL_CHANNEL = Union[TextChannel, DMChannel, VoiceChannel, GroupChannel,
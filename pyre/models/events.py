@@ -10,14 +10,15 @@ from .user import Member, MemberIds, User, RelationshipStatus
 from .file import File, UPLOADABLE_TYPE
 from .role import Role
 from .emoji import ServerParent
+from pyre.interning import Id, IdList
 
 
 class MessageCreate(PyreEvent):
     """Dispatched when a message is created"""
     event_type: str = field(alias='type', repr=False)
-    id: str = field(alias='_id')
-    channel_id: str = field(alias="channel")
-    author_id: str = field(alias='author')
+    id: Id = field(alias='_id')
+    channel_id: Id = field(alias="channel")
+    author_id: Id = field(alias='author')
     nonce: Optional[str] = None
     webhook: Optional[Webhook] = None
     content: Optional[str] = None
@@ -25,8 +26,8 @@ class MessageCreate(PyreEvent):
     attachments: Optional[List[File]] = None
     edited: Optional[datetime] = None
     embeds: Optional[List[EMBEDS]] = None
-    mentions: Optional[List[str]] = None
-    replies: Optional[List[str]] = None
+    mentions: Optional[IdList] = None
+    replies: Optional[IdList] = None
     reactions: Optional[List[Any]] = None
     interactions: Optional[Interactions] = None
     masquerade: Masquerade = None
@@ -131,7 +132,7 @@ class ChannelUpdate(ChanelEvent):
 
     @property
     def before(self) -> TYPE_ALL_CHANNEL:
-        return self.client.cache.deleted.get(self.channel_id)
+        return self.client.cache.get_deleted_channel(self.channel_id)
 
     @property
     def after(self) -> TYPE_ALL_CHANNEL:
@@ -187,6 +188,14 @@ class ServerUpdate(ServerEvent):
     data: Server = None
     clear: List[str] = None
 
+    @property
+    def before(self) -> Server:
+        return self.client.cache.get_deleted_server(self.server_id)
+
+    @property
+    def after(self) -> Server:
+        return self.client.cache.get_server(self.server_id)
+
 
 class ServerDelete(ServerEvent):
     event_type: str = field(alias='type', repr=False)
@@ -267,7 +276,7 @@ class UserUpdate(PyreEvent):
 
     @property
     def before(self) -> User:
-        return self.client.cache.get_deleted_user()
+        return self.client.cache.get_deleted_user(self.user_id)
 
 
 class UserRelationship(PyreEvent):
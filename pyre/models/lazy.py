@@ -0,0 +1,90 @@
+import types
+
+from typing import Any, Dict, Tuple, Type
+from pydantic import TypeAdapter
+from .base import PyreObject
+
+_ADAPTERS: Dict[Tuple[type, str], TypeAdapter] = {}
+_MISSING = object()
+
+
+def _field_adapter(model: Type[PyreObject], name: str) -> TypeAdapter:
+    adapter = _ADAPTERS.get((model, name))
+    if adapter is None:
+        adapter = _ADAPTERS[(model, name)] = TypeAdapter(model.model_fields[name].annotation)
+    return adapter
+
+
+def _bind(value: Any, client: Any):
+    # the parent model's validator hands the client down, a field validated on its own misses it
+    if isinstance(value, PyreObject):
+        value.wsclient = client
+        for _, item in value:
+            _bind(item, client)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _bind(item, client)
+
+
+class LazyEvent:
+    """A read-only view of an event that validates a field only when it is first read.
+
+    Fields, properties and methods of the event model are available as usual. Anything
+    the view cannot resolve by itself falls back to the fully validated model, which is
+    built at most once.
+
+    Args:
+        model: The event model class
+        payload (dict): The raw event
+        client: The bot client
+    """
+    __slots__ = ('_model', '_payload', '_values', '_full')
+
+    def __init__(self, model: Type[PyreObject], payload: dict, client: Any = None):
+        self._model = model
+        self._payload = payload
+        self._values = {'wsclient': client}
+        self._full = None
+
+    @property
+    def raw(self) -> dict:
+        """The event as received from the gateway"""
+        return self._payload
+
+    @property
+    def full(self) -> PyreObject:
+        """The fully validated event model"""
+        if self._full is None:
+            self._full = self._model(wsclient=self._values['wsclient'], **self._payload)
+        return self._full
+
+    def __getattr__(self, name: str):
+        values = self._values
+        value = values.get(name, _MISSING)
+        if value is not _MISSING:
+            return value
+        model = self._model
+        field = model.model_fields.get(name)
+        if field is None:
+            attr = getattr(model, name, None)
+            if isinstance(attr, property):
+                return attr.fget(self)
+            if isinstance(attr, types.FunctionType):
+                return types.MethodType(attr, self)
+            return getattr(self.full, name)
+        key = field.alias or name
+        if key in self._payload:
+            try:
+                value = _field_adapter(model, name).validate_python(self._payload[key])
+                if values['wsclient'] is not None:
+                    _bind(value, values['wsclient'])
+            except Exception:
+                # forward references and validators that need the whole model
+                value = getattr(self.full, name)
+        else:
+            value = field.get_default(call_default_factory=True)
+        values[name] = value
+        return value
+
+    def __repr__(self) -> str:
+        return f'<Lazy{self._model.__name__} {self._payload!r}>'
@@ -1,5 +1,6 @@
 import attrs
-from typing import Any
+import inspect
+from typing import Any, Tuple
 import re
 
 def to_snake_case(model_name):
@@ -25,3 +26,11 @@ class Listener:
     """The event object."""
     callback: callable = attrs.field(repr=False)
     """The callback function."""
+    view: str = attrs.field(default='model', repr=False)
+    """How the event is passed to the callback: ``model``, ``lazy`` or ``raw``."""
+    parameters: Tuple[str, ...] = attrs.field(init=False, repr=False)
+    """Names of the callback parameters, resolved once at registration."""
+
+    @parameters.default
+    def _resolve_parameters(self):
+        return tuple(inspect.signature(self.callback).parameters)
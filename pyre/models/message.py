@@ -3,6 +3,7 @@ from datetime import datetime
 from pydantic import Field as field, FilePath
 from pydantic_extra_types import color
 from .base import PyreObject
+from pyre.interning import Id, IdList
 from .system_events import SYS_EVENT_MSGS
 from .file import UPLOADABLE_TYPE, File
 from .embed import EMBEDS, Embed
@@ -49,9 +50,9 @@ class PartialMessage(PyreObject):
 
 
 class TextMessage(PyreObject):
-    id: str = field(alias='_id', default=None)
-    channel_id: str = field(alias='channel', default=None)
-    author_id: str = field(alias='author', default=None)
+    id: Id = field(alias='_id', default=None)
+    channel_id: Id = field(alias='channel', default=None)
+    author_id: Id = field(alias='author', default=None)
     nonce: Optional[str] = None
     webhook: Optional[PartialWebhook] = None
     content: Optional[str] = None
@@ -59,8 +60,8 @@ class TextMessage(PyreObject):
     attachments: Optional[List[File]] = None
     edited: Optional[datetime] = None
     embeds: Optional[List[EMBEDS]] = None
-    mentions: Optional[List[str]] = None
-    replies: Optional[List[str]] = None
+    mentions: Optional[IdList] = None
+    replies: Optional[IdList] = None
     reactions: Optional[List[Any]] = None
     interactions: Optional[Interactions] = None
     masquerade: Masquerade = None
@@ -2,7 +2,8 @@ from typing import Optional, List, TYPE_CHECKING
 from pydantic import Field as field
 from pydantic_extra_types import color
 from .base import PyreObject
-from pyre.enums import Permissions
+from pyre.enums import Permissions, PermissionSet
+from pyre.interning import Id
 if TYPE_CHECKING:
     from .server import Server
 
@@ -21,8 +22,8 @@ class BaseRole(PyreObject):
 
 
 class Role(BaseRole):
-    id: str = None
-    server_id: str = None
+    id: Id = None
+    server_id: Id = None
 
     @property
     def server(self) -> "Server":
@@ -39,17 +40,14 @@ class Role(BaseRole):
         """List of denied permissions"""
         return Permissions.get_permissions(self.permissions_override.d)
 
+    @property
+    def permissions_value(self) -> PermissionSet:
+        """The server's default permissions with the role's overrides applied, as a bitmask"""
+        server = self.server
+        default = (server.default_permissions or 0) if server is not None else 0
+        return PermissionSet((default | self.permissions_override.a) & ~self.permissions_override.d)
+
     @property
     def permissions(self) -> List[Permissions]:
         """Role permissions"""
-        if self.is_owner:
-            all_val = Permissions.all()
-            return Permissions.get_permissions(all_val)
-        allows = []
-        server_default_perms = Permissions.get_permissions(
-            self.server.default_permissions)
-        allows += server_default_perms
-        for perm in self.allowed_permissions:
-            if perm not in allows:
-                allows.append(perm)
-        return [perm for perm in allows if perm not in self.denied_permissions]
\ No newline at end of file
+        return Permissions.get_permissions(self.permissions_value)
\ No newline at end of file
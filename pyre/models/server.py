@@ -2,6 +2,7 @@ from typing import Optional, Any, List, TYPE_CHECKING
 from datetime import datetime
 from pydantic import Field as field
 from .base import PyreObject
+from pyre.interning import Id, IdKeyed, IdList
 from .role import Role
 from .file import File
 from .channel import SERVER_CHANNELS
@@ -10,21 +11,21 @@ if TYPE_CHECKING:
 
 
 class Category(PyreObject):
-    id: str
+    id: Id
     title: str
-    channels: List[str]
+    channels: IdList
 
 
 class Server(PyreObject):
-    id: str = field(alias='_id', default=None)
-    owner_id: str = field(alias='owner', default=None)
+    id: Id = field(alias='_id', default=None)
+    owner_id: Id = field(alias='owner', default=None)
     name: str = None
-    channel_ids: List[str] = field(alias='channels', default=None)
+    channel_ids: IdList = field(alias='channels', default=None)
     default_permissions: int = None
     description: Optional[str] = None
     categs: Optional[Any] = field(alias='categories', default=None)
     system_messages: Optional[Any] = None
-    raw_roles: Optional[Any] = field(alias='roles', default=None)
+    raw_roles: Optional[IdKeyed] = field(alias='roles', default=None)
     icon: Optional[File] = None
     banner: Optional[File] = None
     flags: Optional[int] = None
@@ -42,7 +43,7 @@ class Server(PyreObject):
 
     @property
     def roles(self) -> List[Role]:
-        roles = self.client.cache.getraw_roles(self.id)
+        roles = self.client.cache.get_roles(self.id)
         return sorted(roles, key=lambda role: role.rank)
 
     @property
@@ -50,10 +51,33 @@ class Server(PyreObject):
         return self.client.cache.get_members(self.id)
     
     def get_member(self, member_id:str) -> "Member":
-        return next((i for i in self.members if i.id == member_id), None)
+        return self.client.cache.get_member(self.id, member_id)
+
+    async def fetch_member(self, member_id: str) -> "Member":
+        """The member from the cache, or from the API when lazy member loading is enabled"""
+        return await self.client.cache.fetch_member(self.id, member_id)
     
-    def get_role(self, role_id:str):
-        return next((i for i in self.roles if i.id == role_id), None)
+    def get_role(self, role_id:str) -> Role:
+        return self.client.cache.get_role(self.id, role_id)
     
-    def get_channel(self, channel_id):
-        return next((i for i in self.channels if i.id == channel_id), None)
\ No newline at end of file
+    def get_channel(self, channel_id) -> SERVER_CHANNELS:
+        channel = self.client.cache.get_channel(channel_id)
+        if channel is not None and getattr(channel, 'server_id', None) == self.id:
+            return channel
+        return None
+
+    def get_members(self, member_ids: List[str]) -> List["Member"]:
+        """Members with the given ids, in the same order, ids that aren't cached are skipped"""
+        found = self.client.cache.members.get_many([(self.id, member_id) for member_id in member_ids])
+        return [found[(self.id, member_id)] for member_id in member_ids if (self.id, member_id) in found]
+
+    def get_roles(self, role_ids: List[str]) -> List[Role]:
+        """Roles with the given ids, in the same order, ids that aren't cached are skipped"""
+        found = self.client.cache.roles.get_many([(self.id, role_id) for role_id in role_ids])
+        return [found[(self.id, role_id)] for role_id in role_ids if (self.id, role_id) in found]
+
+    def get_channels(self, channel_ids: List[str]) -> List[SERVER_CHANNELS]:
+        """Channels of this server with the given ids, in the same order, ids that aren't cached are skipped"""
+        found = self.client.cache.channels.get_many(list(channel_ids))
+        return [found[channel_id] for channel_id in channel_ids
+                if channel_id in found and getattr(found[channel_id], 'server_id', None) == self.id]
\ No newline at end of file
@@ -3,7 +3,8 @@ from datetime import datetime
 from pydantic import Field as field, WrapValidator
 from .base import PyreObject
 from .file import File
-from pyre.enums import Permissions
+from pyre.enums import Permissions, PermissionSet
+from pyre.interning import Id, IdList
 if TYPE_CHECKING:
     from .server import Server
     from .role import Role
@@ -25,7 +26,7 @@ class UserProfile(PyreObject):
 
 
 class User(PyreObject):
-    id: Optional[str] = field(alias='_id', default=None)
+    id: Optional[Id] = field(alias='_id', default=None)
     username: Optional[str] = None
     discriminator: Optional[str] = None
     display_name: Optional[str] = None
@@ -50,11 +51,7 @@ class User(PyreObject):
     @property
     def servers(self) -> List["Server"]:
         """Servers the user and bot share"""
-        all_servers = self.client.cache.get_servers()
-        servers = []
-        for server in all_servers:
-            if self.client.cache.get_member(server.id, self.id):
-                servers.append(server)
+        servers = self.client.cache.get_user_servers(self.id)
         if servers:
             return servers
         return None
@@ -74,14 +71,14 @@ class BotUser(PyreObject):
 
 
 class MemberIds(PyreObject):
-    server_id: str = field(alias='server')
-    user_id: str = field(alias='user')
+    server_id: Id = field(alias='server')
+    user_id: Id = field(alias='user')
 
 
 class PartialMember(PyreObject):
     nickname: Optional[str] = None
     avatar_info: Optional[File] = field(alias='avatar', default=None)
-    role_ids: Optional[List[str]] = field(alias='roles', default=None)
+    role_ids: Optional[IdList] = field(alias='roles', default=None)
     timeout: Optional[datetime] = None
 
 class Member(PyreObject):
@@ -89,7 +86,7 @@ class Member(PyreObject):
     joined_at: datetime = None
     nick: Optional[str] = field(alias="nickname", default=None)
     avatar_info: Optional[File] = field(alias='avatar', default=None)
-    role_ids: Optional[List[str]] = field(alias='roles', default=None)
+    role_ids: Optional[IdList] = field(alias='roles', default=None)
     timeout: Optional[datetime] = None
 
     @property
@@ -100,7 +97,9 @@ class Member(PyreObject):
 
     @property
     def avatar(self) -> str:
-        """Avatar url"""
+        """Avatar url, the user's avatar when the member has none"""
+        if self.avatar_info is None:
+            return self.user.avatar
         return f'https://autumn.revolt.chat/avatars/{self.avatar_info.id}'
 
     @property
@@ -116,7 +115,8 @@ class Member(PyreObject):
     @property
     def bot(self) -> bool:
         """Is member a bot"""
-        if self.user.bot:
+        user = self.user
+        if user is not None and user.bot:
             return True
         return False
 
@@ -140,17 +140,27 @@ class Member(PyreObject):
     @property
     def roles(self) -> List["Role"]:
         roles = [self.client.cache.get_role(
-            self.server_id, role_id) for role_id in self.role_ids]
-        return sorted(roles, key=lambda role: role.rank)
+            self.server_id, role_id) for role_id in self.role_ids or ()]
+        return sorted([role for role in roles if role is not None], key=lambda role: role.rank)
+
+    @property
+    def permissions_value(self) -> PermissionSet:
+        """Members effective permissions as a bitmask, cached until the member, its roles or the server change"""
+        return PermissionSet(self.client.cache.permissions.mask(self.server_id, self.id))
 
     @property
     def permissions(self) -> List[Permissions]:
         """Members allowed permissions"""
-        if self.is_owner:
-            all_val = Permissions.all()
-            return Permissions.get_permissions(all_val)
-        allows = []
-        for role in self.roles:
-            for perm in role.permissions:
-                if perm not in allows:
-                    allows.append(perm)
+        return Permissions.get_permissions(self.permissions_value)
+
+    def has_permissions(self, *permissions: Permissions) -> bool:
+        """Whether the member has all of the given permissions"""
+        return self.client.cache.permissions.has(self.server_id, self.id, Permissions.set_permissions(permissions))
+
+    def permissions_in(self, channel_id: str) -> List[Permissions]:
+        """Members permissions in a channel of the server, with the channel's overrides applied"""
+        return Permissions.get_permissions(self.client.cache.permissions.channel_mask(channel_id, self.id))
+
+    def has_channel_permissions(self, channel_id: str, *permissions: Permissions) -> bool:
+        """Whether the member has all of the given permissions in a channel"""
+        return self.client.cache.permissions.has_in_channel(channel_id, self.id, Permissions.set_permissions(permissions))
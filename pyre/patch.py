@@ -0,0 +1,105 @@
+import sys
+
+from typing import Dict, Iterable
+from pydantic import BaseModel
+from .logger import LOG
+
+CLEAR_FIELDS: Dict[str, Dict[str, str]] = {
+    'users': {
+        'Avatar': 'avatar_info',
+        'DisplayName': 'display_name',
+        'StatusText': 'status.text',
+        'StatusPresence': 'status.presence',
+        'ProfileContent': 'profile.content',
+        'ProfileBackground': 'profile.background',
+    },
+    'members': {
+        'Avatar': 'avatar_info',
+        'Nickname': 'nick',
+        'Roles': 'role_ids',
+        'Timeout': 'timeout',
+    },
+    'channels': {
+        'Icon': 'icon',
+        'Description': 'description',
+        'DefaultPermissions': 'default_permissions',
+    },
+    'servers': {
+        'Icon': 'icon',
+        'Banner': 'banner',
+        'Description': 'description',
+        'Categories': 'categs',
+        'SystemMessages': 'system_messages',
+    },
+    'roles': {
+        'Colour': 'colour',
+    },
+}
+"""The field each ``clear`` value of an update event resets, by cache namespace. Dotted paths reach into nested models."""
+
+
+def apply_patch(model: BaseModel, data: BaseModel, clear: Iterable[str] = None,
+                clear_fields: Dict[str, str] = None) -> BaseModel:
+    """
+    Apply a partial update onto a cached model in place.
+
+    Only the fields present in the update payload are copied, cleared fields are reset to
+    their defaults. Nested models are replaced rather than changed, so the returned copy
+    keeps the previous state.
+
+    Args:
+        model: The cached model
+        data: The update payload parsed into a model, its explicitly set fields are applied
+        clear: The ``clear`` list of the event
+        clear_fields: Maps ``clear`` values to field paths, see :data:`CLEAR_FIELDS`
+
+    Returns:
+        A shallow copy of the model from before the update
+    """
+    before = model.model_copy()
+    fields = type(model).model_fields
+    for name in data.model_fields_set:
+        if name != 'wsclient' and name in fields:
+            setattr(model, name, getattr(data, name))
+    for item in clear or ():
+        path = (clear_fields or {}).get(item)
+        if path is None:
+            LOG.debug(f'Unknown clear field {item} for {type(model).__name__}')
+            continue
+        _reset(model, path)
+    return before
+
+
+def patched_size(before: BaseModel, data: BaseModel, clear: Iterable[str] = None,
+                 clear_fields: Dict[str, str] = None) -> int:
+    """
+    Bytes owned by the copy :func:`apply_patch` returned.
+
+    The copy shares every field it didn't have replaced with the live model, so only the
+    model, its field dict and the replaced values are counted, each shallowly.
+    """
+    names = set(data.model_fields_set)
+    for item in clear or ():
+        path = (clear_fields or {}).get(item)
+        if path is not None:
+            names.add(path.partition('.')[0])
+    fields = type(before).model_fields
+    size = sys.getsizeof(before) + sys.getsizeof(before.__dict__)
+    return size + sum(sys.getsizeof(getattr(before, name)) for name in names if name != 'wsclient' and name in fields)
+
+
+def _reset(model: BaseModel, path: str):
+    name, _, rest = path.partition('.')
+    field = type(model).model_fields.get(name)
+    if field is None:
+        return
+    if not rest:
+        setattr(model, name, field.get_default(call_default_factory=True))
+        return
+    child = getattr(model, name)
+    if child is None:
+        return
+    # copy the nested model so the previous version isn't changed with it
+    child = child.model_copy()
+    _reset(child, rest)
+    setattr(model, name, child)
@@ -0,0 +1,206 @@
+import attrs
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from .enums import Permissions
+from .models import Role, Server, TYPE_ALL_CHANNEL
+from .models.channel import RolePermission
+
+if TYPE_CHECKING:
+    from .cache import ClientCache
+
+
+def apply_override(mask: int, allow: int, deny: int) -> int:
+    """Grant the allowed bits, then remove the denied ones"""
+    return (mask | allow) & ~deny
+
+
+def server_permissions(server: Server, user_id: str, roles: Iterable[Role]) -> int:
+    """
+    Effective permissions of a member in a server as a bitmask.
+
+    Starts from the server's default permissions and applies the overrides of the member's
+    roles from the lowest ranked to the highest, a lower ``rank`` value ranks higher.
+    The owner has every permission.
+
+    Args:
+        server (Server): The server
+        user_id (str): The member's user id
+        roles (Iterable[Role]): The member's roles, in any order
+    """
+    if user_id == server.owner_id:
+        return Permissions.all()
+    mask = server.default_permissions or 0
+    for role in sorted(roles, key=lambda role: role.rank or 0, reverse=True):
+        mask = apply_override(mask, role.permissions_override.a, role.permissions_override.d)
+    return mask
+
+
+@attrs.frozen
+class ChannelOverrides:
+    """The permission overrides of a server channel, compiled to bitmasks"""
+    server_id: str
+    allow: int = 0
+    """Allowed for everyone by the channel's default permissions"""
+    deny: int = 0
+    """Denied for everyone by the channel's default permissions"""
+    roles: Dict[str, Tuple[int, int]] = attrs.field(factory=dict)
+    """``(allow, deny)`` by role id"""
+
+    @classmethod
+    def compile(cls, channel: TYPE_ALL_CHANNEL) -> "ChannelOverrides":
+        default = getattr(channel, 'default_permissions', None)
+        role_perms = getattr(channel, 'role_perms', None) or {}
+        return cls(
+            server_id=channel.server_id,
+            allow=default.a if default is not None else 0,
+            deny=default.d if default is not None else 0,
+            roles={role_id: (override.get('a', 0), override.get('d', 0)) for role_id, override in role_perms.items()},
+        )
+
+    def apply(self, mask: int, roles: Iterable[Role]) -> int:
+        """
+        Apply the overrides to a member's server permissions.
+
+        Args:
+            mask (int): The member's server permissions
+            roles (Iterable[Role]): The member's roles, in any order
+        """
+        mask = apply_override(mask, self.allow, self.deny)
+        if self.roles:
+            for role in sorted(roles, key=lambda role: role.rank or 0, reverse=True):
+                override = self.roles.get(role.id)
+                if override is not None:
+                    mask = apply_override(mask, *override)
+        # nothing in a channel the member can't see
+        if not mask & Permissions.VIEW_CHANNEL.value:
+            return 0
+        return mask
+
+
+class PermissionEngine:
+    """Effective permissions of members in servers and channels, cached per member as bitmasks.
+
+    Masks are computed on first use. The cache drops a member's masks when the member
+    changes, a channel's masks when the channel changes, and every mask of a server when
+    the server or one of its roles changes, so a check is a dict lookup and an AND.
+    Channel overrides are compiled once per channel version, and so are the
+    :class:`RolePermission` models channels hand out.
+
+    Args:
+        cache (ClientCache): The cache the servers, roles, channels and members are read from
+    """
+    def __init__(self, cache: "ClientCache"):
+        self.cache = cache
+        self._masks: Dict[str, Dict[str, int]] = {}
+        self._channel_masks: Dict[str, Dict[str, Dict[str, int]]] = {}
+        """``{server_id: {user_id: {channel_id: mask}}}``"""
+        self._overrides: Dict[str, ChannelOverrides] = {}
+        self._role_permissions: Dict[str, List[RolePermission]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(masks) for masks in self._masks.values())
+
+    def mask(self, server_id: str, user_id: str) -> int:
+        """The member's permissions, 0 when the server isn't cached"""
+        masks = self._masks.get(server_id)
+        if masks is not None:
+            mask = masks.get(user_id)
+            if mask is not None:
+                return mask
+        server = self.cache.servers.get(server_id)
+        if server is None:
+            return 0
+        member = self.cache.members.get((server_id, user_id))
+        mask = server_permissions(server, user_id, self._roles(server_id, member))
+        # without the member only the defaults are known, don't keep them
+        if member is not None:
+            self._masks.setdefault(server_id, {})[user_id] = mask
+        return mask
+
+    def has(self, server_id: str, user_id: str, required: int) -> bool:
+        """Whether the member has every permission in the ``required`` mask"""
+        return self.mask(server_id, user_id) & required == required
+
+    def overrides(self, channel_id: str) -> Optional[ChannelOverrides]:
+        """The compiled overrides of a server channel, None when the channel isn't cached"""
+        overrides = self._overrides.get(channel_id)
+        if overrides is None:
+            channel = self.cache.channels.get(channel_id)
+            if channel is None or getattr(channel, 'server_id', None) is None:
+                return None
+            overrides = self._overrides[channel_id] = ChannelOverrides.compile(channel)
+        return overrides
+
+    def role_permissions(self, channel_id: str) -> Optional[List[RolePermission]]:
+        """The role overrides of a cached server channel as models, built from its compiled overrides"""
+        permissions = self._role_permissions.get(channel_id)
+        if permissions is None:
+            overrides = self.overrides(channel_id)
+            if overrides is None:
+                return None
+            client = self.cache.channels.get(channel_id).wsclient
+            permissions = self._role_permissions[channel_id] = [
+                RolePermission(wsclient=client, role_id=role_id, a=allow, d=deny)
+                for role_id, (allow, deny) in overrides.roles.items()
+            ]
+        return list(permissions)
+
+    def channel_mask(self, channel_id: str, user_id: str) -> int:
+        """The member's permissions in a server channel, 0 when the channel or its server isn't cached"""
+        overrides = self.overrides(channel_id)
+        if overrides is None:
+            return 0
+        server_id = overrides.server_id
+        masks = self._channel_masks.get(server_id, {}).get(user_id)
+        if masks is not None:
+            mask = masks.get(channel_id)
+            if mask is not None:
+                return mask
+        server = self.cache.servers.get(server_id)
+        if server is None:
+            return 0
+        if user_id == server.owner_id:
+            return Permissions.all()
+        member = self.cache.members.get((server_id, user_id))
+        roles = self._roles(server_id, member)
+        mask = overrides.apply(self.mask(server_id, user_id), roles)
+        if member is not None:
+            self._channel_masks.setdefault(server_id, {}).setdefault(user_id, {})[channel_id] = mask
+        return mask
+
+    def has_in_channel(self, channel_id: str, user_id: str, required: int) -> bool:
+        """Whether the member has every permission in the ``required`` mask in a channel"""
+        return self.channel_mask(channel_id, user_id) & required == required
+
+    def _roles(self, server_id: str, member) -> list:
+        role_ids = member.role_ids if member is not None else None
+        if not role_ids:
+            return []
+        roles = self.cache.roles.get_many([(server_id, role_id) for role_id in role_ids])
+        return [role for role in roles.values() if role is not None]
+
+    def invalidate_member(self, server_id: str, user_id: str):
+        masks = self._masks.get(server_id)
+        if masks is not None:
+            masks.pop(user_id, None)
+        masks = self._channel_masks.get(server_id)
+        if masks is not None:
+            masks.pop(user_id, None)
+
+    def invalidate_channel(self, channel_id: str):
+        self._role_permissions.pop(channel_id, None)
+        overrides = self._overrides.pop(channel_id, None)
+        if overrides is None:
+            return
+        for masks in self._channel_masks.get(overrides.server_id, {}).values():
+            masks.pop(channel_id, None)
+
+    def invalidate_server(self, server_id: str):
+        self._masks.pop(server_id, None)
+        self._channel_masks.pop(server_id, None)
+
+    def clear(self):
+        self._masks.clear()
+        self._channel_masks.clear()
+        self._overrides.clear()
+        self._role_permissions.clear()
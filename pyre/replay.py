@@ -0,0 +1,164 @@
+import asyncio
+import gzip
+import re
+import struct
+import time
+import attrs
+
+from typing import Any, Callable, Dict, Iterator, List, Tuple, TYPE_CHECKING
+from .http import HTTPClient
+from .logger import LOG
+
+if TYPE_CHECKING:
+    from .client import PyreClient
+
+MAGIC = b'PYREREC1'
+RECORD = struct.Struct('<dBI')
+"""Offset from the start of the recording (seconds), frame kind, payload length"""
+TEXT, BINARY = 0, 1
+
+
+class GatewayRecorder:
+    """Writes raw gateway frames with their arrival time to a gzip compressed file.
+
+    Args:
+        path (str): File to write to, it is overwritten
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = 0
+        self._file = gzip.open(path, 'wb')
+        self._file.write(MAGIC)
+        self._start = time.monotonic()
+
+    def record(self, message: str | bytes, offset: float = None):
+        """Append a frame to the recording, offset defaults to the time since the recording started"""
+        if offset is None:
+            offset = time.monotonic() - self._start
+        if isinstance(message, str):
+            kind, payload = TEXT, message.encode()
+        else:
+            kind, payload = BINARY, message
+        self._file.write(RECORD.pack(offset, kind, len(payload)))
+        self._file.write(payload)
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "GatewayRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, str | bytes]]:
+    """Yield ``(offset, frame)`` pairs from a recording"""
+    with gzip.open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a Pyre gateway recording")
+        while True:
+            header = file.read(RECORD.size)
+            if not header:
+                return
+            offset, kind, length = RECORD.unpack(header)
+            payload = file.read(length)
+            yield offset, payload.decode() if kind == TEXT else payload
+
+
+def write_recording(path: str, frames: List[str | bytes], rate: float = None):
+    """Write prepared frames as a recording, spaced ``1 / rate`` seconds apart when rate is given"""
+    with GatewayRecorder(path) as recorder:
+        for index, frame in enumerate(frames):
+            recorder.record(frame, index / rate if rate else 0.0)
+
+
+class StubHTTPClient(HTTPClient):
+    """HTTPClient that answers every request locally instead of calling the API.
+
+    Responses for the routes used by the cache are synthesised from the path,
+    anything else returns an empty dict. Extra routes can be added with ``routes``,
+    a mapping of regex to a function taking the match and returning the response.
+    """
+    def __init__(self, token: str = 'stub', routes: Dict[str, Callable[[re.Match], Any]] = None):
+        super().__init__(token)
+        self.calls = 0
+        self.routes: List[Tuple[re.Pattern, Callable[[re.Match], Any]]] = [
+            (re.compile(pattern), handler) for pattern, handler in (routes or {}).items()
+        ]
+        self.routes += [
+            (re.compile(r'^users/@me$'), lambda m: {'_id': 'stub', 'username': 'stub', 'bot': {'owner': 'stub'}}),
+            (re.compile(r'^users/([^/]+)$'), lambda m: {'_id': m[1], 'username': m[1]}),
+            (re.compile(r'^servers/([^/]+)/members/([^/]+)$'), lambda m: {'_id': {'server': m[1], 'user': m[2]}}),
+            (re.compile(r'^servers/([^/]+)/members$'), lambda m: {'members': [], 'users': []}),
+        ]
+
+    async def request(self, method: str, path: str, *args, **kwargs):
+        self.calls += 1
+        for pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                return handler(match)
+        return {}
+
+
+@attrs.define(eq=False)
+class ReplayResult:
+    frames: int = 0
+    """Frames fed to the client"""
+    errors: int = 0
+    """Frames whose handling raised"""
+    elapsed: float = 0.0
+    """Seconds from the first frame until every event was handled"""
+    http_calls: int = 0
+    """Requests answered by the stub"""
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+
+class GatewayReplayer:
+    """Feeds a recording through ``WSClient.handle_message``.
+
+    Args:
+        client (PyreClient): The client to replay into, its HTTP client is replaced by a stub
+        path (str): The recording
+        speed (float): Playback speed, 1 is real time, 2 twice as fast, 0 or None as fast as possible
+        http (HTTPClient): The HTTP client to install, a StubHTTPClient by default
+    """
+    def __init__(self, client: "PyreClient", path: str, speed: float = 1.0, http: HTTPClient = None):
+        self.client = client
+        self.path = path
+        self.speed = speed
+        self.http = http or StubHTTPClient()
+        self.http.client = client
+        client.http = client.ws.http = self.http
+
+    async def replay(self) -> ReplayResult:
+        ws = self.client.ws
+        result = ReplayResult()
+        failed = 0
+        if ws.dispatcher:
+            ws.dispatcher.start()
+            failed = ws.dispatcher.stats.failed
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for offset, message in read_recording(self.path):
+            if self.speed:
+                delay = start + offset / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            result.frames += 1
+            try:
+                await ws.handle_message(message)
+            except Exception as e:
+                result.errors += 1
+                LOG.debug(f"Replayed frame failed: {e!r}")
+        if ws.dispatcher:
+            await ws.dispatcher.join()
+            result.errors += ws.dispatcher.stats.failed - failed
+        result.elapsed = loop.time() - start
+        result.http_calls = getattr(self.http, 'calls', 0)
+        return result
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, TYPE_CHECKING
+from .models import Member, User
+from .logger import LOG
+
+if TYPE_CHECKING:
+    from .ws import WSClient
+
+
+class MemberResolver:
+    """Loads members and users that are missing from the cache.
+
+    Concurrent requests for the same member or user share one HTTP request, and the
+    result is written into the cache so later lookups are served from memory.
+    Failed lookups resolve to None and are remembered for ``missing_ttl`` seconds, so members
+    that left and webhook authors don't cost a request on every message.
+
+    Args:
+        wsclient (WSClient): The websocket client that owns the cache and HTTP client.
+        missing_ttl (float): Seconds a failed lookup is not retried, 0 retries every time.
+    """
+    def __init__(self, wsclient: "WSClient", missing_ttl: float = 60.0):
+        self.wsclient = wsclient
+        self.missing_ttl = missing_ttl
+        self.timer: Callable[[], float] = time.monotonic
+        self.requests = 0
+        """HTTP requests made"""
+        self.coalesced = 0
+        """Lookups that joined a request already in flight"""
+        self.skipped = 0
+        """Lookups answered from the failed lookups without a request"""
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._missing: "OrderedDict[Hashable, float]" = OrderedDict()
+        """When each failed lookup may be retried, in expiry order"""
+
+    @property
+    def cache(self):
+        return self.wsclient.cache
+
+    @property
+    def http(self):
+        return self.wsclient.http
+
+    async def member(self, server_id: str, user_id: str) -> Member:
+        """The cached member, fetched together with its user when it isn't cached"""
+        member = self.cache.members.get((server_id, user_id))
+        if member is not None:
+            return member
+        key = ('member', server_id, user_id)
+        if self._is_missing(key):
+            return None
+        return await self._coalesce(key, self._fetch_member, server_id, user_id)
+
+    async def user(self, user_id: str) -> User:
+        """The cached user, fetched when it isn't cached"""
+        user = self.cache.users.get(user_id)
+        if user is not None:
+            return user
+        key = ('user', user_id)
+        if self._is_missing(key):
+            return None
+        return await self._coalesce(key, self._fetch_user, user_id)
+
+    def schedule_member(self, server_id: str, user_id: str):
+        """Start loading a member in the background, does nothing outside of a running event loop
+        or when the member was recently not found"""
+        if self._is_missing(('member', server_id, user_id)):
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        asyncio.ensure_future(self.member(server_id, user_id))
+
+    def forget_missing(self, server_id: str, user_id: str):
+        """Allow a member that was not found to be looked up again, e.g. when it joins"""
+        self._missing.pop(('member', server_id, user_id), None)
+        self._missing.pop(('user', user_id), None)
+
+    def _is_missing(self, key: Hashable) -> bool:
+        now = self.timer()
+        # every entry has the same ttl, so they expire in insertion order
+        while self._missing:
+            oldest, retry_at = next(iter(self._missing.items()))
+            if retry_at > now:
+                break
+            del self._missing[oldest]
+        if key in self._missing:
+            self.skipped += 1
+            return True
+        return False
+
+    def _remember_missing(self, key: Hashable):
+        if self.missing_ttl:
+            self._missing.pop(key, None)
+            self._missing[key] = self.timer() + self.missing_ttl
+
+    async def _coalesce(self, key: Hashable, fetch: Callable[..., Awaitable[Any]], *args) -> Any:
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.ensure_future(fetch(*args))
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self.coalesced += 1
+        # a cancelled caller must not cancel the request other callers are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch_member(self, server_id: str, user_id: str) -> Member:
+        self.requests += 1
+        try:
+            data, _ = await asyncio.gather(self.http.fetch_member(server_id, user_id), self.user(user_id))
+        except Exception as e:
+            LOG.debug(f'Failed to fetch member {user_id} of server {server_id}: {e!r}')
+            return None
+        if '_id' not in data:
+            # API errors come back as a body like {"type": "NotFound"}
+            LOG.debug(f'Failed to fetch member {user_id} of server {server_id}: {data.get("type")}')
+            self._remember_missing(('member', server_id, user_id))
+            return None
+        member = Member(wsclient=self.wsclient.client, **data)
+        self.cache.members.set((server_id, user_id), member)
+        return member
+
+    async def _fetch_user(self, user_id: str) -> User:
+        self.requests += 1
+        try:
+            data = await self.http.fetch_user(user_id)
+        except Exception as e:
+            LOG.debug(f'Failed to fetch user {user_id}: {e!r}')
+            return None
+        if '_id' not in data:
+            LOG.debug(f'Failed to fetch user {user_id}: {data.get("type")}')
+            self._remember_missing(('user', user_id))
+            return None
+        user = User(wsclient=self.wsclient.client, **data)
+        self.cache.users.set(user_id, user)
+        return user
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+from typing import Any, Dict, List, Tuple, TYPE_CHECKING
+from .models import User, Member, Role, Server, TextChannel, VoiceChannel
+from .logger import LOG
+
+if TYPE_CHECKING:
+    from .cache import ClientCache
+    from .client import PyreClient
+
+SNAPSHOT_VERSION = 1
+"""Bumped whenever the stored layout or the models change in a way old snapshots can't be read"""
+NAMESPACES = ('servers', 'roles', 'channels', 'users', 'members')
+"""Cache namespaces kept in a snapshot, in the order they are loaded"""
+MODELS = {model.__name__: model for model in (User, Member, Role, Server, TextChannel, VoiceChannel)}
+
+Row = Tuple[str, str, str, str]
+
+
+class CacheSnapshot:
+    """Stores the cached users, members, roles, channels and servers in a SQLite file.
+
+    Loading a snapshot before connecting lets the client skip fetching members of
+    servers it already knows, the Ready payload is then only used to reconcile servers
+    and channels. Events missed while the bot was offline are not replayed, so member
+    details may be stale until they are updated again.
+
+    Args:
+        path (str): The snapshot file, it is replaced on every save
+        max_age (float): Ignore snapshots older than this many seconds, None accepts any age
+        chunk (int): Entries serialised by ``asave`` before it lets the event loop run again
+    """
+    def __init__(self, path: str, max_age: float = None, chunk: int = 500):
+        self.path = path
+        self.max_age = max_age
+        self.chunk = chunk
+
+    def dump(self, cache: "ClientCache") -> List[Row]:
+        """Serialise the cache into ``(namespace, key, model, data)`` rows"""
+        rows = []
+        for namespace in NAMESPACES:
+            for key, value in getattr(cache, namespace).items():
+                self._append(rows, namespace, key, value)
+        return rows
+
+    async def adump(self, cache: "ClientCache") -> List[Row]:
+        """Like dump, but yields to the event loop every ``chunk`` entries so heartbeats and events aren't held up"""
+        rows = []
+        count = 0
+        for namespace in NAMESPACES:
+            for key, value in getattr(cache, namespace).items():
+                self._append(rows, namespace, key, value)
+                count += 1
+                if count % self.chunk == 0:
+                    await asyncio.sleep(0)
+        return rows
+
+    @staticmethod
+    def _append(rows: List[Row], namespace: str, key: Any, value: Any):
+        if value is None or type(value).__name__ not in MODELS:
+            return
+        data = value.model_dump(mode='json', by_alias=True, exclude_unset=True, exclude_none=True)
+        rows.append((namespace, json.dumps(key), type(value).__name__, json.dumps(data)))
+
+    def write(self, rows: List[Row]):
+        """Write dumped rows to disk, the old snapshot is replaced atomically"""
+        tmp_path = f'{self.path}.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        connection = sqlite3.connect(tmp_path)
+        try:
+            with connection:
+                connection.execute('CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)')
+                connection.execute('CREATE TABLE entries (namespace TEXT, key TEXT, model TEXT, data TEXT)')
+                connection.executemany('INSERT INTO meta VALUES (?, ?)',
+                                       [('version', str(SNAPSHOT_VERSION)), ('saved_at', str(time.time()))])
+                connection.executemany('INSERT INTO entries VALUES (?, ?, ?, ?)', rows)
+        finally:
+            connection.close()
+        os.replace(tmp_path, self.path)
+
+    def save(self, cache: "ClientCache") -> int:
+        """Write a snapshot of the cache, returns the number of entries written"""
+        rows = self.dump(cache)
+        self.write(rows)
+        return len(rows)
+
+    async def asave(self, cache: "ClientCache") -> int:
+        """
+        Like save, for use on the event loop.
+
+        The entries are serialised on the loop in chunks, handing control back between them,
+        and the file is written in a thread. The snapshot is consistent per entry, an entry
+        updated while saving is stored in either its old or its new version.
+        """
+        rows = await self.adump(cache)
+        await asyncio.to_thread(self.write, rows)
+        return len(rows)
+
+    def load(self, cache: "ClientCache", client: "PyreClient") -> int:
+        """
+        Fill the cache from the snapshot.
+
+        Returns:
+            The number of entries loaded, 0 when there is no usable snapshot
+        """
+        if not os.path.exists(self.path):
+            return 0
+        connection = sqlite3.connect(self.path)
+        try:
+            meta: Dict[str, str] = dict(connection.execute('SELECT name, value FROM meta'))
+            if meta.get('version') != str(SNAPSHOT_VERSION):
+                LOG.warning(f"Ignoring cache snapshot {self.path}, version {meta.get('version')} "
+                            f"is not {SNAPSHOT_VERSION}")
+                return 0
+            age = time.time() - float(meta.get('saved_at', 0))
+            if self.max_age is not None and age > self.max_age:
+                LOG.info(f"Ignoring cache snapshot {self.path}, it is {age:.0f}s old")
+                return 0
+            # build everything first so a broken snapshot leaves the cache untouched
+            entries = []
+            for namespace in NAMESPACES:
+                rows = connection.execute('SELECT key, model, data FROM entries WHERE namespace = ?', (namespace,))
+                for key, model, data in rows:
+                    entries.append((namespace, self._key(json.loads(key)),
+                                    MODELS[model](wsclient=client, **json.loads(data))))
+        except (sqlite3.DatabaseError, KeyError, ValueError) as e:
+            LOG.error(f"Failed to read cache snapshot {self.path}: {e!r}")
+            return 0
+        finally:
+            connection.close()
+        for namespace, key, value in entries:
+            getattr(cache, namespace).set(key, value)
+        LOG.info(f"Loaded {len(entries)} cache entries from {self.path}, saved {age:.0f}s ago")
+        return len(entries)
+
+    @staticmethod
+    def _key(key: Any) -> Any:
+        # composite keys come back from json as lists
+        return tuple(key) if isinstance(key, list) else key
@@ -1,53 +1,318 @@
 import asyncio
-import inspect
-import json
 import functools
+import random
+import time
 
-from typing import List, TYPE_CHECKING
+from typing import Dict, List, TYPE_CHECKING
 from websockets import client as  ws_client
 from .errors import LabelMe, InternalError, InvalidSession, OnboardingNotFinished, AlreadyAuthenticated
-from .models import TextChannel, VoiceChannel, Server, User, Member, Role, Listener
+from .models import TextChannel, VoiceChannel, Server, User, Role, Listener, LazyEvent
 from .cache import ClientCache
+from .cache_policy import CachePolicy
+from .history import HistoryPolicy
+from .codec import GatewayCodec, get_codec
+from .dispatch import EventDispatcher, ordering_key
+from .replay import GatewayRecorder
+from .snapshot import CacheSnapshot
 from .http import HTTPClient
+from .hydration import ReadyHydrator
+from .resolver import MemberResolver
 from .logger import LOG
+from .metrics import MetricsSink, DECODE, MODEL, CACHE_LISTENER, LISTENER
 
 if TYPE_CHECKING:
     from .client import PyreClient
 
 DEFAULT_EVENTS: List[Listener] = list()
 EVENTS: List[Listener] = list()
+CONTROL_EVENTS = ('Error', 'Authenticated', 'Ready', 'Pong')
+"""Events handled by the receive loop itself, before anything queued after them"""
+FATAL_ERRORS = (InvalidSession, OnboardingNotFinished, AlreadyAuthenticated)
+"""Gateway errors a reconnect can't fix"""
+
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 60.0) -> float:
+    """Exponential backoff with full jitter, attempt starts at 0"""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
 
 class WSClient:
-    def __init__(self, token: str, version: int = 1):
+    def __init__(self, token: str, version: int = 1, hydration_concurrency: int = 8, format: str = 'json',
+                 dispatch_workers: int = 4, queue_size: int = 1000, drop_when_full: bool = False,
+                 reconnect: bool = True, heartbeat_interval: float = 20.0, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 stable_after: float = 30.0,
+                 metrics: MetricsSink = None, concurrent_bulk: bool = True, compact_members: bool = False,
+                 snapshot_path: str = None, snapshot_interval: float = 300.0, lazy_members: bool = False,
+                 member_limit: int = 10000, cache_policies: Dict[str, CachePolicy] = None,
+                 cache_stats_interval: float = 60.0, cache_history: Dict[str, HistoryPolicy] = None):
         self.url = 'wss://ws.revolt.chat'
         self.token = token
         self.version = version
+        self.codec: GatewayCodec = get_codec(format)
+        self.metrics = metrics
+        """Sink for pipeline timings, None disables timing"""
+        self.cache_stats_interval = cache_stats_interval
+        """Seconds between cache statistics sent to the metrics sink"""
+        self.concurrent_bulk = concurrent_bulk
+        """Handle the events of a Bulk frame concurrently, keeping the order per channel or server"""
         self.websocket = None
+        self.reconnect = reconnect
+        self.heartbeat_interval = heartbeat_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        """Seconds a connection has to stay up before the reconnect backoff starts over"""
+        self.latency: float = None
+        """Round trip of the last heartbeat (seconds)"""
+        self.ready = False
+        """Whether the cache was filled by a Ready event, later Ready events only reconcile it"""
+        self._closed = False
+        self._last_ping: float = None
+        self._last_pong: float = None
+        self._last_received: float = None
+        """When the last frame was read or finished handling, any frame shows the connection is alive"""
+        self._handling = False
+        self.snapshot: CacheSnapshot = CacheSnapshot(snapshot_path) if snapshot_path else None
+        """Where the cache is saved on close and every snapshot_interval, and loaded from before connecting"""
+        self.snapshot_interval = snapshot_interval
+        self.restored = False
+        """Whether the cache was loaded from a snapshot, the next Ready only reconciles it"""
+        self._snapshot_task: asyncio.Task = None
+        self._stats_task: asyncio.Task = None
         self.events = EVENTS
         self.default_events = DEFAULT_EVENTS
-        self.cache = ClientCache()
+        self.lazy_members = lazy_members
+        """Load members when they are first looked up instead of fetching every member on Ready"""
+        self.cache = ClientCache(compact_members=compact_members, member_limit=member_limit if lazy_members else 0,
+                                 policies=cache_policies, history=cache_history)
         self.http = HTTPClient(self.token)
+        self.hydrator = ReadyHydrator(self, hydration_concurrency)
+        self.resolver = MemberResolver(self)
+        if lazy_members:
+            self.cache.resolver = self.resolver
         self.client: 'PyreClient' = None
+        self.dispatcher: EventDispatcher = None
+        self.recorder: GatewayRecorder = None
+        if dispatch_workers > 0:
+            self.dispatcher = EventDispatcher(self._handle_message, dispatch_workers, queue_size, drop_when_full)
+        self.dispatch_table: Dict[str, List[Listener]] = {}
+        self.default_dispatch_table: Dict[str, List[Listener]] = {}
+        self.observed_events = set(CONTROL_EVENTS)
+        self.observed_events.add('Bulk')
+        for listener in self.default_events:
+            self.default_dispatch_table.setdefault(listener.name, []).append(listener)
+            self.observed_events.add(listener.name)
+        for listener in self.events:
+            self.dispatch_table.setdefault(listener.name, []).append(listener)
+            self.observed_events.add(listener.name)
+
+    def add_listener(self, listener: Listener, default: bool = False):
+        """Register a listener and index it by its event name.
+
+        Args:
+            listener (Listener): The listener to register
+            default (bool): Whether it is an internal cache listener, these run before user listeners
+        """
+        if default:
+            self.default_events.append(listener)
+            self.default_dispatch_table.setdefault(listener.name, []).append(listener)
+        else:
+            self.events.append(listener)
+            self.dispatch_table.setdefault(listener.name, []).append(listener)
+        self.observed_events.add(listener.name)
 
     async def connect(self):
+        """Connect to the gateway and keep the connection alive, reconnecting with backoff when it drops"""
+        self._closed = False
+        if self.dispatcher:
+            self.dispatcher.start()
+        if self.snapshot and not self.ready and not self.restored:
+            self.restored = self.snapshot.load(self.cache, self.client) > 0
+        if self.snapshot and self.snapshot_interval and self._snapshot_task is None:
+            self._snapshot_task = asyncio.create_task(self.snapshot_loop())
+        if self.metrics and self.cache_stats_interval and self._stats_task is None:
+            self._stats_task = asyncio.create_task(self.cache_stats_loop())
+        attempt = 0
+        while not self._closed:
+            try:
+                self.websocket = await ws_client.connect(
+                    uri=f"{self.url}?token={self.token}&version={self.version}&format={self.codec.format}")
+            except Exception as e:
+                if not self.reconnect:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                LOG.error(f"Failed to connect to the gateway: {e!r}, retrying in {delay:.1f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            connected_at = time.monotonic()
+            heartbeat = asyncio.create_task(self.heartbeat())
+            try:
+                await self.receive()
+            except FATAL_ERRORS:
+                raise
+            except Exception as e:
+                if self._closed:
+                    return
+                if not self.reconnect:
+                    raise
+                LOG.warning(f"Gateway connection lost: {e!r}, reconnecting")
+            finally:
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+                await self.websocket.close()
+            # a connection that drops soon after opening keeps backing off, so a flapping gateway isn't hammered
+            if time.monotonic() - connected_at >= self.stable_after:
+                attempt = 0
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+            attempt += 1
+
+    async def close(self):
+        """Close the gateway connection and stop reconnecting"""
+        self._closed = True
+        for task in (self._snapshot_task, self._stats_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._snapshot_task = self._stats_task = None
+        if self.websocket:
+            await self.websocket.close()
+        if self.dispatcher:
+            await self.dispatcher.stop()
+        if self.snapshot and self.ready:
+            await self.save_snapshot()
+
+    async def save_snapshot(self):
+        """Write the cache to the snapshot file"""
         try:
-            self.websocket = await ws_client.connect(
-                uri=f"{self.url}?token={self.token}&version={self.version}")
+            entries = await self.snapshot.asave(self.cache)
         except Exception as e:
-            LOG.error(e)
+            LOG.error(f"Failed to save cache snapshot {self.snapshot.path}: {e!r}")
+            return
+        LOG.debug(f"Saved {entries} cache entries to {self.snapshot.path}")
+
+    async def cache_stats_loop(self):
+        while True:
+            await asyncio.sleep(self.cache_stats_interval)
+            self.metrics.cache_stats(self.cache.stats())
+
+    async def snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            if self.ready:
+                await self.save_snapshot()
 
+    async def receive(self):
         while True:
             message = await self.websocket.recv()
-            await self.handle_message(message)
+            self._last_received = time.monotonic()
+            if self.recorder:
+                self.recorder.record(message)
+            self._handling = True
+            try:
+                await self.handle_message(message)
+            finally:
+                self._handling = False
+                self._last_received = time.monotonic()
+
+    async def send(self, data: dict):
+        """Send an event to the gateway"""
+        await self.websocket.send(self.codec.encode(data))
+
+    async def heartbeat(self):
+        """Ping the gateway every heartbeat_interval and drop the connection when nothing comes back"""
+        self._last_received = time.monotonic()
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            # while a frame is being handled (Ready hydration, a full dispatch queue) nothing is read,
+            # that silence is ours and not the gateway's
+            if not self._handling and self._last_received < time.monotonic() - self.heartbeat_interval * 2:
+                LOG.warning("Gateway stopped answering pings")
+                await self.websocket.close()
+                return
+            self._last_ping = time.monotonic()
+            await self.send({'type': 'Ping', 'data': int(self._last_ping * 1000)})
+
+    def start_recording(self, path: str):
+        """Record every received frame to a file that can be replayed with :class:`GatewayReplayer`"""
+        self.stop_recording()
+        self.recorder = GatewayRecorder(path)
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
 
     async def handle_message(self, message):
-        event = json.loads(message)
+        event_type = self.codec.peek_type(message)
+        if event_type is not None and event_type not in self.observed_events:
+            return
+        if self.metrics is None:
+            event = self.codec.decode(message)
+        else:
+            start = time.perf_counter()
+            event = self.codec.decode(message)
+            self.metrics.observe(DECODE, event.get('type'), time.perf_counter() - start)
         if event['type'] == "Bulk":
-            for event in event['v']:
-                await self._handle_message(event)
+            await self.handle_bulk(event['v'])
         else:
+            await self.queue_event(event)
+
+    async def handle_bulk(self, events: List[dict]):
+        """Handle the events of a Bulk frame.
+
+        The events are partitioned by channel or server and the partitions are handled
+        concurrently, each one in order. With running dispatch workers the events go to the
+        worker owning their channel or server, partitions sharing a worker run one after the
+        other. Without workers the partitions are gathered here. Control events are handled
+        on their own after everything before them.
+        """
+        if not self.concurrent_bulk:
+            for event in events:
+                await self.queue_event(event)
+            return
+        dispatcher = self.dispatcher if self.dispatcher and self.dispatcher.running else None
+        partitions: Dict[str, List[dict]] = {}
+        queued = False
+        for event in events:
+            event_type = event.get('type')
+            if event_type in CONTROL_EVENTS:
+                if queued:
+                    await dispatcher.join()
+                    queued = False
+                await self._handle_partitions(partitions)
+                partitions = {}
+                await self.queue_event(event)
+            elif event_type not in self.observed_events:
+                continue
+            elif dispatcher:
+                # the dispatcher shards by the same ordering key
+                await dispatcher.put(event)
+                queued = True
+            else:
+                partitions.setdefault(ordering_key(event), []).append(event)
+        await self._handle_partitions(partitions)
+
+    async def _handle_partitions(self, partitions: Dict[str, List[dict]]):
+        if len(partitions) == 1:
+            for event in next(iter(partitions.values())):
+                await self._handle_message(event)
+        elif partitions:
+            await asyncio.gather(*[self._handle_partition(events) for events in partitions.values()])
+
+    async def _handle_partition(self, events: List[dict]):
+        for event in events:
             await self._handle_message(event)
 
+    async def queue_event(self, event):
+        """Hand an event to the dispatch workers, control events and clients without workers handle it inline"""
+        if event.get('type') not in self.observed_events:
+            return
+        if self.dispatcher is None or not self.dispatcher.running or event.get('type') in CONTROL_EVENTS:
+            await self._handle_message(event)
+        else:
+            await self.dispatcher.put(event)
+
     async def _handle_message(self, event):
         event_type = event.get("type")
 
@@ -55,6 +320,10 @@ class WSClient:
             self.handle_error(event.get("error"))
         elif event_type == "Authenticated":
             LOG.debug("Pyre lit!")
+        elif event_type == "Pong":
+            self._last_pong = time.monotonic()
+            if self._last_ping:
+                self.latency = self._last_pong - self._last_ping
         elif event_type == "Ready":
             LOG.debug('Ready')
             await self.on_ready(event)
@@ -62,6 +331,11 @@ class WSClient:
             await self.on_event(event)
 
     async def on_ready(self, event):
+        server_ids = [server['_id'] for server in event['servers']]
+        warm = self.ready or self.restored
+        known_servers = set(self.cache.servers.keys()) if warm else set()
+        if warm:
+            self.reconcile(event)
         for server in event['servers']:
             self.cache.servers.set(server['_id'],
                                    Server(wsclient=self.client, **server))
@@ -73,12 +347,6 @@ class WSClient:
                     role_dict = roles_dict.get(role_id)
                     self.cache.roles.set((server['_id'], role_id), Role(wsclient=self.client, id=role_id, server_id=server['_id'], **role_dict))
 
-            members = await self.http.fetch_members(server['_id'])
-            for member in members['members']:
-                self.cache.members.set((server['_id'], member['_id']['user']), Member(wsclient=self.client, **member))
-                user = await self.http.fetch_user(member['_id']['user'])
-                self.cache.users.set(user['_id'], User(wsclient=self.client, **user))
-            
         for channel in event['channels']:
             if channel["channel_type"] == 'TextChannel':
                 self.cache.channels.set(
@@ -99,15 +367,40 @@ class WSClient:
         #             emoji['_id'],
         #             DetachedEmoji(wsclient=self.client, **emoji))
 
+        # members of servers we already know are kept, only new servers are fetched
+        if not self.lazy_members:
+            await self.hydrator.hydrate([server_id for server_id in server_ids if server_id not in known_servers])
+
         me = await self.http.fetch_self()
         self.cache.bot.set('me', User(wsclient=self.client, **me))
-        
 
-        for listener in self.events:
-            listener: Listener = listener
-            if listener.name in ['ClientReady', 'OnReady', 'Ready']:
+        if self.ready:
+            LOG.debug(f'Resumed, {len(server_ids) - len(known_servers & set(server_ids))} new servers')
+            return
+        self.ready = True
+
+        for name in ['ClientReady', 'OnReady', 'Ready']:
+            for listener in self.dispatch_table.get(name, []):
                 await listener.callback()
 
+    def reconcile(self, event: dict):
+        """Drop servers, roles and channels that are missing from a Ready received after a reconnect or snapshot load"""
+        server_ids = {server['_id'] for server in event['servers']}
+        for server_id in list(self.cache.servers.keys()):
+            if server_id not in server_ids:
+                self.cache.purge_server(server_id)
+        for server in event['servers']:
+            role_ids = server.get('roles') or {}
+            stale = [key for key in self.cache.role_index.get(server['_id']) if key[1] not in role_ids]
+            for server_id, role_id in stale:
+                self.cache.delete_role_in_cache(server_id, role_id)
+            if stale:
+                self.cache.permissions.invalidate_server(server['_id'])
+        channel_ids = {channel['_id'] for channel in event['channels']}
+        for channel_id in list(self.cache.channels.keys()):
+            if channel_id not in channel_ids:
+                self.cache.delete_channel(channel_id)
+
     def handle_error(self, error_id):
         if error_id == 'LabelMe':
             raise LabelMe()
@@ -120,23 +413,57 @@ class WSClient:
         elif error_id == "AlreadyAuthenticated":
             raise AlreadyAuthenticated()
     
-    def resolve_event_args(self, callback, event, payload):
-        signature = inspect.signature(callback)
+    def resolve_event_args(self, listener: Listener, models: Dict[type, object], payload: dict) -> dict:
+        """Build the callback arguments, the event model is built once per frame and shared between listeners"""
         args = {}
-        for param_name, param in signature.parameters.items():
+        for param_name in listener.parameters:
             if param_name == 'self':
                 args['self'] = self.client
+            elif listener.view == 'raw':
+                args[param_name] = payload
             else:
-                args[param_name] = event(wsclient=self.client, **payload)
+                key = (listener.event, listener.view)
+                event = models.get(key)
+                if event is None:
+                    if listener.view == 'lazy':
+                        event = LazyEvent(listener.event, payload, self.client)
+                    elif self.metrics is None:
+                        event = listener.event(wsclient=self.client, **payload)
+                    else:
+                        start = time.perf_counter()
+                        event = listener.event(wsclient=self.client, **payload)
+                        self.metrics.observe(MODEL, listener.name, time.perf_counter() - start)
+                    models[key] = event
+                args[param_name] = event
         return args
 
     async def on_event(self, raw_event: dict):
         event_name = raw_event['type']
+        def_listeners = self.default_dispatch_table.get(event_name)
+        listeners = self.dispatch_table.get(event_name)
+        if not def_listeners and not listeners:
+            return
         if event_name == "ChannelCreate":
             payload = {'channel':raw_event}
         else:
             payload = raw_event
-        def_events = [functools.partial(listener.callback, **self.resolve_event_args(listener.callback, listener.event, payload)) for listener in self.default_events if listener.name == event_name]
-        await asyncio.gather(*[func() for func in def_events])
-        events = [functools.partial(listener.callback, **self.resolve_event_args(listener.callback, listener.event, payload)) for listener in self.events if listener.name == event_name]
-        await asyncio.gather(*[func() for func in events])
\ No newline at end of file
+        models = {}
+        if def_listeners:
+            def_events = [functools.partial(listener.callback, **self.resolve_event_args(listener, models, payload)) for listener in def_listeners]
+            if self.metrics is None:
+                await asyncio.gather(*[func() for func in def_events])
+            else:
+                await asyncio.gather(*[self._timed(CACHE_LISTENER, event_name, listener, func) for listener, func in zip(def_listeners, def_events)])
+        if listeners:
+            events = [functools.partial(listener.callback, **self.resolve_event_args(listener, models, payload)) for listener in listeners]
+            if self.metrics is None:
+                await asyncio.gather(*[func() for func in events])
+            else:
+                await asyncio.gather(*[self._timed(LISTENER, event_name, listener, func) for listener, func in zip(listeners, events)])
+
+    async def _timed(self, stage: str, event_name: str, listener: Listener, func):
+        start = time.perf_counter()
+        try:
+            return await func()
+        finally:
+            self.metrics.observe(stage, event_name, time.perf_counter() - start, listener.callback.__qualname__)
\ No newline at end of file
@@ -0,0 +1,33 @@
+import asyncio
+import json
+
+import pytest
+
+from pyre import PyreClient
+from pyre.ws import EVENTS
+
+
+@pytest.fixture(autouse=True)
+def isolated_listeners():
+    """User listeners are kept in a module level list, don't let them leak into the next test"""
+    events = list(EVENTS)
+    yield
+    EVENTS[:] = events
+
+
+@pytest.fixture
+def client():
+    return PyreClient('token', dispatch_workers=0)
+
+
+def run(coroutine):
+    """Run a coroutine in a fresh event loop"""
+    return asyncio.run(coroutine)
+
+
+def dispatch(client: PyreClient, *events: dict):
+    """Feed gateway events through the client's receive path and run their listeners"""
+    async def feed():
+        for event in events:
+            await client.ws.handle_message(json.dumps(event))
+    run(feed())
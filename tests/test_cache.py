@@ -0,0 +1,97 @@
+import pytest
+
+from pyre.cache import ClientCache
+from pyre.models import Member, Role, Server, TextChannel, TextMessage, User
+
+
+def member(server_id, user_id):
+    return Member(_id={'server': server_id, 'user': user_id})
+
+
+@pytest.fixture
+def cache():
+    cache = ClientCache()
+    for server_id in ('s1', 's2'):
+        cache.servers.set(server_id, Server(_id=server_id, name=server_id, channels=[f'{server_id}-c']))
+        cache.roles.set((server_id, 'r'), Role(id='r', server_id=server_id, name='role'))
+        cache.channels.set(f'{server_id}-c', TextChannel(_id=f'{server_id}-c', server=server_id,
+                                                         channel_type='TextChannel'))
+    for server_id, user_id in (('s1', 'a'), ('s1', 'b'), ('s2', 'a')):
+        cache.members.set((server_id, user_id), member(server_id, user_id))
+    return cache
+
+
+def test_per_server_indexes(cache):
+    assert sorted(m.ids.user_id for m in cache.get_members('s1')) == ['a', 'b']
+    assert [role.server_id for role in cache.get_roles('s2')] == ['s2']
+    assert [channel.id for channel in cache.get_channels('s1')] == ['s1-c']
+    cache.members.delete(('s1', 'b'))
+    cache.roles.delete(('s2', 'r'))
+    assert [m.ids.user_id for m in cache.get_members('s1')] == ['a']
+    assert cache.get_roles('s2') == []
+    assert cache.member_index.get('missing') == []
+
+
+def test_channel_index_follows_the_server(cache):
+    cache.channels.set('s1-c', TextChannel(_id='s1-c', server='s2', channel_type='TextChannel'))
+    assert cache.get_channels('s1') == []
+    assert sorted(channel.id for channel in cache.get_channels('s2')) == ['s1-c', 's2-c']
+
+
+def test_evicted_members_leave_the_index():
+    cache = ClientCache(member_limit=2)
+    for user_id in ('a', 'b', 'c'):
+        cache.members.set(('s', user_id), member('s', user_id))
+    assert len(cache.member_index.get('s')) == len(cache.members) == 2
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_servers_of_a_user(compact):
+    cache = ClientCache(compact_members=compact)
+    for server_id, user_id in (('s1', 'a'), ('s1', 'b'), ('s2', 'a')):
+        cache.servers.set(server_id, Server(_id=server_id, name=server_id))
+        cache.members.set((server_id, user_id), member(server_id, user_id))
+    assert sorted(cache.get_user_server_ids('a')) == ['s1', 's2']
+    assert cache.shared_server_count('b') == 1
+    cache.members.delete(('s1', 'a'))
+    assert [server.id for server in cache.get_user_servers('a')] == ['s2']
+    assert cache.get_user_servers('nobody') == []
+
+
+def test_purge_drops_users_without_a_shared_server(cache):
+    for user_id in ('a', 'b'):
+        cache.users.set(user_id, User(_id=user_id, username=user_id))
+    cache.purge_server('s1')
+    assert cache.get_user('a') is not None
+    assert cache.get_user('b') is None
+    assert cache.get_user_server_ids('a') == ['s2']
+
+
+def test_server_lookups(client):
+    cache = client.cache
+    server = Server(wsclient=client, _id='s', name='server', channels=['c'])
+    cache.servers.set('s', server)
+    cache.roles.set(('s', 'r'), Role(wsclient=client, id='r', server_id='s', name='role'))
+    cache.channels.set('c', TextChannel(wsclient=client, _id='c', server='s', channel_type='TextChannel'))
+    cache.channels.set('other', TextChannel(wsclient=client, _id='other', server='t', channel_type='TextChannel'))
+    for user_id in ('a', 'b'):
+        cache.members.set(('s', user_id), Member(wsclient=client, _id={'server': 's', 'user': user_id}))
+    assert server.get_member('a').ids.user_id == 'a'
+    assert server.get_role('r').name == 'role'
+    assert server.get_channel('c').id == 'c'
+    assert server.get_channel('other') is None
+    assert [m.ids.user_id for m in server.get_members(['b', 'missing', 'a'])] == ['b', 'a']
+    assert [role.id for role in server.get_roles(['r', 'missing'])] == ['r']
+    assert [channel.id for channel in server.get_channels(['other', 'c'])] == ['c']
+
+
+def test_messages_go_with_their_channel(cache):
+    for channel_id in ('s1-c', 's2-c'):
+        for index in range(3):
+            cache.messages.set((channel_id, f'm{index}'), TextMessage(_id=f'm{index}', channel=channel_id))
+    assert [message.id for message in cache.get_messages('s1-c')] == ['m0', 'm1', 'm2']
+    assert cache.delete_channel_messages('s1-c') == 3
+    assert cache.get_messages('s1-c') == []
+    cache.purge_server('s2')
+    assert len(cache.messages) == 0
+    assert cache.get_channel('s2-c') is None
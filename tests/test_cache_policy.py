@@ -0,0 +1,126 @@
+import pytest
+
+from pyre.cache import ClientCache
+from pyre.cache_policy import CachePolicy, DisabledCache, LFUPolicyCache, LRUPolicyCache
+from pyre.models import Member, Role, Server, TextChannel, User
+from .conftest import dispatch
+
+
+def user(user_id):
+    return User(_id=user_id, username=user_id)
+
+
+def test_policies_pick_the_cache_class():
+    cache = ClientCache(policies={'users': CachePolicy(eviction='lru', maxsize=2),
+                                  'roles': CachePolicy(eviction='lfu'),
+                                  'emoji': CachePolicy(enabled=False)})
+    assert isinstance(cache.users, LRUPolicyCache)
+    assert isinstance(cache.roles, LFUPolicyCache)
+    assert isinstance(cache.emoji, DisabledCache)
+    assert cache.messages.ttl == 60 * 60 * 24 * 7
+
+
+def test_lru_eviction():
+    cache = ClientCache(policies={'users': CachePolicy(eviction='lru', maxsize=2)})
+    cache.users.set('a', user('a'))
+    cache.users.set('b', user('b'))
+    cache.users.get('a')
+    cache.users.set('c', user('c'))
+    assert sorted(cache.users.keys()) == ['a', 'c']
+
+
+def test_lfu_eviction():
+    cache = ClientCache(policies={'users': CachePolicy(eviction='lfu', maxsize=3)})
+    for user_id in 'abc':
+        cache.users.set(user_id, user(user_id))
+    cache.users.get('a')
+    cache.users.get('a')
+    cache.users.get('c')
+    cache.users.set('d', user('d'))
+    assert sorted(cache.users.keys()) == ['a', 'c', 'd']
+    cache.users.get('d')
+    cache.users.delete('a')
+    cache.users.set('e', user('e'))
+    cache.users.get('e')
+    # c, d and e were all used twice, c got there first
+    cache.users.set('f', user('f'))
+    assert sorted(cache.users.keys()) == ['d', 'e', 'f']
+
+
+def test_disabled_namespace_stores_nothing():
+    cache = ClientCache(policies={'users': CachePolicy(enabled=False)})
+    cache.users.set('a', user('a'))
+    assert cache.get_user('a') is None
+
+
+def test_max_bytes():
+    cache = ClientCache(policies={'users': CachePolicy(max_bytes=3000)})
+    for index in range(20):
+        cache.users.set(str(index), user(str(index)))
+    assert 0 < len(cache.users) < 20
+    assert cache.users.bytes <= 3000
+    assert cache.get_user('19') is not None
+
+
+def test_ttl_expires_in_order():
+    cache = ClientCache(policies={'users': CachePolicy(ttl=10)})
+    now = [0.0]
+    cache.users.timer = lambda: now[0]
+    cache.users.set('a', user('a'))
+    now[0] = 5
+    cache.users.set('b', user('b'))
+    now[0] = 12
+    assert cache.get_user('a') is None
+    assert cache.get_user('b') is not None
+
+
+def test_invalid_policies():
+    with pytest.raises(ValueError):
+        ClientCache(policies={'nope': CachePolicy()})
+    with pytest.raises(ValueError):
+        CachePolicy(eviction='random')
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_stats(compact):
+    cache = ClientCache(compact_members=compact, policies={'users': CachePolicy(maxsize=1)})
+    cache.users.set('a', user('a'))
+    cache.users.set('b', user('b'))
+    cache.get_user('b')
+    cache.get_user('a')
+    stats = cache.stats()
+    assert {key: stats['users'][key] for key in ('hits', 'misses', 'sets', 'evictions', 'size')} == {
+        'hits': 1, 'misses': 1, 'sets': 2, 'evictions': 1, 'size': 1}
+    assert stats['users']['hit_rate'] == 0.5
+    assert stats['users']['bytes'] > 0
+    assert set(stats) >= {'members', 'messages', 'members_history'}
+    assert 'bytes' not in cache.stats(memory=False)['members']
+    # lookups are counted once, by cacheout
+    info = cache.users.stats.info()
+    assert (info.hit_count, info.miss_count, info.eviction_count) == (1, 1, 1)
+
+
+def test_expirations_are_counted():
+    cache = ClientCache(policies={'users': CachePolicy(ttl=10)})
+    now = [0.0]
+    cache.users.timer = lambda: now[0]
+    cache.users.set('a', user('a'))
+    now[0] = 11
+    cache.get_user('a')
+    assert cache.stats(memory=False)['users']['expirations'] == 1
+
+
+def test_clear_empties_the_indexes(client):
+    cache = client.cache
+    cache.servers.set('s', Server(_id='s', owner='o', name='server'))
+    cache.members.set(('s', 'u'), Member(_id={'server': 's', 'user': 'u'}))
+    cache.roles.set(('s', 'r'), Role(id='r', server_id='s', name='role'))
+    cache.channels.set('c', TextChannel(_id='c', server='s', channel_type='TextChannel'))
+    dispatch(client, {'type': 'Message', '_id': 'm', 'channel': 'c', 'author': 'u', 'content': 'hi'})
+    cache.permissions.mask('s', 'u')
+    assert len(cache.permissions) == 1
+    for store in (cache.members, cache.roles, cache.channels, cache.messages):
+        store.clear()
+    assert cache.get_members('s') == [] and cache.get_user_server_ids('u') == []
+    assert cache.role_index.keys == cache.channel_index.keys == cache.message_index.keys == {}
+    assert len(cache.permissions) == 0
@@ -0,0 +1,47 @@
+import pytest
+
+from pyre import codec
+from pyre.codec import JSON_CODECS, MsgPackCodec, get_codec
+
+EVENT = {'type': 'Message', '_id': 'm', 'content': 'héllo', 'mentions': ['a', 'b'], 'edited': None}
+
+
+@pytest.mark.parametrize('backend', list(JSON_CODECS))
+def test_json_round_trip(backend):
+    if getattr(codec, backend) is None:
+        pytest.skip(f'{backend} is not installed')
+    json_codec = get_codec(backend)
+    encoded = json_codec.encode(EVENT)
+    assert json_codec.decode(encoded) == EVENT
+    assert json_codec.peek_type(encoded) == 'Message'
+
+
+def test_msgpack_round_trip():
+    if codec.msgpack is None:
+        pytest.skip('msgpack is not installed')
+    msgpack_codec = get_codec('msgpack')
+    assert msgpack_codec.decode(msgpack_codec.encode(EVENT)) == EVENT
+    assert msgpack_codec.peek_type(msgpack_codec.encode(EVENT)) is None
+
+
+def test_msgpack_missing(monkeypatch):
+    monkeypatch.setattr(codec, 'msgpack', None)
+    with pytest.raises(ImportError):
+        MsgPackCodec()
+
+
+def test_json_picks_an_installed_backend(monkeypatch):
+    monkeypatch.setattr(codec, 'orjson', None)
+    monkeypatch.setattr(codec, 'ujson', None)
+    assert get_codec('json').backend == 'json'
+
+
+def test_peek_type_needs_the_type_first():
+    json_codec = get_codec('json')
+    assert json_codec.peek_type('{"_id":"m","type":"Message"}') is None
+    assert json_codec.peek_type(b'{"type":"Message"}') is None
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        get_codec('xml')
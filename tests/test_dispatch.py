@@ -0,0 +1,170 @@
+import asyncio
+import json
+
+import pytest
+
+from pyre import PyreClient
+from pyre.dispatch import EventDispatcher, ordering_key
+from pyre.models import MessageCreate, MessageUpdate
+from .conftest import dispatch, run
+
+MESSAGE = {'type': 'Message', '_id': 'm', 'channel': 'c', 'author': 'u', 'content': 'hello'}
+
+
+def test_listeners_are_indexed_by_event_name(client):
+    assert client.ws.dispatch_table == {}
+
+    @client.listen(MessageCreate)
+    async def on_message(event):
+        pass
+
+    assert [listener.callback for listener in client.ws.dispatch_table['Message']] == [on_message]
+    assert 'Message' in client.ws.observed_events
+    assert 'Message' in client.ws.default_dispatch_table
+
+
+def test_cache_listeners_run_first(client):
+    seen = []
+
+    @client.listen(MessageCreate)
+    async def on_message(event):
+        seen.append(client.cache.get_message('c', 'm'))
+
+    dispatch(client, MESSAGE)
+    assert seen[0] is not None and seen[0].content == 'hello'
+
+
+def test_listeners_share_the_event_model(client):
+    seen = []
+
+    @client.listen(MessageUpdate)
+    async def first(event):
+        seen.append(event)
+
+    @client.listen(MessageUpdate)
+    async def second(event):
+        seen.append(event)
+
+    dispatch(client, {'type': 'MessageUpdate', 'id': 'm', 'channel': 'c', 'data': {'content': 'new'}},
+             {'type': 'MessageDelete', 'id': 'm', 'channel': 'c'})
+    assert len(seen) == 2 and seen[0] is seen[1]
+
+
+def test_dispatcher_keeps_order_per_channel():
+    handled = []
+
+    async def handler(event):
+        # the slow channel must not hold up the other one, nor be reordered
+        await asyncio.sleep(0.01 if event['channel'] == 'slow' else 0)
+        handled.append((event['channel'], event['n']))
+
+    async def main():
+        dispatcher = EventDispatcher(handler, workers=4)
+        dispatcher.start()
+        for n in range(5):
+            await dispatcher.put({'type': 'Message', 'channel': 'slow', 'n': n})
+            await dispatcher.put({'type': 'Message', 'channel': 'fast', 'n': n})
+        await dispatcher.join()
+        await dispatcher.stop()
+        return dispatcher
+
+    dispatcher = run(main())
+    for channel in ('slow', 'fast'):
+        assert [n for key, n in handled if key == channel] == list(range(5))
+    if hash('slow') % 4 != hash('fast') % 4:
+        assert handled[:5] == [('fast', n) for n in range(5)]
+    assert dispatcher.stats.processed == dispatcher.stats.queued == 10
+
+
+def test_dispatcher_drops_when_full():
+    async def handler(event):
+        await asyncio.sleep(1)
+
+    async def main():
+        dispatcher = EventDispatcher(handler, workers=1, maxsize=2, drop_when_full=True)
+        dispatcher.start()
+        for n in range(5):
+            await dispatcher.put({'type': 'Message', 'channel': 'c', 'n': n})
+            await asyncio.sleep(0)
+        await dispatcher.stop()
+        return dispatcher.stats
+
+    stats = run(main())
+    # one event is being handled, two wait
+    assert (stats.queued, stats.dropped) == (3, 2)
+
+
+def test_handler_errors_are_counted():
+    async def handler(event):
+        raise RuntimeError('boom')
+
+    async def main():
+        dispatcher = EventDispatcher(handler, workers=2)
+        dispatcher.start()
+        await dispatcher.put({'type': 'Message', 'channel': 'c'})
+        await dispatcher.join()
+        await dispatcher.stop()
+        return dispatcher.stats
+
+    assert run(main()).failed == 1
+
+
+def test_ordering_key():
+    assert ordering_key({'type': 'Message', 'channel': 'c'}) == 'c'
+    assert ordering_key({'type': 'ServerMemberUpdate', 'id': {'server': 's', 'user': 'u'}}) == 's'
+    assert ordering_key({'type': 'ServerUpdate', 'id': 's'}) == 's'
+
+
+@pytest.fixture(params=[0, 4], ids=['inline', 'workers'])
+def bulk_client(request):
+    return PyreClient('token', dispatch_workers=request.param)
+
+
+def dispatch_bulk(client, events):
+    """Feed a Bulk frame and wait for the dispatch workers, if any, to handle it"""
+    async def feed():
+        dispatcher = client.ws.dispatcher
+        if dispatcher:
+            dispatcher.start()
+        await client.ws.handle_message(json.dumps({'type': 'Bulk', 'v': events}))
+        if dispatcher:
+            await dispatcher.join()
+            await dispatcher.stop()
+    run(feed())
+
+
+def other_shard(channel_id, workers=4):
+    """A channel id the default dispatcher puts on another worker than channel_id"""
+    return next(other for other in 'bcdefghij' if hash(other) % workers != hash(channel_id) % workers)
+
+
+def test_bulk_keeps_order_per_channel(bulk_client):
+    handled = []
+    slow, fast = 'a', other_shard('a')
+
+    @bulk_client.listen(MessageCreate, raw=True)
+    async def on_message(event):
+        # a slow first channel, the second one runs while it waits
+        await asyncio.sleep(0.01 if event['channel'] == slow else 0)
+        handled.append((event['channel'], event['_id']))
+
+    events = [dict(MESSAGE, channel=channel, _id=f'{channel}{n}') for n in range(3) for channel in (slow, fast)]
+    dispatch_bulk(bulk_client, events)
+    assert [event_id for channel, event_id in handled if channel == slow] == ['a0', 'a1', 'a2']
+    assert [event_id for channel, event_id in handled if channel == fast] == [f'{fast}{n}' for n in range(3)]
+    assert handled[:3] == [(fast, f'{fast}{n}') for n in range(3)]
+
+
+def test_bulk_control_events_split_the_frame(bulk_client):
+    handled = []
+    fast = other_shard('a')
+
+    @bulk_client.listen(MessageCreate, raw=True)
+    async def on_message(event):
+        await asyncio.sleep(0.01 if event['channel'] == 'a' else 0)
+        handled.append(event['_id'])
+
+    # without the Pong in between the fast channel would finish first
+    events = [dict(MESSAGE, channel='a', _id='a0'), {'type': 'Pong', 'data': 0}, dict(MESSAGE, channel=fast, _id='f0')]
+    dispatch_bulk(bulk_client, events)
+    assert handled == ['a0', 'f0']
@@ -0,0 +1,53 @@
+from pyre.enums import Permissions, PermissionSet
+
+KICK = Permissions.KICK_MEMBERS
+BAN = Permissions.BAN_MEMBERS
+TIMEOUT = Permissions.TIMEOUT_MEMBERS
+
+
+def test_get_permissions_matches_bits():
+    value = KICK.value | BAN.value
+    assert Permissions.get_permissions(value) == [member for member in Permissions if member.value & value]
+    assert Permissions.set_permissions(Permissions.get_permissions(value)) == value
+    assert Permissions.all() == sum(member.value for member in Permissions)
+
+
+def test_membership_and_iteration():
+    perms = PermissionSet(KICK, BAN)
+    assert KICK in perms and BAN.value in perms
+    assert TIMEOUT not in perms
+    assert set(perms) == {KICK, BAN}
+    assert len(perms) == 2
+    assert PermissionSet([KICK, BAN]) == perms
+
+
+def test_union_and_intersection():
+    perms = PermissionSet(KICK, BAN)
+    assert isinstance(perms | TIMEOUT, PermissionSet)
+    assert set(perms | TIMEOUT) == {KICK, BAN, TIMEOUT}
+    assert set(perms & PermissionSet(BAN, TIMEOUT)) == {BAN}
+    assert perms.issubset(PermissionSet.all())
+    assert perms.issuperset(KICK)
+    assert not perms.issuperset([KICK, TIMEOUT])
+
+
+def test_int_arithmetic_is_unchanged():
+    perms = PermissionSet(KICK, BAN)
+    value = KICK.value | BAN.value
+    assert perms - 1 == value - 1
+    assert perms ^ KICK.value == BAN.value
+    assert 5 - PermissionSet(KICK) == 5 - KICK.value
+
+
+def test_differences():
+    perms = PermissionSet(KICK, BAN)
+    assert set(perms.difference(BAN)) == {KICK}
+    assert set(perms.symmetric_difference([BAN, TIMEOUT])) == {KICK, TIMEOUT}
+    assert isinstance(perms.difference(0), PermissionSet)
+
+
+def test_formats_as_an_int():
+    perms = PermissionSet(KICK, BAN)
+    value = KICK.value | BAN.value
+    assert str(perms) == f'{perms}' == str(value)
+    assert repr(perms).startswith('PermissionSet(')
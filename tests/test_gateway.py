@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+import pyre.ws
+from pyre import PyreClient
+from pyre.models import MessageCreate
+from benchmarks.mock_server import MockConfig, MockRevolt
+from .conftest import run
+
+
+async def start(server: MockRevolt, **options) -> tuple:
+    client = PyreClient('token', **options)
+    server.configure(client)
+    ready = asyncio.Event()
+
+    @client.listen()
+    async def on_ready():
+        ready.set()
+    task = asyncio.create_task(client.astart())
+    await asyncio.wait_for(ready.wait(), 10)
+    return client, task
+
+
+async def stop(client: PyreClient, task: asyncio.Task, server: MockRevolt):
+    await client.close()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await server.stop()
+
+
+def test_slow_ready_hydration_does_not_drop_the_connection():
+    async def scenario():
+        server = MockRevolt(MockConfig(servers=3, members=20, events=0, latency=0.2))
+        await server.start()
+        client, task = await start(server, heartbeat_interval=0.05, hydration_concurrency=1)
+        first = client.ws.websocket
+        await asyncio.sleep(0.3)
+        try:
+            assert client.ws.websocket is first and first.close_code is None
+            assert len(client.cache.members) == sum(len(members) for members in server.members.values())
+            assert client.ws.latency is not None
+        finally:
+            await stop(client, task, server)
+    run(scenario())
+
+
+def test_reconnect_reconciles_without_refetching_members():
+    async def scenario():
+        server = MockRevolt(MockConfig(servers=2, members=50, events=0))
+        await server.start()
+        client, task = await start(server, heartbeat_interval=0.2)
+        try:
+            requests = server.stats.requests
+            first = client.ws.websocket
+            gone = next(iter(server.servers))
+            del server.servers[gone]
+            remaining = next(iter(server.servers))
+            role_id = next(iter(server.servers[remaining]['roles']))
+            del server.servers[remaining]['roles'][role_id]
+            for websocket in list(server._sockets):
+                await websocket.close()
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                # the bot user is fetched last on Ready
+                if client.ws.websocket is not first and server.stats.requests > requests:
+                    break
+            assert client.ws.websocket is not first
+            assert client.cache.get_server(gone) is None
+            assert len(client.cache.servers) == 1
+            # only the bot user is fetched again, the remaining server's members are kept
+            assert server.stats.requests == requests + 1
+            assert client.cache.get_role(remaining, role_id) is None
+            assert client.cache.get_deleted_role(remaining, role_id) is not None
+            assert len(client.cache.get_roles(remaining)) == len(server.servers[remaining]['roles'])
+            assert len(client.cache.members) == len(client.cache.get_members(remaining)) == len(server.members[remaining])
+        finally:
+            await stop(client, task, server)
+    run(scenario())
+
+
+class DroppingSocket:
+    async def recv(self):
+        raise ConnectionError('dropped')
+
+    async def send(self, data):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.parametrize('stable_after, expected', [(30.0, [0, 1, 2, 3]), (0, [0, 0, 0, 0])])
+def test_backoff_starts_over_only_after_a_stable_connection(monkeypatch, stable_after, expected):
+    client = PyreClient('token', dispatch_workers=0)
+    client.ws.stable_after = stable_after
+    attempts = []
+
+    async def connect(uri):
+        return DroppingSocket()
+
+    def delay(attempt, base, maximum):
+        attempts.append(attempt)
+        client.ws._closed = len(attempts) == 4
+        return 0
+    monkeypatch.setattr(pyre.ws.ws_client, 'connect', connect)
+    monkeypatch.setattr(pyre.ws, 'backoff_delay', delay)
+    run(client.ws.connect())
+    assert attempts == expected
+
+
+def test_traffic_and_replies_end_to_end():
+    async def scenario():
+        server = MockRevolt(MockConfig(servers=1, members=10, events=200, event_rate=0, bulk_size=5,
+                                       message_ratio=1.0, rate_limit_every=2, rate_limit_reset_after=1))
+        await server.start()
+        received = []
+        client = PyreClient('token')
+        server.configure(client)
+
+        @client.listen(MessageCreate)
+        async def on_message(event):
+            received.append(event)
+        task = asyncio.create_task(client.astart())
+        try:
+            await asyncio.wait_for(server.traffic_done.wait(), 10)
+            channel_id = next(iter(server.channels))
+            sent = await client.http.send_message(channel_id, 'pong')
+            for _ in range(100):
+                if any(event.content == 'pong' for event in received):
+                    break
+                await asyncio.sleep(0.05)
+            await client.ws.dispatcher.join()
+            assert sent['content'] == 'pong'
+            assert server.stats.rate_limited > 0
+            # every traffic message and the bot's own reply reach the listener
+            assert len(received) == server.stats.events + 1
+            assert client.cache.get_message(channel_id, sent['_id']) is not None
+        finally:
+            await stop(client, task, server)
+    run(scenario())
@@ -0,0 +1,92 @@
+from pyre.cache import ClientCache
+from pyre.models import Server
+from pyre.history import HistoryPolicy, HistoryStore
+from .conftest import dispatch
+
+
+def store(**policy):
+    now = [0.0]
+    history = HistoryStore(HistoryPolicy(**policy), timer=lambda: now[0])
+    return history, now
+
+
+def test_versions_are_bounded_per_key():
+    history, _ = store(max_versions=2)
+    for version in range(4):
+        history.set('k', f'v{version}')
+    assert history.versions('k') == ['v2', 'v3']
+    assert history.get('k') == 'v3'
+    assert history.counters.evictions == 2
+
+
+def test_versions_expire():
+    history, now = store(max_age=10)
+    history.set('a', 'old')
+    now[0] = 6
+    history.set('b', 'new')
+    now[0] = 11
+    assert history.get('a') is None
+    assert history.get('b') == 'new'
+    # recording drops keys whose newest version expired
+    history.set('c', 'newer')
+    assert 'a' not in list(history.keys())
+
+
+def test_least_recent_keys_are_evicted():
+    history, _ = store(max_keys=2)
+    history.set('a', 1)
+    history.set('b', 1)
+    history.set('a', 2)
+    history.set('c', 1)
+    assert sorted(history.keys()) == ['a', 'c']
+
+
+def test_byte_limit():
+    history, _ = store(max_bytes=1000, max_age=0)
+    for key in range(20):
+        history.set(key, 'x' * 100)
+    assert 0 < history.bytes <= 1000
+    assert history.get(19) is not None
+
+
+def test_disabled_history_keeps_nothing():
+    history, _ = store(enabled=False)
+    history.set('k', 'v')
+    assert len(history) == 0
+
+
+def test_namespaces_keep_their_own_history(client):
+    cache = ClientCache(history={'users': HistoryPolicy(enabled=False)})
+    assert not cache.history['users'].policy.enabled
+    assert cache.history['members'].policy.enabled
+    dispatch(client, {'type': 'Message', '_id': 'm', 'channel': 'c', 'author': 'u', 'content': 'hi'},
+             {'type': 'MessageUpdate', 'id': 'm', 'channel': 'c', 'data': {'content': 'edited'}},
+             {'type': 'MessageDelete', 'id': 'm', 'channel': 'c'})
+    assert [message.content for message in client.cache.history['messages'].versions(('c', 'm'))] == ['hi', 'edited']
+
+
+def large_server(server_id):
+    return {'_id': server_id, 'owner': 'o', 'name': 'server',
+            'channels': [f'{server_id}-channel{index}' for index in range(500)],
+            'roles': {f'{server_id}-role{index}': {'name': f'role{index}', 'permissions': {'a': 0, 'd': 0}}
+                      for index in range(200)}}
+
+
+def test_patches_of_large_servers_stay_within_the_byte_limit(client):
+    for index in range(50):
+        client.cache.servers.set(f's{index}', Server(wsclient=client, **large_server(f's{index}')))
+    for round in range(3):
+        dispatch(client, *[{'type': 'ServerUpdate', 'id': f's{index}', 'data': {'name': f'name{round}'}, 'clear': []}
+                           for index in range(50)])
+    history = client.cache.history['servers']
+    # versions share the channels and roles with the cached server, only what they replaced is charged
+    assert history.bytes < 150 * 1024
+    assert history.counters.evictions == 0
+    assert [server.name for server in history.versions('s0')] == ['server', 'name0', 'name1']
+    assert len(history.versions('s49')[0].channel_ids) == 500
+
+
+def test_deleted_objects_are_charged_in_full():
+    history, _ = store()
+    history.set('k', Server(**large_server('k')))
+    assert history.bytes > 50000
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+
+from pyre import PyreClient
+from pyre.hydration import ReadyHydrator
+from .conftest import run
+
+
+class FakeHTTP:
+    """Member lists with users for servers in ``with_users``, tracks the requests in flight"""
+    def __init__(self, members, with_users=()):
+        self.members = members
+        self.with_users = with_users
+        self.in_flight = 0
+        self.peak = 0
+        self.user_calls = []
+
+    async def _request(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+    async def fetch_members(self, server_id):
+        await self._request()
+        if server_id == 'broken':
+            raise RuntimeError('boom')
+        user_ids = self.members[server_id]
+        response = {'members': [{'_id': {'server': server_id, 'user': user_id}} for user_id in user_ids]}
+        if server_id in self.with_users:
+            response['users'] = [{'_id': user_id, 'username': user_id} for user_id in user_ids]
+        return response
+
+    async def fetch_user(self, user_id):
+        self.user_calls.append(user_id)
+        await self._request()
+        return {'_id': user_id, 'username': user_id}
+
+
+def hydrate(server_ids, http, concurrency):
+    client = PyreClient('token', dispatch_workers=0)
+    client.ws.http = http
+    run(ReadyHydrator(client.ws, concurrency).hydrate(server_ids))
+    return client.cache
+
+
+def test_bounded_concurrency():
+    http = FakeHTTP({f's{index}': ['u'] for index in range(10)}, with_users={f's{index}' for index in range(10)})
+    cache = hydrate(list(http.members), http, concurrency=3)
+    assert http.peak == 3
+    assert len(cache.members) == 10
+
+
+def test_users_fetched_once():
+    http = FakeHTTP({'a': ['u1', 'u2'], 'b': ['u2', 'u3'], 'c': ['u1']}, with_users={'c'})
+    cache = hydrate(['a', 'b', 'c'], http, concurrency=2)
+    assert len(http.user_calls) == len(set(http.user_calls))
+    assert all(cache.get_user(user_id) for user_id in ('u1', 'u2', 'u3'))
+
+
+def test_failed_server_is_skipped():
+    http = FakeHTTP({'ok': ['u']}, with_users={'ok'})
+    cache = hydrate(['broken', 'ok'], http, concurrency=2)
+    assert cache.get_member('ok', 'u') is not None
+    assert cache.get_members('broken') == []
+
+
+def test_concurrency_must_be_positive(client):
+    with pytest.raises(ValueError):
+        ReadyHydrator(client.ws, 0)
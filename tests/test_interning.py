@@ -0,0 +1,32 @@
+import json
+
+from pyre.cache import ClientCache
+from pyre.interning import intern_id, intern_key
+from pyre.models import Member, TextChannel
+
+
+def fresh(value):
+    """An equal string that is a different object, like one decoded from another payload"""
+    return json.loads(json.dumps(value))
+
+
+def test_helpers():
+    value = fresh('01HZXGJ4N8W2V6KQ3B7T5R9MEA')
+    assert intern_id(value) is intern_id(fresh(value))
+    assert intern_id(5) == 5
+    server_id, _ = intern_key((fresh(value), fresh('user')))
+    assert server_id is intern_id(value)
+
+
+def test_models_and_keys_share_ids():
+    cache = ClientCache()
+    server_id, user_id, role_id = '01HZXGJ4N8W2V6KQ3B7T5R9SRV', '01HZXGJ4N8W2V6KQ3B7T5R9USR', '01HZXGJ4N8W2V6KQ3B7T5R9ROL'
+    payload = {'_id': {'server': fresh(server_id), 'user': fresh(user_id)}, 'roles': [fresh(role_id)]}
+    member = Member(**payload)
+    cache.members.set((fresh(server_id), fresh(user_id)), member)
+    key = next(iter(cache.members.keys()))
+    assert key[0] is member.ids.server_id
+    assert key[1] is member.ids.user_id
+    assert member.role_ids[0] is Member(**fresh(payload)).role_ids[0]
+    channel = TextChannel(_id='c', channel_type='TextChannel', role_permissions={fresh(role_id): {'a': 1, 'd': 0}})
+    assert next(iter(channel.role_perms)) is member.role_ids[0]
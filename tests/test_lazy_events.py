@@ -0,0 +1,52 @@
+from pyre.models import LazyEvent, MessageUpdate, ServerMemberUpdate, Server, TextChannel
+from .conftest import dispatch
+
+UPDATE = {'type': 'MessageUpdate', 'id': 'm', 'channel': 'c', 'data': {'content': 'new'}}
+
+
+def cache_channel(client):
+    client.cache.servers.set('s', Server(wsclient=client, _id='s', name='srv', channels=['c']))
+    client.cache.channels.set('c', TextChannel(wsclient=client, _id='c', server='s', name='general',
+                                               channel_type='TextChannel'))
+
+
+def test_lazy_fields_match_the_full_model(client):
+    event = LazyEvent(MessageUpdate, UPDATE, client)
+    full = MessageUpdate(wsclient=client, **UPDATE)
+    assert event.message_id == full.message_id == 'm'
+    assert event.data.content == full.data.content == 'new'
+    assert event.raw is UPDATE
+
+
+def test_lazy_nested_models_get_the_client(client):
+    cache_channel(client)
+    event = LazyEvent(ServerMemberUpdate, {'type': 'ServerMemberUpdate', 'id': {'server': 's', 'user': 'u'},
+                                           'data': {'nickname': 'bob'}, 'clear': []}, client)
+    assert event.ids.wsclient is client
+    assert event.data.wsclient is client
+    assert event.client.cache is client.cache
+    assert LazyEvent(MessageUpdate, UPDATE, client).channel.name == 'general'
+
+
+def test_listener_views(client):
+    cache_channel(client)
+    seen = {}
+
+    @client.listen(MessageUpdate, lazy=True)
+    async def lazy_listener(event):
+        seen['lazy'] = event
+
+    @client.listen(MessageUpdate, raw=True)
+    async def raw_listener(event):
+        seen['raw'] = event
+
+    dispatch(client, UPDATE)
+    assert isinstance(seen['lazy'], LazyEvent) and seen['lazy'].data.content == 'new'
+    assert seen['raw'] == UPDATE
+
+
+def test_unobserved_events_are_not_parsed(client, monkeypatch):
+    built = []
+    monkeypatch.setattr(client.ws, 'resolve_event_args', lambda *args: built.append(args) or {})
+    dispatch(client, {'type': 'ChannelStartTyping', 'id': 'c', 'user': 'u'})
+    assert built == []
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from pyre.cache import ClientCache
+from pyre.enums import Permissions
+from pyre.models import Member, Role, Server
+
+
+def member(server_id, user_id, **fields):
+    return Member(_id={'server': server_id, 'user': user_id}, **fields)
+
+
+def test_round_trip():
+    cache = ClientCache(compact_members=True)
+    joined_at = datetime(2022, 5, 1, 12, 30, tzinfo=timezone.utc)
+    cache.members.set(('s', 'u'), member('s', 'u', nickname='nick', roles=['r1', 'r2'], joined_at=joined_at.isoformat()))
+    stored = cache.members.get(('s', 'u'))
+    assert stored.nickname == 'nick'
+    assert stored.role_ids == ['r1', 'r2']
+    assert stored.joined_at == joined_at
+    assert cache.members.get(('s', 'missing')) is None
+
+
+def test_server_and_user_lookups():
+    cache = ClientCache(compact_members=True)
+    for server_id, user_id in (('s1', 'a'), ('s1', 'b'), ('s2', 'a')):
+        cache.members.set((server_id, user_id), member(server_id, user_id))
+    assert sorted(key[1] for key in cache.members.server_keys('s1')) == ['a', 'b']
+    assert sorted(cache.get_user_server_ids('a')) == ['s1', 's2']
+    cache.members.delete(('s1', 'a'))
+    assert cache.get_user_server_ids('a') == ['s2']
+    assert [m.ids.user_id for m in cache.get_members('s1')] == ['b']
+
+
+def test_set_invalidates_permissions():
+    cache = ClientCache(compact_members=True)
+    cache.servers.set('s', Server(_id='s', owner='owner', name='server', default_permissions=0))
+    send = Permissions.SEND_MESSAGE.value
+    cache.roles.set(('s', 'r'), Role(id='r', server_id='s', name='role', permissions={'a': send, 'd': 0}))
+    cache.members.set(('s', 'u'), member('s', 'u'))
+    assert not cache.permissions.has('s', 'u', send)
+    cache.members.set(('s', 'u'), member('s', 'u', roles=['r']))
+    assert cache.permissions.has('s', 'u', send)
+    cache.members.delete(('s', 'u'))
+    assert not cache.permissions.has('s', 'u', send)
+
+
+def test_built_members_are_reused_until_written():
+    cache = ClientCache(compact_members=True)
+    cache.members.view_cache = 2
+    for user_id in 'abc':
+        cache.members.set(('s', user_id), member('s', user_id, nickname=user_id))
+    first = cache.members.get(('s', 'a'))
+    assert cache.members.get(('s', 'a')) is first
+    cache.members.set(('s', 'a'), member('s', 'a', nickname='renamed'))
+    assert cache.members.get(('s', 'a')).nickname == 'renamed'
+    cache.members.get(('s', 'b'))
+    cache.members.get(('s', 'c'))
+    assert len(cache.members._views) == 2 and ('s', 'a') not in cache.members._views
+    cache.members.delete(('s', 'c'))
+    assert cache.members.get(('s', 'c')) is None
+    assert cache.members.counters.hits == 5 and cache.members.counters.misses == 1
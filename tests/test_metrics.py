@@ -0,0 +1,34 @@
+from pyre import PyreClient
+from pyre.metrics import BUCKETS, CACHE_LISTENER, DECODE, LISTENER, MODEL, Histogram, InMemoryMetrics
+from pyre.models import MessageCreate
+from .conftest import dispatch
+
+
+def test_histogram():
+    histogram = Histogram()
+    for seconds in (1e-6, 2e-6, 3e-6, 1e-3):
+        histogram.observe(seconds)
+    summary = histogram.snapshot()
+    assert summary['count'] == 4
+    assert summary['min'] == 1e-6 and summary['max'] == 1e-3
+    assert summary['p50'] == BUCKETS[1]
+    assert BUCKETS[9] <= summary['p99'] <= BUCKETS[10]
+    assert Histogram().snapshot()['mean'] == 0.0
+
+
+def test_pipeline_stages_are_timed():
+    metrics = InMemoryMetrics()
+    client = PyreClient('token', dispatch_workers=0, metrics=metrics)
+
+    @client.listen(MessageCreate)
+    async def on_message(event):
+        pass
+
+    dispatch(client, {'type': 'Message', '_id': 'm', 'channel': 'c', 'author': 'u', 'content': 'hi'})
+    data = metrics.snapshot()
+    assert data[DECODE]['Message']['count'] == 1
+    assert data[MODEL]['Message']['count'] == 1
+    assert any(name.startswith('Message:') for name in data[CACHE_LISTENER])
+    assert list(data[LISTENER]) == [f'Message:{on_message.__qualname__}']
+    metrics.reset()
+    assert metrics.snapshot() == {}
@@ -0,0 +1,30 @@
+from pyre.models import Member, User
+from pyre.patch import CLEAR_FIELDS, apply_patch
+from .conftest import dispatch
+
+
+def test_only_sent_fields_are_applied():
+    user = User(_id='u', username='name', display_name='old', status={'text': 'busy', 'presence': 'Online'})
+    before = apply_patch(user, User(display_name='new'), ['StatusText'], CLEAR_FIELDS['users'])
+    assert (user.username, user.display_name) == ('name', 'new')
+    assert (user.status.text, user.status.presence) == (None, 'Online')
+    # the previous version is untouched, nested models included
+    assert (before.display_name, before.status.text) == ('old', 'busy')
+
+
+def test_unknown_clear_values_are_ignored():
+    user = User(_id='u', username='name')
+    apply_patch(user, User(), ['Nope', 'Avatar'], CLEAR_FIELDS['users'])
+    assert user.username == 'name'
+
+
+def test_member_update_patches_the_cached_member(client):
+    client.cache.members.set(('s', 'u'), Member(wsclient=client, _id={'server': 's', 'user': 'u'},
+                                                nickname='nick', roles=['r']))
+    cached = client.cache.get_member('s', 'u')
+    dispatch(client, {'type': 'ServerMemberUpdate', 'id': {'server': 's', 'user': 'u'},
+                      'data': {'roles': ['r', 'q']}, 'clear': ['Nickname']})
+    member = client.cache.get_member('s', 'u')
+    assert member is cached
+    assert member.role_ids == ['r', 'q'] and member.nick is None
+    assert client.cache.get_deleted_member('s', 'u').nick == 'nick'
@@ -0,0 +1,120 @@
+import pytest
+
+from pyre import PyreClient
+from pyre.enums import Permissions
+from pyre.models import Member, Role, Server, TextChannel
+from pyre.permissions import ChannelOverrides
+from .conftest import dispatch
+
+VIEW = Permissions.VIEW_CHANNEL.value
+SEND = Permissions.SEND_MESSAGE.value
+KICK = Permissions.KICK_MEMBERS.value
+
+
+@pytest.fixture
+def server(client):
+    cache = client.cache
+    cache.servers.set('s', Server(wsclient=client, _id='s', owner='owner', name='server', default_permissions=VIEW | SEND))
+    cache.roles.set(('s', 'mod'), Role(wsclient=client, id='mod', server_id='s', name='mod', rank=1,
+                                       permissions={'a': KICK, 'd': 0}))
+    cache.roles.set(('s', 'muted'), Role(wsclient=client, id='muted', server_id='s', name='muted', rank=5,
+                                         permissions={'a': 0, 'd': SEND}))
+    cache.channels.set('c', TextChannel(wsclient=client, _id='c', server='s', name='general', channel_type='TextChannel',
+                                        default_permissions={'a': 0, 'd': SEND},
+                                        role_permissions={'mod': {'a': SEND, 'd': 0}}))
+    cache.channels.set('hidden', TextChannel(wsclient=client, _id='hidden', server='s', name='hidden',
+                                             channel_type='TextChannel', default_permissions={'a': 0, 'd': VIEW}))
+    cache.members.set(('s', 'u'), Member(wsclient=client, _id={'server': 's', 'user': 'u'}, roles=['mod']))
+    return cache
+
+
+def test_server_permissions(server):
+    engine = server.permissions
+    assert engine.mask('s', 'u') == VIEW | SEND | KICK
+    assert engine.mask('s', 'owner') == Permissions.all()
+    assert engine.mask('missing', 'u') == 0
+
+
+def test_higher_ranked_role_wins(client, server):
+    server.members.set(('s', 'u'), Member(wsclient=client, _id={'server': 's', 'user': 'u'}, roles=['mod', 'muted']))
+    assert not server.permissions.has('s', 'u', SEND)
+    server.roles.set(('s', 'muted'), Role(wsclient=client, id='muted', server_id='s', name='muted', rank=0,
+                                          permissions={'a': SEND, 'd': 0}))
+    assert server.permissions.has('s', 'u', SEND)
+
+
+def test_channel_overrides(server):
+    engine = server.permissions
+    assert engine.has_in_channel('c', 'u', SEND)
+    assert not engine.has_in_channel('c', 'other', SEND)
+    assert engine.channel_mask('hidden', 'u') == 0
+    assert engine.channel_mask('hidden', 'owner') == Permissions.all()
+
+
+def test_compile():
+    channel = TextChannel(_id='c', server='s', channel_type='TextChannel', default_permissions={'a': 1, 'd': 2},
+                          role_permissions={'r': {'a': 4, 'd': 8}})
+    overrides = ChannelOverrides.compile(channel)
+    assert (overrides.allow, overrides.deny, overrides.roles) == (1, 2, {'r': (4, 8)})
+
+
+def test_channel_update_invalidates(client, server):
+    assert server.permissions.has_in_channel('c', 'u', SEND)
+    dispatch(client, {'type': 'ChannelUpdate', 'id': 'c', 'data': {'role_permissions': {'mod': {'a': 0, 'd': 0}}},
+                      'clear': []})
+    assert not server.permissions.has_in_channel('c', 'u', SEND)
+
+
+def test_member_update_invalidates(client, server):
+    assert server.permissions.has('s', 'u', KICK)
+    dispatch(client, {'type': 'ServerMemberUpdate', 'id': {'server': 's', 'user': 'u'}, 'data': {'roles': []},
+                      'clear': []})
+    assert not server.permissions.has('s', 'u', KICK)
+
+
+def test_role_permissions_are_reused(client, server):
+    channel = server.get_channel('c')
+    permissions = channel.role_permissions
+    assert [(p.role_id, p.a, p.d) for p in permissions] == [('mod', SEND, 0)]
+    assert channel.role_permissions[0] is permissions[0]
+    dispatch(client, {'type': 'ChannelUpdate', 'id': 'c', 'data': {'role_permissions': {'mod': {'a': 0, 'd': SEND}}},
+                      'clear': []})
+    assert [(p.role_id, p.a, p.d) for p in channel.role_permissions] == [('mod', 0, SEND)]
+
+
+def test_role_permissions_of_uncached_channel():
+    channel = TextChannel(_id='c', server='s', channel_type='TextChannel', role_permissions={'r': {'a': 1, 'd': 0}})
+    assert [(p.role_id, p.a) for p in channel.role_permissions] == [('r', 1)]
+    assert TextChannel(_id='d', channel_type='TextChannel').role_permissions is None
+
+
+def test_member_helpers(server):
+    member = server.get_member('s', 'u')
+    assert member.has_permissions(Permissions.KICK_MEMBERS, Permissions.SEND_MESSAGE)
+    assert not member.has_permissions(Permissions.BAN_MEMBERS)
+    assert set(member.permissions) == {Permissions.VIEW_CHANNEL, Permissions.SEND_MESSAGE, Permissions.KICK_MEMBERS}
+    assert member.has_channel_permissions('c', Permissions.SEND_MESSAGE)
+    assert member.permissions_in('hidden') == []
+
+
+def test_role_and_server_updates_invalidate(client, server):
+    assert server.permissions.has('s', 'u', KICK)
+    dispatch(client, {'type': 'ServerRoleUpdate', 'id': 's', 'role_id': 'mod',
+                      'data': {'permissions': {'a': 0, 'd': 0}}, 'clear': []})
+    assert not server.permissions.has('s', 'u', KICK)
+    assert server.permissions.has('s', 'u', SEND)
+    dispatch(client, {'type': 'ServerUpdate', 'id': 's', 'data': {'default_permissions': VIEW}, 'clear': []})
+    assert not server.permissions.has('s', 'u', SEND)
+    assert len(server.permissions) == 1
+
+
+def test_compact_members():
+    client = PyreClient('token', dispatch_workers=0, compact_members=True)
+    client.cache.servers.set('s', Server(wsclient=client, _id='s', owner='owner', name='server', default_permissions=VIEW))
+    client.cache.roles.set(('s', 'mod'), Role(wsclient=client, id='mod', server_id='s', name='mod',
+                                              permissions={'a': KICK, 'd': 0}))
+    client.cache.members.set(('s', 'u'), Member(wsclient=client, _id={'server': 's', 'user': 'u'}))
+    assert not client.cache.permissions.has('s', 'u', KICK)
+    dispatch(client, {'type': 'ServerMemberUpdate', 'id': {'server': 's', 'user': 'u'}, 'data': {'roles': ['mod']},
+                      'clear': []})
+    assert client.cache.get_member('s', 'u').has_permissions(Permissions.KICK_MEMBERS)
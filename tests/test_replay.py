@@ -0,0 +1,48 @@
+import gzip
+import json
+import pytest
+
+from pyre import PyreClient
+from pyre.models import MessageCreate, Server, TextChannel
+from pyre.replay import GatewayRecorder, GatewayReplayer, read_recording, write_recording
+from .conftest import run
+
+
+def message(index):
+    return json.dumps({'type': 'Message', '_id': f'm{index}', 'channel': 'c', 'author': 'u', 'content': str(index)})
+
+
+def test_recording_round_trip(tmp_path):
+    path = tmp_path / 'gateway.rec'
+    with GatewayRecorder(path) as recorder:
+        recorder.record('{"type":"Pong"}', 0.5)
+        recorder.record(b'\x81\xa4type\xa4Pong', 1.0)
+    assert list(read_recording(path)) == [(0.5, '{"type":"Pong"}'), (1.0, b'\x81\xa4type\xa4Pong')]
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / 'other.rec'
+    with gzip.open(path, 'wb') as file:
+        file.write(b'{"type":"Pong"}')
+    with pytest.raises(ValueError):
+        list(read_recording(path))
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_replay(tmp_path, workers):
+    path = tmp_path / 'gateway.rec'
+    write_recording(path, [message(index) for index in range(20)] + ['not json'], rate=1000)
+    client = PyreClient('token', dispatch_workers=workers)
+    client.cache.servers.set('s', Server(wsclient=client, _id='s', name='server', channels=['c']))
+    client.cache.channels.set('c', TextChannel(wsclient=client, _id='c', server='s', channel_type='TextChannel'))
+    seen = []
+
+    @client.listen(MessageCreate)
+    async def on_message(event):
+        seen.append(event.content)
+
+    result = run(GatewayReplayer(client, path, speed=0).replay())
+    assert result.frames == 21
+    assert result.errors == 1
+    assert sorted(seen, key=int) == [str(index) for index in range(20)]
+    assert client.cache.get_message('c', 'm19') is not None
@@ -0,0 +1,91 @@
+import asyncio
+
+from pyre import PyreClient
+from pyre.models import CommandContext, Server, TextChannel
+from .conftest import dispatch, run
+
+
+class FakeHTTP:
+    """Answers member and user lookups from dicts, unknown ids get the API's NotFound body"""
+    def __init__(self, members=(), users=()):
+        self.members = {(server_id, user_id): {'_id': {'server': server_id, 'user': user_id}}
+                        for server_id, user_id in members}
+        self.users = {user_id: {'_id': user_id, 'username': user_id} for user_id in users}
+        self.calls = []
+
+    async def fetch_member(self, server_id, user_id):
+        self.calls.append(('member', server_id, user_id))
+        await asyncio.sleep(0.01)
+        return self.members.get((server_id, user_id), {'type': 'NotFound'})
+
+    async def fetch_user(self, user_id):
+        self.calls.append(('user', user_id))
+        await asyncio.sleep(0.01)
+        return self.users.get(user_id, {'type': 'NotFound'})
+
+
+def lazy_client(**http):
+    client = PyreClient('token', dispatch_workers=0, lazy_members=True)
+    client.ws.http = FakeHTTP(**http)
+    client.cache.servers.set('s', Server(wsclient=client, _id='s', name='srv', channels=['c']))
+    client.cache.channels.set('c', TextChannel(wsclient=client, _id='c', server='s', name='general',
+                                               channel_type='TextChannel'))
+    return client
+
+
+def test_concurrent_lookups_share_one_request():
+    client = lazy_client(members=[('s', 'u')], users=['u'])
+
+    async def lookups():
+        return await asyncio.gather(*[client.cache.fetch_member('s', 'u') for _ in range(20)])
+    members = run(lookups())
+    assert all(member is members[0] for member in members) and members[0].id == 'u'
+    assert sorted(client.ws.http.calls) == [('member', 's', 'u'), ('user', 'u')]
+    assert client.ws.resolver.coalesced == 19
+    assert client.cache.get_user('u').username == 'u'
+
+
+def test_missing_member_resolves_to_none():
+    client = lazy_client()
+    assert run(client.cache.fetch_member('s', 'nobody')) is None
+
+
+def test_lazy_command_from_uncached_author_runs():
+    client = lazy_client(members=[('s', 'u')], users=['u'])
+    client.prefixes = ['!']
+    calls = []
+
+    @client.command(name='ping')
+    async def ping(ctx: CommandContext):
+        calls.append(ctx.author_id)
+
+    assert client.cache.members.get(('s', 'u')) is None
+    dispatch(client, {'type': 'Message', '_id': 'm', 'channel': 'c', 'author': 'u', 'content': '!ping'})
+    assert calls == ['u']
+
+
+def test_not_found_is_remembered_until_it_expires():
+    client = lazy_client()
+    now = [1000.0]
+    client.ws.resolver.timer = lambda: now[0]
+
+    async def lookups():
+        for _ in range(5):
+            assert await client.cache.fetch_member('s', 'gone') is None
+            assert client.cache.get_member('s', 'gone') is None
+        await asyncio.sleep(0.05)
+    run(lookups())
+    assert client.ws.http.calls.count(('member', 's', 'gone')) == 1
+
+    now[0] += client.ws.resolver.missing_ttl + 1
+    run(client.cache.fetch_member('s', 'gone'))
+    assert client.ws.http.calls.count(('member', 's', 'gone')) == 2
+
+
+def test_join_forgets_a_missing_member():
+    client = lazy_client()
+    run(client.cache.fetch_member('s', 'u'))
+    client.ws.http.members[('s', 'u')] = {'_id': {'server': 's', 'user': 'u'}}
+    client.ws.http.users['u'] = {'_id': 'u', 'username': 'u'}
+    dispatch(client, {'type': 'ServerMemberJoin', 'id': 's', 'user': 'u'})
+    assert run(client.cache.fetch_member('s', 'u')).id == 'u'
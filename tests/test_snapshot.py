@@ -0,0 +1,80 @@
+import asyncio
+import sqlite3
+
+from pyre import PyreClient
+from pyre.models import Member, Role, Server, TextChannel, User
+from pyre.snapshot import CacheSnapshot
+from .conftest import run
+
+
+def fill(client):
+    cache = client.cache
+    cache.servers.set('s', Server(wsclient=client, _id='s', name='srv', owner='o', channels=['c']))
+    cache.roles.set(('s', 'r'), Role(wsclient=client, id='r', server_id='s', name='mod', colour='#00ff01', rank=1))
+    cache.channels.set('c', TextChannel(wsclient=client, _id='c', server='s', name='general',
+                                        channel_type='TextChannel', role_permissions={'r': {'a': 1, 'd': 2}}))
+    cache.users.set('u', User(wsclient=client, _id='u', username='bob', status={'text': 'hi'}))
+    cache.members.set(('s', 'u'), Member(wsclient=client, _id={'server': 's', 'user': 'u'}, roles=['r'],
+                                         nickname='bobby', joined_at='2022-01-01T00:00:00Z'))
+
+
+def test_round_trip_with_coloured_role(tmp_path, client):
+    fill(client)
+    snapshot = CacheSnapshot(str(tmp_path / 'cache.db'))
+    assert snapshot.save(client.cache) == 5
+
+    restored = PyreClient('token', dispatch_workers=0)
+    assert snapshot.load(restored.cache, restored) == 5
+    role = restored.cache.get_role('s', 'r')
+    assert role.colour.as_hex() == client.cache.get_role('s', 'r').colour.as_hex()
+    assert role.client is restored
+    member = restored.cache.get_member('s', 'u')
+    assert member.nick == 'bobby' and member.role_ids == ['r']
+    assert member.joined_at == client.cache.get_member('s', 'u').joined_at
+    assert restored.cache.get_channel('c').role_perms == {'r': {'a': 1, 'd': 2}}
+    assert restored.cache.get_user('u').status.text == 'hi'
+    assert restored.cache.get_server('s').channel_ids == ['c']
+
+
+def test_round_trip_into_compact_members(tmp_path, client):
+    fill(client)
+    snapshot = CacheSnapshot(str(tmp_path / 'cache.db'))
+    snapshot.save(client.cache)
+    restored = PyreClient('token', dispatch_workers=0, compact_members=True)
+    snapshot.load(restored.cache, restored)
+    assert restored.cache.get_member('s', 'u').nick == 'bobby'
+
+
+def test_ignores_missing_old_and_other_version_snapshots(tmp_path, client):
+    fill(client)
+    path = str(tmp_path / 'cache.db')
+    assert CacheSnapshot(path).load(client.cache, client) == 0
+    CacheSnapshot(path).save(client.cache)
+    assert CacheSnapshot(path, max_age=-1).load(client.cache, client) == 0
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE meta SET value = '0' WHERE name = 'version'")
+    assert CacheSnapshot(path).load(client.cache, client) == 0
+
+
+def test_asave_lets_the_loop_run(tmp_path, client):
+    for index in range(50):
+        client.cache.users.set(f'u{index}', User(wsclient=client, _id=f'u{index}', username=f'user{index}'))
+    snapshot = CacheSnapshot(str(tmp_path / 'cache.db'), chunk=10)
+    ticks = []
+
+    async def save():
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0)
+        before = len(ticks)
+        rows = await snapshot.adump(client.cache)
+        ticker.cancel()
+        return len(ticks) - before, rows
+
+    during, rows = run(save())
+    assert during >= 4
+    assert rows == snapshot.dump(client.cache)
+    assert run(snapshot.asave(client.cache)) == 50